@@ -0,0 +1,233 @@
+"""Per-model, per-host tuning of chunking, context window, threads and concurrency.
+
+`tune` runs a short sweep over a sample of a novel's chapters (or synthetic
+text) against the configured backend and stores the best settings in
+`config/tuning.json` (TUNING_CONFIG), keyed by host (PERF_HOST) and model:
+
+    {"<host>": {"qwen2.5:7b": {"chunk_size": 6000, "overlap": 200, "num_ctx": 8192,
+                               "num_thread": 0, "concurrency": 2, "metrics": {...}}}}
+
+`translate_text` reads the profile for its model through `tuning_for`;
+explicit env vars (CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_CONCURRENCY,
+OLLAMA_NUM_CTX) still take precedence.
+
+The sweep is coordinate-wise (chunk size, then num_ctx, then concurrency,
+then num_thread) rather than a full grid, so it stays at a dozen trials.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from .perf_history import PERF_HOST, estimate_tokens
+
+DEFAULT_TUNING_PATH = Path(__file__).resolve().parent.parent / "config" / "tuning.json"
+TUNING_CONFIG = os.environ.get("TUNING_CONFIG") or str(DEFAULT_TUNING_PATH)
+
+# Uma configuração só é aceita com fidelidade e taxa de retentativas dentro destes limites
+TUNE_MIN_FIDELITY = float(os.environ.get("TUNE_MIN_FIDELITY", "0.90"))
+TUNE_MAX_RETRY_RATE = float(os.environ.get("TUNE_MAX_RETRY_RATE", "0.10"))
+# Ganho mínimo de vazão para trocar o valor atual (abaixo disso é ruído de medição)
+TUNE_MIN_GAIN = float(os.environ.get("TUNE_MIN_GAIN", "0.05"))
+
+CHUNK_SIZES = (4000, 6000, 8000, 12000)
+NUM_CTX_SIZES = (4096, 8192, 16384, 32768)
+CONCURRENCY_LEVELS = (1, 2, 4)
+
+# Contadores das estatísticas que contam como "retentativa" na medição
+RETRY_STATS = (
+    "Retentativas LLM",
+    "Reprocessamentos de Fidelidade",
+    "Gerações Abortadas (Preâmbulo)",
+    "Gerações em Loop Canceladas",
+    "Saídas no Limite de Tokens",
+)
+
+
+@dataclass(frozen=True)
+class TuningProfile:
+    """Settings `translate_text` uses for one model on this host (0 = server default)."""
+    chunk_size: int = 8000
+    overlap: int = 200
+    num_ctx: int = 0
+    num_thread: int = 0
+    concurrency: int = 1
+
+
+DEFAULT_PROFILE = TuningProfile()
+
+_CACHE: Dict[str, object] = {"mtime": None, "data": {}}
+_OVERRIDE: Optional[TuningProfile] = None
+
+
+def load_tuning_file(path: str = TUNING_CONFIG) -> Dict[str, Dict[str, Dict]]:
+    """{host: {model: settings}} (empty when missing or unreadable)."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def tuning_for(model: str, host: str = PERF_HOST, path: str = TUNING_CONFIG) -> TuningProfile:
+    """Tuned profile for `model` on `host`; re-read only when the file changes."""
+    if _OVERRIDE is not None:
+        return _OVERRIDE
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return DEFAULT_PROFILE
+    if _CACHE["mtime"] != (path, mtime):
+        _CACHE["mtime"], _CACHE["data"] = (path, mtime), load_tuning_file(path)
+    settings = _CACHE["data"].get(host, {}).get(model)  # type: ignore[union-attr]
+    if not settings:
+        return DEFAULT_PROFILE
+    known = {k: int(v) for k, v in settings.items() if k in TuningProfile.__dataclass_fields__}
+    return replace(DEFAULT_PROFILE, **known)
+
+
+@contextmanager
+def override_tuning(profile: TuningProfile) -> Iterator[None]:
+    """Make `tuning_for` return `profile` (used by the sweep trials)."""
+    global _OVERRIDE
+    previous, _OVERRIDE = _OVERRIDE, profile
+    try:
+        yield
+    finally:
+        _OVERRIDE = previous
+
+
+def save_tuning(
+    model: str,
+    profile: TuningProfile,
+    metrics: Dict[str, float],
+    host: str = PERF_HOST,
+    path: str = TUNING_CONFIG,
+) -> None:
+    data = load_tuning_file(path)
+    entry = asdict(profile)
+    entry["metrics"] = metrics
+    entry["tuned_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    data.setdefault(host, {})[model] = entry
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, p)
+
+
+@dataclass
+class TrialResult:
+    profile: TuningProfile
+    chars_per_second: float
+    retry_rate: float
+    fidelity: float
+    calls: int = 0
+    error: str = ""
+
+    @property
+    def acceptable(self) -> bool:
+        return not self.error and self.fidelity >= TUNE_MIN_FIDELITY and self.retry_rate <= TUNE_MAX_RETRY_RATE
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "chars_per_second": round(self.chars_per_second, 1),
+            "retry_rate": round(self.retry_rate, 3),
+            "fidelity": round(self.fidelity, 3),
+        }
+
+
+def _best(results: Sequence[TrialResult], baseline: Optional[TrialResult] = None) -> TrialResult:
+    """Fastest acceptable trial, unless it beats `baseline` by less than TUNE_MIN_GAIN;
+    without any acceptable trial, the most faithful one."""
+    ok = [r for r in results if r.acceptable]
+    if not ok:
+        return max(results, key=lambda r: (not r.error, r.fidelity, r.chars_per_second))
+    winner = max(ok, key=lambda r: r.chars_per_second)
+    if baseline is not None and baseline.acceptable:
+        if winner.chars_per_second < baseline.chars_per_second * (1 + TUNE_MIN_GAIN):
+            return baseline
+    return winner
+
+
+def min_num_ctx(chunk_size: int, prompt_overhead_tokens: int, expansion: float) -> int:
+    """Smallest context window that holds the prompt, a chunk and its translation."""
+    chunk_tokens = estimate_tokens(chunk_size)
+    return int(prompt_overhead_tokens + chunk_tokens * (1 + expansion))
+
+
+def run_trial(profile: TuningProfile, texts: Sequence[str], translate: Callable[[str, Dict], str]) -> TrialResult:
+    """Translate the sample under `profile`, measuring throughput, retries and fidelity."""
+    stats: Dict[str, float] = {}
+    src_words = tgt_words = chars = 0
+    start = time.perf_counter()
+    try:
+        with override_tuning(profile):
+            for text in texts:
+                out = translate(text, stats)
+                chars += len(text)
+                src_words += len(text.split())
+                tgt_words += len(out.split())
+    except Exception as e:
+        return TrialResult(profile, 0.0, 1.0, 0.0, error=f"{e.__class__.__name__}: {e}")
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    calls = int(stats.get("Chunks Traduzidos", 0)) or 1
+    retries = sum(stats.get(key, 0) for key in RETRY_STATS)
+    return TrialResult(profile, chars / elapsed, retries / calls, tgt_words / max(1, src_words), calls)
+
+
+@dataclass
+class SweepReport:
+    best: TrialResult
+    trials: List[TrialResult] = field(default_factory=list)
+
+
+def sweep(
+    texts: Sequence[str],
+    translate: Callable[[str, Dict], str],
+    prompt_overhead_tokens: int,
+    expansion: float = 1.2,
+    tune_threads: bool = False,
+    cpu_count: int = 0,
+    log: Callable[[str], None] = print,
+) -> SweepReport:
+    """Coordinate-wise sweep: chunk size, then num_ctx, then concurrency, then num_thread."""
+    trials: List[TrialResult] = []
+
+    def stage(name: str, candidates: Sequence[TuningProfile], baseline: TuningProfile) -> TrialResult:
+        results = []
+        for profile in candidates:
+            result = run_trial(profile, texts, translate)
+            status = result.error or ("ok" if result.acceptable else "rejeitado")
+            log(
+                f"  [{name}] chunk={profile.chunk_size} ctx={profile.num_ctx or 'padrão'} "
+                f"conc={profile.concurrency} threads={profile.num_thread or 'padrão'}: "
+                f"{result.chars_per_second:,.0f} chars/s, retentativas {result.retry_rate:.0%}, "
+                f"fidelidade {result.fidelity:.0%} ({status})"
+            )
+            results.append(result)
+        trials.extend(results)
+        return _best(results, next((r for r in results if r.profile == baseline), None))
+
+    sample_chars = max(len(t) for t in texts)
+    sizes = [s for s in CHUNK_SIZES if s < sample_chars] or [min(CHUNK_SIZES)]
+    best = stage("chunk_size", [replace(DEFAULT_PROFILE, chunk_size=s) for s in sizes], DEFAULT_PROFILE)
+
+    needed = min_num_ctx(best.profile.chunk_size, prompt_overhead_tokens, expansion)
+    ctx_options = [c for c in NUM_CTX_SIZES if c >= needed][:2]
+    if ctx_options:
+        best = stage("num_ctx", [replace(best.profile, num_ctx=c) for c in ctx_options] + [best.profile], best.profile)
+
+    best = stage(
+        "concorrência",
+        [replace(best.profile, concurrency=c) for c in CONCURRENCY_LEVELS if c != best.profile.concurrency] + [best.profile],
+        best.profile,
+    )
+
+    if tune_threads and cpu_count > 1:
+        threads = sorted({max(1, cpu_count // 2), cpu_count})
+        best = stage("num_thread", [replace(best.profile, num_thread=t) for t in threads] + [best.profile], best.profile)
+
+    return SweepReport(best, trials)
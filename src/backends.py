@@ -0,0 +1,377 @@
+"""Inference backends used by translator_core.
+
+Every driver exposes the same `generate`/`stream` interface and declares its
+capabilities, so the pipeline can run against whichever server is fastest on
+a given box without changes to `translator_core`:
+
+- `ollama`: native Ollama API (default)
+- `openai`: any OpenAI-compatible `/v1/chat/completions` server (vLLM, LM Studio, ...)
+- `llamacpp`: llama.cpp `llama-server` (OpenAI-compatible + prompt cache)
+- `stub`: in-process echo backend for tests, benchmarks and dry runs
+
+Select the driver with LLM_BACKEND.
+"""
+import json
+import math
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "ollama").lower()
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_TIMEOUT = int(os.environ.get("OLLAMA_TIMEOUT", "300"))
+# Tempo que o Ollama mantém o modelo carregado após cada requisição ("30m", "-1" = sempre; vazio = padrão do servidor)
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "")
+
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "http://localhost:8000/v1")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+
+# Contexto máximo anunciado pelo driver (0 = padrão do driver)
+LLM_MAX_CONTEXT = int(os.environ.get("LLM_MAX_CONTEXT", "0"))
+
+# Atraso artificial por token do backend stub (segundos), útil para benchmarks
+STUB_SECONDS_PER_TOKEN = float(os.environ.get("STUB_SECONDS_PER_TOKEN", "0"))
+
+
+class BackendTimeoutError(RuntimeError):
+    """The server did not answer within the request timeout."""
+
+
+@dataclass(frozen=True)
+class BackendCapabilities:
+    """What a driver can do; used by callers to pick batching/streaming strategies."""
+    batching: bool
+    streaming: bool
+    prefix_caching: bool
+    max_context: int
+    # Aceita um JSON schema para a resposta (opção `format`, ver src/structured_output.py)
+    structured_output: bool = False
+
+
+class InferenceBackend:
+    """Base class for inference drivers.
+
+    Subclasses implement `stream`; `generate` joins the streamed pieces.
+    Extra keyword options (e.g. `num_predict`) are forwarded to the server
+    using the driver's own parameter names; `format` (a JSON schema) constrains
+    the response on drivers with `structured_output`.
+    """
+
+    name = "base"
+    capabilities = BackendCapabilities(batching=False, streaming=False, prefix_caching=False, max_context=0)
+
+    def stream(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float = 0.3,
+        num_ctx: int = 0,
+        timeout: Optional[float] = None,
+        **options: Any,
+    ) -> Iterator[str]:
+        raise NotImplementedError
+
+    def generate(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float = 0.3,
+        num_ctx: int = 0,
+        timeout: Optional[float] = None,
+        **options: Any,
+    ) -> str:
+        return "".join(self.stream(prompt, model, temperature=temperature, num_ctx=num_ctx, timeout=timeout, **options))
+
+    def endpoint(self) -> str:
+        """Identifier of the server this driver talks to (used for per-endpoint state)."""
+        return self.name
+
+
+class OllamaBackend(InferenceBackend):
+    """Native Ollama driver (`ollama` package, imported lazily)."""
+
+    name = "ollama"
+    capabilities = BackendCapabilities(
+        batching=False,
+        streaming=True,
+        prefix_caching=True,
+        max_context=LLM_MAX_CONTEXT or 32768,
+        structured_output=True,
+    )
+
+    # Timeouts por pedido são arredondados para cima neste passo (s): poucos clientes, todos reaproveitados
+    CLIENT_TIMEOUT_STEP = 30
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, timeout: float = OLLAMA_TIMEOUT, keep_alive: str = OLLAMA_KEEP_ALIVE):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.keep_alive = keep_alive or None
+        self._clients: Dict[float, Any] = {}
+        self._clients_lock = threading.Lock()
+
+    def endpoint(self) -> str:
+        return self.base_url
+
+    def _client(self, timeout: Optional[float]):
+        """Shared `ollama.Client` for this host and (rounded-up) timeout.
+
+        The client keeps its HTTP connection pool, so the long-lived service
+        and the worker pool reuse warm connections instead of opening one per call.
+        """
+        try:
+            import ollama
+        except Exception:
+            raise RuntimeError("Ollama package not installed. Install via: pip install ollama")
+        step = self.CLIENT_TIMEOUT_STEP
+        timeout = min(float(self.timeout), float(math.ceil((timeout or self.timeout) / step) * step))
+        with self._clients_lock:
+            client = self._clients.get(timeout)
+            if client is None:
+                client = self._clients[timeout] = ollama.Client(host=self.base_url, timeout=timeout)
+            return client
+
+    def _connection_error(self, model: str, timeout: Optional[float], exc: Exception) -> RuntimeError:
+        from httpx import TimeoutException
+        error_cls = BackendTimeoutError if isinstance(exc, TimeoutException) else RuntimeError
+        return error_cls(
+            f"Conexão com Ollama em {self.base_url} falhou (timeout de {timeout or self.timeout}s).\n"
+            f"Verifique se o Ollama está rodando e acessível:\n"
+            f"  1. Instale e execute o app Ollama: https://ollama.com\n"
+            f"  2. (Opcional) Execute no terminal: ollama serve\n"
+            f"  3. Baixe o modelo necessário: ollama pull {model}\n"
+            f"Se o timeout persistir, aumente a variável de ambiente OLLAMA_TIMEOUT.\n"
+            f"Erro original: {exc.__class__.__name__}"
+        )
+
+    def _options(self, temperature: float, num_ctx: int, options: Dict[str, Any]) -> Dict[str, Any]:
+        opts = {"temperature": temperature}
+        if num_ctx:
+            opts["num_ctx"] = num_ctx
+        opts.update(options)
+        return opts
+
+    def generate(self, prompt, model, temperature=0.3, num_ctx=0, timeout=None, **options) -> str:
+        client = self._client(timeout)
+        import ollama
+        from httpx import TimeoutException
+        schema = options.pop("format", None)
+        try:
+            response = client.chat(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                options=self._options(temperature, num_ctx, options),
+                keep_alive=self.keep_alive,
+                format=schema,
+            )
+            return response.get("message", {}).get("content", "")
+        except (ConnectionError, ollama.ResponseError, ollama.RequestError, TimeoutException) as e:
+            raise self._connection_error(model, timeout, e)
+        except Exception as e:
+            raise RuntimeError(f"Erro inesperado no Ollama: {e}")
+
+    def stream(self, prompt, model, temperature=0.3, num_ctx=0, timeout=None, **options) -> Iterator[str]:
+        client = self._client(timeout)
+        import ollama
+        from httpx import TimeoutException
+        schema = options.pop("format", None)
+        try:
+            # Fechar este gerador fecha a conexão HTTP, o que interrompe a geração no servidor.
+            for part in client.chat(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                options=self._options(temperature, num_ctx, options),
+                keep_alive=self.keep_alive,
+                format=schema,
+                stream=True,
+            ):
+                piece = part.get("message", {}).get("content", "")
+                if piece:
+                    yield piece
+        except (ConnectionError, ollama.ResponseError, ollama.RequestError, TimeoutException) as e:
+            raise self._connection_error(model, timeout, e)
+
+
+class OpenAICompatibleBackend(InferenceBackend):
+    """Driver for OpenAI-compatible `/v1/chat/completions` servers (stdlib HTTP only)."""
+
+    name = "openai"
+    capabilities = BackendCapabilities(
+        batching=True,
+        streaming=True,
+        prefix_caching=False,
+        max_context=LLM_MAX_CONTEXT or 32768,
+        structured_output=True,
+    )
+
+    # Opções genéricas -> nomes do protocolo OpenAI
+    OPTION_NAMES = {"num_predict": "max_tokens", "top_p": "top_p", "stop": "stop", "seed": "seed"}
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: str = OPENAI_API_KEY, timeout: float = OLLAMA_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def endpoint(self) -> str:
+        return self.base_url
+
+    def _body(self, prompt: str, model: str, temperature: float, stream: bool, options: Dict[str, Any]) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "stream": stream,
+        }
+        for key, value in options.items():
+            if key in self.OPTION_NAMES:
+                body[self.OPTION_NAMES[key]] = value
+        if options.get("format"):
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "response", "schema": options["format"]},
+            }
+        return body
+
+    def _open(self, body: Dict[str, Any], timeout: Optional[float]):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps(body).encode("utf-8"),
+            headers=headers,
+            method="POST",
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except (urllib.error.URLError, OSError) as e:
+            timed_out = isinstance(e, socket.timeout) or isinstance(getattr(e, "reason", None), socket.timeout)
+            raise (BackendTimeoutError if timed_out else RuntimeError)(
+                f"Conexão com o servidor OpenAI-compatível em {self.base_url} falhou "
+                f"(timeout de {timeout or self.timeout}s). Erro original: {e.__class__.__name__}: {e}"
+            )
+
+    def generate(self, prompt, model, temperature=0.3, num_ctx=0, timeout=None, **options) -> str:
+        with self._open(self._body(prompt, model, temperature, False, options), timeout) as resp:
+            try:
+                data = json.loads(resp.read().decode("utf-8"))
+            except socket.timeout:
+                raise BackendTimeoutError(f"Timeout lendo a resposta de {self.base_url}")
+        try:
+            return data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError):
+            raise RuntimeError(f"Resposta inesperada de {self.base_url}: {str(data)[:200]}")
+
+    def stream(self, prompt, model, temperature=0.3, num_ctx=0, timeout=None, **options) -> Iterator[str]:
+        # Server-sent events: linhas "data: {...}" terminadas por "data: [DONE]"
+        with self._open(self._body(prompt, model, temperature, True, options), timeout) as resp:
+            try:
+                for raw in resp:
+                    line = raw.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        break
+                    try:
+                        delta = json.loads(payload)["choices"][0].get("delta", {})
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    piece = delta.get("content")
+                    if piece:
+                        yield piece
+            except socket.timeout:
+                # Servidor parou no meio do stream: mesmo tratamento de um timeout na conexão
+                raise BackendTimeoutError(f"Timeout lendo o stream de {self.base_url}")
+            except OSError as e:
+                raise RuntimeError(f"Stream de {self.base_url} interrompido: {e.__class__.__name__}: {e}")
+
+
+class LlamaCppBackend(OpenAICompatibleBackend):
+    """llama.cpp `llama-server` driver: OpenAI protocol plus server-side prompt caching."""
+
+    name = "llamacpp"
+    capabilities = BackendCapabilities(
+        batching=True,
+        streaming=True,
+        prefix_caching=True,
+        max_context=LLM_MAX_CONTEXT or 8192,
+        structured_output=True,
+    )
+
+    def _body(self, prompt, model, temperature, stream, options):
+        body = super()._body(prompt, model, temperature, stream, options)
+        # Reaproveita o KV cache do prefixo comum (prompt de sistema + glossário) entre chunks
+        body["cache_prompt"] = True
+        if "num_predict" in options:
+            body["n_predict"] = options["num_predict"]
+        if options.get("format"):
+            body["json_schema"] = options["format"]
+        return body
+
+
+class LocalStubBackend(InferenceBackend):
+    """In-process backend that echoes the text to translate.
+
+    Returns everything after the last prompt marker (the chunk or the chapter
+    under review), so pipelines can be exercised without a model server. In
+    structured mode that is the numbered-paragraph JSON, which already has the
+    response shape.
+    """
+
+    name = "stub"
+    capabilities = BackendCapabilities(
+        batching=True,
+        streaming=True,
+        prefix_caching=False,
+        max_context=LLM_MAX_CONTEXT or 1_000_000,
+        structured_output=True,
+    )
+
+    MARKERS = ("CAPÍTULO A REVISAR:\n", "\n---\n\n")
+
+    def __init__(self, seconds_per_token: float = STUB_SECONDS_PER_TOKEN):
+        self.seconds_per_token = seconds_per_token
+
+    def _payload(self, prompt: str) -> str:
+        cut = max((prompt.rfind(m) + len(m) if m in prompt else 0) for m in self.MARKERS)
+        return prompt[cut:]
+
+    def stream(self, prompt, model, temperature=0.3, num_ctx=0, timeout=None, **options) -> Iterator[str]:
+        payload = self._payload(prompt)
+        pos = 0
+        while pos < len(payload):
+            end = payload.find(" ", pos + 1)
+            end = len(payload) if end == -1 else end
+            if self.seconds_per_token:
+                time.sleep(self.seconds_per_token)
+            yield payload[pos:end]
+            pos = end
+
+
+BACKENDS = {
+    "ollama": OllamaBackend,
+    "openai": OpenAICompatibleBackend,
+    "llamacpp": LlamaCppBackend,
+    "stub": LocalStubBackend,
+}
+
+_INSTANCES: Dict[str, InferenceBackend] = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None) -> InferenceBackend:
+    """Return the shared driver instance for `name` (defaults to LLM_BACKEND)."""
+    key = (name or LLM_BACKEND).lower()
+    with _INSTANCES_LOCK:
+        backend = _INSTANCES.get(key)
+        if backend is None:
+            if key not in BACKENDS:
+                raise ValueError(f"Backend desconhecido: {key}. Opções: {', '.join(sorted(BACKENDS))}")
+            backend = _INSTANCES[key] = BACKENDS[key]()
+        return backend
@@ -0,0 +1,139 @@
+"""Online chunk sizing (ADAPTIVE_CHUNKING=1): AIMD on the chunk size during a run.
+
+`tune` picks one chunk size per model and host from a short sweep; the best
+size still drifts with the chapter, the load on the box and the fidelity
+failure rate. `ChunkSizeController` adjusts the target size of the next
+chunk from each translated chunk:
+
+- first-pass fidelity below 90%, or latency above ADAPTIVE_CHUNK_TARGET_SECONDS:
+  multiply the size by ADAPTIVE_CHUNK_BACKOFF;
+- otherwise add ADAPTIVE_CHUNK_STEP, capped by the size the measured
+  throughput (source chars/s) translates within the latency target;
+
+always within [ADAPTIVE_CHUNK_MIN, ADAPTIVE_CHUNK_MAX]. Latency and
+tokens/s are smoothed (EWMA). The state is kept per novel and model in
+`glossary/{novel}/chunking.json` in the session dir, so the next run starts
+from where this one ended.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ADAPTIVE_CHUNKING = os.environ.get("ADAPTIVE_CHUNKING", "0").lower() not in ("0", "false", "no", "off")
+ADAPTIVE_CHUNK_MIN = int(os.environ.get("ADAPTIVE_CHUNK_MIN", "2000"))
+ADAPTIVE_CHUNK_MAX = int(os.environ.get("ADAPTIVE_CHUNK_MAX", "16000"))
+# Aumento aditivo (caracteres) após um chunk bom e fator multiplicativo após uma falha
+ADAPTIVE_CHUNK_STEP = int(os.environ.get("ADAPTIVE_CHUNK_STEP", "1000"))
+ADAPTIVE_CHUNK_BACKOFF = float(os.environ.get("ADAPTIVE_CHUNK_BACKOFF", "0.5"))
+# Latência máxima desejada por chunk (s); 0 = só a fidelidade conta
+ADAPTIVE_CHUNK_TARGET_SECONDS = float(os.environ.get("ADAPTIVE_CHUNK_TARGET_SECONDS", "120"))
+
+# Peso da última medição nas médias móveis (latência, chars/s, tokens/s)
+EWMA_ALPHA = 0.3
+
+STAT_CHUNK_SIZE = "Tamanho de Chunk Alvo (Adaptativo)"
+STAT_CHUNK_DECREASES = "Reduções de Chunk (Adaptativo)"
+
+
+def _ewma(previous: float, value: float) -> float:
+    return value if not previous else previous + EWMA_ALPHA * (value - previous)
+
+
+class ChunkSizeController:
+    """AIMD controller of the chunk target size; `record` is thread-safe."""
+
+    def __init__(
+        self,
+        size: int,
+        min_size: int = ADAPTIVE_CHUNK_MIN,
+        max_size: int = ADAPTIVE_CHUNK_MAX,
+        step: int = ADAPTIVE_CHUNK_STEP,
+        backoff: float = ADAPTIVE_CHUNK_BACKOFF,
+        target_seconds: float = ADAPTIVE_CHUNK_TARGET_SECONDS,
+        state: Optional[Dict[str, Any]] = None,
+    ):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.step = step
+        self.backoff = backoff
+        self.target_seconds = target_seconds
+        state = state or {}
+        self._size = self._clamp(int(state.get("size", size)))
+        self.chunks = int(state.get("chunks", 0))
+        self.failures = int(state.get("failures", 0))
+        self.latency = float(state.get("latency", 0.0))
+        self.chars_per_second = float(state.get("chars_per_second", 0.0))
+        self.tokens_per_second = float(state.get("tokens_per_second", 0.0))
+        self._lock = threading.Lock()
+
+    def _clamp(self, size: int) -> int:
+        return max(self.min_size, min(self.max_size, size))
+
+    @property
+    def size(self) -> int:
+        """Target size (chars) for the next chunk."""
+        return self._size
+
+    def record(self, chars: int, seconds: float, completion_tokens: int, passed: bool) -> bool:
+        """Feed one translated chunk; returns True when the size was cut."""
+        with self._lock:
+            seconds = max(seconds, 1e-6)
+            self.chunks += 1
+            self.latency = _ewma(self.latency, seconds)
+            self.chars_per_second = _ewma(self.chars_per_second, chars / seconds)
+            self.tokens_per_second = _ewma(self.tokens_per_second, completion_tokens / seconds)
+            too_slow = bool(self.target_seconds) and seconds > self.target_seconds
+            if not passed or too_slow:
+                self.failures += not passed
+                self._size = self._clamp(int(self._size * self.backoff))
+                return True
+            grown = self._size + self.step
+            if self.target_seconds:
+                # Não cresça além do que a vazão medida traduz dentro da latência alvo
+                grown = min(grown, max(self._size, int(self.chars_per_second * self.target_seconds)))
+            self._size = self._clamp(grown)
+            return False
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self._size,
+                "chunks": self.chunks,
+                "failures": self.failures,
+                "latency": round(self.latency, 3),
+                "chars_per_second": round(self.chars_per_second, 1),
+                "tokens_per_second": round(self.tokens_per_second, 2),
+            }
+
+
+def chunking_state_path(novel_name: str, base_dir: str = ".") -> Path:
+    return Path(base_dir) / "glossary" / novel_name / "chunking.json"
+
+
+def _load_states(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def open_chunk_controller(novel_name: str, model: str, size: int, base_dir: str = ".") -> ChunkSizeController:
+    """Controller for `model` in this novel, resumed from its saved state or starting at `size`."""
+    state = _load_states(chunking_state_path(novel_name, base_dir)).get(model)
+    return ChunkSizeController(size, state=state)
+
+
+def save_chunk_controller(controller: ChunkSizeController, novel_name: str, model: str, base_dir: str = ".") -> None:
+    """Store the controller state under `model` (other models' entries are kept)."""
+    path = chunking_state_path(novel_name, base_dir)
+    states = _load_states(path)
+    entry = controller.state()
+    entry["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    states[model] = entry
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(states, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,539 @@
+"""Command-line interface (`python main.py <comando>`).
+
+Subcommands:
+
+- `translate [novel] [capítulos...]`: translate all novels under input/, or one
+  novel / selected chapters (names, stems or glob patterns)
+- `resume [novel]`: like translate, skipping chapters already translated
+  (both take `--parallel N` to translate N chapters at once)
+- `plan [novel] [capítulos...]` (or `translate --dry-run`): estimate calls, tokens
+  and wall time without calling the model
+- `watch`: daemon that translates chapters as they land in input/
+- `serve`: local HTTP service with a persistent job queue (see src/service.py)
+- `export <novel>`: merge translated chapters into EPUB/DOCX/TXT volumes
+- `stats [novel] [--xlsx]`: show the per-chapter ledger, optionally as XLSX
+- `bench`: throughput of chunking, post-processing, DOCX and the inference backend
+- `check`: environment check (replaces verify_setup.py)
+
+Heavy modules (translator_core, pandas, ollama, python-docx) are imported
+inside the handlers that need them, so `check` and `stats` start fast.
+Running without a subcommand keeps the old behaviour: translate everything.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+COMMANDS = ("translate", "resume", "plan", "watch", "serve", "export", "stats", "bench", "tune", "check")
+
+
+def _load_env() -> None:
+    # As configurações dos módulos em src/ são lidas na importação: carregue o .env antes delas.
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _output_root(args: argparse.Namespace) -> Path:
+    return Path(args.output or os.environ.get("OUTPUT_DIR", "./output"))
+
+
+def novel_input_dirs(input_root: Path, novel: Optional[str] = None) -> List[Tuple[str, Path]]:
+    """(novel_name, input_dir) pairs: one per subdirectory of input/, or input/ itself as 'default'."""
+    if not input_root.exists():
+        return []
+    if novel:
+        if novel == "default" and not (input_root / novel).is_dir():
+            return [("default", input_root)]
+        return [(novel, input_root / novel)] if (input_root / novel).is_dir() else []
+    novel_dirs = sorted(p for p in input_root.iterdir() if p.is_dir())
+    if not novel_dirs:
+        return [("default", input_root)]
+    return [(nd.name, nd) for nd in novel_dirs]
+
+
+# ---------------------------------------------------------------------------
+# translate / resume
+# ---------------------------------------------------------------------------
+
+def cmd_translate(args: argparse.Namespace) -> int:
+    if getattr(args, "dry_run", False):
+        return cmd_plan(args)
+    from .pipeline import process_novel_session
+
+    input_root = Path(args.input)
+    output_root = _output_root(args)
+    output_root.mkdir(parents=True, exist_ok=True)
+
+    novels = novel_input_dirs(input_root, args.novel)
+    if args.novel and not novels:
+        print(f"Novel não encontrada em {input_root}/: {args.novel}")
+        return 1
+    if not any(any(d.glob("*.txt")) for _, d in novels):
+        print("Nenhum arquivo .txt encontrado em input/ — coloque arquivos e execute novamente.")
+        return 0
+    for name, novel_dir in novels:
+        if not any(novel_dir.glob("*.txt")):
+            print(f"\nNenhum arquivo .txt em input/{name} — pulando...")
+            continue
+        process_novel_session(
+            name,
+            novel_dir,
+            output_root,
+            Path.cwd(),
+            chapters=getattr(args, "chapters", None),
+            resume=args.resume,
+            parallel=getattr(args, "parallel", None),
+        )
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# plan
+# ---------------------------------------------------------------------------
+
+def cmd_plan(args: argparse.Namespace) -> int:
+    from .planner import format_plan, history_rates, host_throughputs, plan_novel
+
+    output_root = _output_root(args)
+    novels = [(n, d) for n, d in novel_input_dirs(Path(args.input), args.novel) if any(d.glob("*.txt"))]
+    if not novels:
+        print(f"Nenhum capítulo encontrado em {args.input}/")
+        return 1
+    rates = history_rates(output_root)
+    plans = [
+        plan_novel(name, novel_dir, output_root, chapters=getattr(args, "chapters", None), resume=args.resume, rates=rates)
+        for name, novel_dir in novels
+    ]
+    print(format_plan(plans, host_throughputs(output_root), rates))
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# watch
+# ---------------------------------------------------------------------------
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    # Mantém o modelo carregado no Ollama entre capítulos (lido na importação de src.backends).
+    os.environ.setdefault("OLLAMA_KEEP_ALIVE", "-1")
+    from .watcher import WATCH_POLL_SECONDS, WatchDaemon, make_watcher, warm_up_model
+
+    input_root = Path(args.input)
+    input_root.mkdir(parents=True, exist_ok=True)
+    output_root = _output_root(args)
+    output_root.mkdir(parents=True, exist_ok=True)
+    interval = args.interval or WATCH_POLL_SECONDS
+
+    if not args.no_warmup:
+        warm_up_model()
+    daemon = WatchDaemon(input_root, output_root, watcher=make_watcher(input_root, args.polling, interval))
+    daemon.run_forever(interval)
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# serve
+# ---------------------------------------------------------------------------
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    os.environ.setdefault("OLLAMA_KEEP_ALIVE", "-1")
+    from .service import SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, serve
+
+    output_root = _output_root(args)
+    output_root.mkdir(parents=True, exist_ok=True)
+    serve(
+        Path(args.input),
+        output_root,
+        host=args.host or SERVICE_HOST,
+        port=args.port or SERVICE_PORT,
+        workers=args.workers or SERVICE_WORKERS,
+    )
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# export
+# ---------------------------------------------------------------------------
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from .exporter import export_volume
+
+    novels = novel_input_dirs(Path(args.input), args.novel)
+    if not novels:
+        print(f"Novel não encontrada em {args.input}/: {args.novel}")
+        return 1
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    name, novel_dir = novels[0]
+    written = export_volume(name, str(novel_dir), str(_output_root(args)), formats=formats, volume_title=args.title)
+    return 0 if written else 1
+
+
+# ---------------------------------------------------------------------------
+# stats
+# ---------------------------------------------------------------------------
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    from .stats_ledger import ledger_path, read_stats_rows
+
+    output_root = _output_root(args)
+    if args.novel:
+        novels = [args.novel]
+    else:
+        novels = sorted(p.name for p in output_root.iterdir() if ledger_path(str(p)).exists()) if output_root.exists() else []
+    if not novels:
+        print(f"Nenhum ledger de estatísticas em {output_root}/")
+        return 1
+
+    status = 0
+    for novel in novels:
+        ledger = ledger_path(str(output_root / novel))
+        rows = read_stats_rows(str(ledger))
+        if not rows:
+            print(f"[{novel}] Sem estatísticas em {ledger}")
+            status = 1
+            continue
+        print(f"\n[{novel}] {len(rows)} capítulos ({ledger})")
+        print(f"  {'Capítulo':<32} {'Palavras':>9} {'Traduzidas':>10} {'Fidelidade':>10} {'Tempo (s)':>9}")
+        total_src = total_tgt = total_time = 0.0
+        for row in rows:
+            src = row.get("Palavras Originais") or 0
+            tgt = row.get("Palavras Traduzidas") or 0
+            secs = row.get("Tempo de Execução (s)") or 0
+            total_src, total_tgt, total_time = total_src + src, total_tgt + tgt, total_time + secs
+            fidelity = f"{tgt / src:.0%}" if src else "-"
+            print(f"  {str(row['Nome do Ficheiro'])[:32]:<32} {src:>9} {tgt:>10} {fidelity:>10} {secs:>9}")
+        fidelity = f"{total_tgt / total_src:.0%}" if total_src else "-"
+        print(f"  {'TOTAL':<32} {int(total_src):>9} {int(total_tgt):>10} {fidelity:>10} {total_time:>9.1f}")
+        reviewed = sum(row.get("Janelas Revisadas") or 0 for row in rows)
+        skipped = sum(row.get("Janelas sem Revisão (Glossário OK)") or 0 for row in rows)
+        if reviewed + skipped:
+            print(f"  Revisão semântica pulada em {int(skipped)}/{int(reviewed + skipped)} janelas "
+                  f"({skipped / (reviewed + skipped):.0%})")
+
+        if args.xlsx:
+            from .exporter import export_stats_excel
+            xlsx_path = output_root / novel / "stats_execucao.xlsx"
+            export_stats_excel(str(ledger), str(xlsx_path))
+            print(f"[{novel}] Estatísticas: {xlsx_path}")
+    return status
+
+
+# ---------------------------------------------------------------------------
+# bench
+# ---------------------------------------------------------------------------
+
+_BENCH_PARAGRAPH = (
+    "Rimuru olhou para a cidade de Tempest enquanto o sol nascia sobre a floresta. "
+    "\"Ainda há muito a fazer\", disse ele, e Shion assentiu em silêncio."
+)
+
+
+def _bench_stage(name: str, chars: int, fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    rate = chars / best / 1000 if best else float("inf")
+    print(f"  {name:<28} {best * 1000:>9.2f} ms {rate:>10.0f} kchars/s")
+    return best
+
+
+def _quiet(fn, *args, **kwargs):
+    # Os logs de progresso por chunk distorceriam a medição.
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    import tempfile
+
+    from . import backends, translator_core as core
+    from .exporter import iter_paragraphs, write_docx_stream
+    from .postprocess import postprocess
+
+    paragraphs = max(1, args.chars // (len(_BENCH_PARAGRAPH) + 2))
+    text = "\n\n".join(_BENCH_PARAGRAPH for _ in range(paragraphs))
+    print(f"Benchmark: {len(text)} caracteres, {paragraphs} parágrafos, melhor de {args.repeat}")
+
+    _bench_stage("chunking", len(text), lambda: core.chunk_text_by_paragraphs(text), args.repeat)
+    _bench_stage("pós-processamento", len(text), lambda: postprocess(text), args.repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        docx_path = str(Path(tmp) / "bench.docx")
+        _bench_stage("docx (stream)", len(text), lambda: write_docx_stream(iter_paragraphs(text), docx_path), args.repeat)
+
+    # Tradução completa sem revisão semântica; o backend stub mede só o overhead do pipeline.
+    backends.LLM_BACKEND = args.backend
+    if args.backend == "stub":
+        core.REQUEST_DELAY_SECONDS = 0
+    runs = args.repeat if args.backend == "stub" else 1
+    stats: dict = {}
+    try:
+        _bench_stage(
+            f"translate_text ({args.backend})",
+            len(text),
+            lambda: _quiet(core.translate_text, text, None, {}, enable_semantic_review=False, stats=stats),
+            runs,
+        )
+    except Exception as e:
+        print(f"  translate_text ({args.backend}) falhou: {e}")
+        return 1
+    print(f"  chunks por execução: {stats.get('Chunks Traduzidos', 0) // runs}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# tune
+# ---------------------------------------------------------------------------
+
+def _tuning_sample(input_root: Path, novel: Optional[str], max_chars: int) -> List[str]:
+    """First chapters of the novel up to `max_chars` (synthetic text when there are none)."""
+    from .document_loader import normalize_chapter_titles, normalize_stylistic_abbreviations, read_text_file
+    from .pipeline import chapter_sort_key
+
+    texts: List[str] = []
+    total = 0
+    for _, novel_dir in novel_input_dirs(input_root, novel)[:1]:
+        for f in sorted(novel_dir.glob("*.txt"), key=chapter_sort_key):
+            text, _ = normalize_chapter_titles(normalize_stylistic_abbreviations(read_text_file(str(f))))
+            texts.append(text[: max_chars - total])
+            total += len(texts[-1])
+            if total >= max_chars:
+                break
+    if not texts:
+        texts = ["\n\n".join(_BENCH_PARAGRAPH for _ in range(max(1, max_chars // (len(_BENCH_PARAGRAPH) + 2))))]
+    return texts
+
+
+def cmd_tune(args: argparse.Namespace) -> int:
+    from . import backends, translator_core as core
+    from .autotune import TUNING_CONFIG, save_tuning, sweep
+    from .perf_history import PERF_HOST
+
+    if args.backend:
+        backends.LLM_BACKEND = args.backend
+    if backends.LLM_BACKEND == "stub":
+        core.REQUEST_DELAY_SECONDS = 0
+    model = core.LARGE_TIER.model
+    texts = _tuning_sample(Path(args.input), args.novel, args.sample)
+    print(
+        f"Afinando {model} em {backends.LLM_BACKEND}: amostra de {sum(len(t) for t in texts)} caracteres "
+        f"({len(texts)} textos)"
+    )
+
+    def translate(text: str, stats: dict) -> str:
+        return _quiet(core.translate_text, text, None, {}, enable_semantic_review=False, stats=stats)
+
+    overhead = core.estimate_tokens(core.build_chunk_prompt("", {}))
+    report = sweep(
+        texts,
+        translate,
+        overhead,
+        tune_threads=backends.LLM_BACKEND == "ollama",
+        cpu_count=os.cpu_count() or 1,
+    )
+    best = report.best
+    print(
+        f"\nMelhor: chunk_size={best.profile.chunk_size} overlap={best.profile.overlap} "
+        f"num_ctx={best.profile.num_ctx or 'padrão'} num_thread={best.profile.num_thread or 'padrão'} "
+        f"concorrência={best.profile.concurrency} ({best.chars_per_second:,.0f} chars/s)"
+    )
+    if not best.acceptable:
+        print("Nenhuma configuração atingiu a fidelidade/taxa de retentativas mínimas; nada foi salvo.")
+        return 1
+    if args.dry_run:
+        return 0
+    save_tuning(model, best.profile, best.metrics())
+    print(f"Salvo em {TUNING_CONFIG} (host {PERF_HOST}, modelo {model})")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# check
+# ---------------------------------------------------------------------------
+
+# (módulo, obrigatório, finalidade)
+_DEPENDENCIES = (
+    ("dotenv", False, "leitura do .env"),
+    ("chardet", False, "detecção de encoding dos .txt"),
+    ("ollama", False, "backend ollama (LLM_BACKEND=ollama)"),
+    ("pandas", False, "planilha de estatísticas (stats --xlsx)"),
+    ("openpyxl", False, "planilha de estatísticas (stats --xlsx)"),
+    ("docx", False, "DOCX_WRITER=python-docx"),
+)
+
+
+def _check_line(ok: bool, message: str, required: bool = True) -> bool:
+    mark = "✓" if ok else ("✗" if required else "!")
+    print(f"  {mark} {message}")
+    return ok or not required
+
+
+def cmd_check(args: argparse.Namespace) -> int:
+    from importlib.util import find_spec
+
+    results = []
+    print("\n[1/4] Python")
+    results.append(_check_line(sys.version_info >= (3, 8), f"Python {sys.version.split()[0]} (>= 3.8)"))
+
+    print("\n[2/4] Dependências")
+    backend = os.environ.get("LLM_BACKEND", "ollama").lower()
+    for module, required, purpose in _DEPENDENCIES:
+        required = required or (module == "ollama" and backend == "ollama")
+        results.append(_check_line(find_spec(module) is not None, f"{module} — {purpose}", required))
+
+    print("\n[3/4] Configuração")
+    results.append(_check_line(
+        backend in ("ollama", "openai", "llamacpp", "stub"),
+        f"LLM_BACKEND={backend}",
+    ))
+    print(f"    OLLAMA_MODEL={os.environ.get('OLLAMA_MODEL', 'qwen2.5:7b')}")
+    if backend == "ollama":
+        print(f"    OLLAMA_BASE_URL={os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11434')}")
+    elif backend in ("openai", "llamacpp"):
+        print(f"    OPENAI_BASE_URL={os.environ.get('OPENAI_BASE_URL', 'http://localhost:8000/v1')}")
+    config_file = Path(__file__).resolve().parent.parent / "config" / "term_extraction.json"
+    results.append(_check_line(config_file.is_file(), "config/term_extraction.json"))
+
+    print("\n[4/4] Diretórios")
+    input_root = Path(args.input)
+    novels = novel_input_dirs(input_root)
+    chapters = sum(len(list(d.glob("*.txt"))) for _, d in novels)
+    results.append(_check_line(input_root.is_dir(), f"{input_root}/ ({len(novels)} novels, {chapters} capítulos)", required=False))
+    output_root = _output_root(args)
+    try:
+        output_root.mkdir(parents=True, exist_ok=True)
+        writable = os.access(output_root, os.W_OK)
+    except OSError:
+        writable = False
+    results.append(_check_line(writable, f"{output_root}/ gravável"))
+
+    if args.ping:
+        from .backends import get_backend
+        model = os.environ.get("OLLAMA_MODEL", "qwen2.5:7b")
+        start = time.perf_counter()
+        try:
+            get_backend(backend).generate("Responda apenas: OK", model, num_predict=4, timeout=30)
+            results.append(_check_line(True, f"{backend} respondeu em {time.perf_counter() - start:.1f}s"))
+        except Exception as e:
+            results.append(_check_line(False, f"{backend} não respondeu: {e}"))
+
+    ok = all(results)
+    print("\n" + ("✓ SISTEMA PRONTO PARA TRADUÇÃO!" if ok else "✗ PROBLEMAS DETECTADOS — veja os itens marcados com ✗"))
+    return 0 if ok else 1
+
+
+# ---------------------------------------------------------------------------
+# parser
+# ---------------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="NLP - Neural Localization Processor")
+    parser.add_argument("--input", default="input", help="diretório de entrada (padrão: input)")
+    parser.add_argument("--output", default=None, help="diretório de saída (padrão: OUTPUT_DIR ou ./output)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="medir memória (tracemalloc + RSS) por etapa e capítulo (igual a MEMORY_PROFILE=1)")
+    sub = parser.add_subparsers(dest="command", metavar="comando")
+
+    p = sub.add_parser("translate", help="traduzir novels/capítulos")
+    p.add_argument("novel", nargs="?", help="nome da novel (subpasta de input/); todas se omitido")
+    p.add_argument("chapters", nargs="*", help="capítulos (nome, nome sem extensão ou padrão glob)")
+    p.add_argument("--resume", action="store_true", help="pular capítulos já traduzidos")
+    p.add_argument("--dry-run", action="store_true", help="só estimar chamadas, tokens e tempo (igual a `plan`)")
+    p.add_argument("--parallel", type=int, default=None, metavar="N",
+                   help="traduzir N capítulos ao mesmo tempo com continuidade do original (padrão: PARALLEL_CHAPTERS)")
+    p.set_defaults(func=cmd_translate)
+
+    p = sub.add_parser("resume", help="continuar a tradução, pulando capítulos já traduzidos")
+    p.add_argument("novel", nargs="?", help="nome da novel; todas se omitido")
+    p.add_argument("--parallel", type=int, default=None, metavar="N", help="como em `translate`")
+    p.set_defaults(func=cmd_translate, resume=True)
+
+    p = sub.add_parser("plan", help="estimar chamadas, tokens e tempo sem chamar o modelo")
+    p.add_argument("novel", nargs="?", help="nome da novel; todas se omitido")
+    p.add_argument("chapters", nargs="*", help="capítulos (nome, nome sem extensão ou padrão glob)")
+    p.add_argument("--resume", action="store_true", help="considerar só capítulos ainda não traduzidos")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("watch", help="traduzir capítulos conforme chegam em input/")
+    p.add_argument("--polling", action="store_true", help="usar polling em vez de inotify")
+    p.add_argument("--interval", type=float, default=0, help="intervalo de varredura em segundos (padrão: WATCH_POLL_SECONDS)")
+    p.add_argument("--no-warmup", action="store_true", help="não pré-carregar o modelo ao iniciar")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("serve", help="serviço HTTP local com fila de jobs")
+    p.add_argument("--host", default="", help="endereço (padrão: SERVICE_HOST ou 127.0.0.1)")
+    p.add_argument("--port", type=int, default=0, help="porta (padrão: SERVICE_PORT ou 8765)")
+    p.add_argument("--workers", type=int, default=0, help="workers (padrão: SERVICE_WORKERS ou 2)")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("export", help="exportar volume (EPUB/DOCX/TXT) dos capítulos traduzidos")
+    p.add_argument("novel")
+    p.add_argument("--formats", default="epub", help="formatos separados por vírgula (epub,docx,txt)")
+    p.add_argument("--title", default="", help="título do volume (padrão: nome da novel)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("stats", help="mostrar estatísticas do ledger por capítulo")
+    p.add_argument("novel", nargs="?", help="nome da novel; todas se omitido")
+    p.add_argument("--xlsx", action="store_true", help="gerar também stats_execucao.xlsx (requer pandas)")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("bench", help="medir throughput do pipeline")
+    p.add_argument("--chars", type=int, default=200_000, help="tamanho do texto sintético")
+    p.add_argument("--repeat", type=int, default=3, help="repetições por etapa (vale o melhor tempo)")
+    p.add_argument("--backend", default="stub", help="backend da etapa de tradução (padrão: stub)")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("tune", help="afinar chunk_size, num_ctx, threads e concorrência para o modelo neste host")
+    p.add_argument("novel", nargs="?", help="novel de onde tirar a amostra (padrão: a primeira em input/)")
+    p.add_argument("--sample", type=int, default=30_000, help="tamanho da amostra em caracteres")
+    p.add_argument("--backend", default="", help="backend (padrão: LLM_BACKEND; 'stub' para testar o pipeline)")
+    p.add_argument("--dry-run", action="store_true", help="só medir, sem salvar")
+    p.set_defaults(func=cmd_tune)
+
+    p = sub.add_parser("check", help="verificar ambiente e configuração")
+    p.add_argument("--ping", action="store_true", help="enviar uma requisição de teste ao backend")
+    p.set_defaults(func=cmd_check)
+    return parser
+
+
+# Opções globais (antes do subcomando) que recebem um valor
+GLOBAL_VALUE_OPTIONS = ("--input", "--output")
+
+
+def with_default_command(argv: List[str]) -> List[str]:
+    """`argv` with "translate" inserted when no subcommand is given (the old invocation).
+
+    `main.py`, `main.py nov` and `main.py --input x nov 01.txt` become the
+    `translate` equivalents; the command goes in front of the first argument
+    that is not a global option.
+    """
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in GLOBAL_VALUE_OPTIONS:
+            i += 2
+        elif arg == "--profile-memory" or arg.split("=", 1)[0] in GLOBAL_VALUE_OPTIONS:
+            i += 1
+        else:
+            break
+    if i < len(argv) and argv[i] in COMMANDS + ("-h", "--help"):
+        return argv
+    return argv[:i] + ["translate"] + argv[i:]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = with_default_command(list(sys.argv[1:] if argv is None else argv))
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    _load_env()
+    if args.profile_memory:
+        # Lido na importação de src/memory_profile.py, que só acontece dentro dos comandos
+        os.environ["MEMORY_PROFILE"] = "1"
+    return args.func(args) or 0
@@ -0,0 +1,214 @@
+"""Retrieval of previous-chapter passages for prompt context (BM25).
+
+Each translated chapter is split into aligned source/translation passages
+(paragraphs) and appended to `context_index.jsonl` in the novel's session
+directory. The inverted index is rebuilt in memory on load and extended
+incrementally after every chapter, so each chunk's prompt only carries the
+top-k passages that share entities/keywords with it, within a token budget,
+no matter how many chapters came before.
+"""
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .perf_history import estimate_tokens
+
+# Quantidade máxima de passagens e orçamento (tokens estimados) do bloco de contexto.
+CONTEXT_TOP_K = int(os.environ.get("CONTEXT_TOP_K", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "800"))
+
+# Termos de consulta considerados por chunk (os de maior IDF).
+MAX_QUERY_TERMS = 40
+
+# Parâmetros padrão do BM25.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+WORD_RE = re.compile(r"\w+")
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in PARAGRAPH_SPLIT_RE.split(text) if p.strip()]
+
+
+def _tokenize(text: str) -> List[str]:
+    return [w.lower() for w in WORD_RE.findall(text) if len(w) >= 3]
+
+
+def align_paragraphs(source: str, translated: str) -> List[Tuple[str, str]]:
+    """Pair source and translated paragraphs proportionally (1:1 when counts match)."""
+    src = split_paragraphs(source)
+    tgt = split_paragraphs(translated)
+    if not src:
+        return []
+    pairs = []
+    ns, nt = len(src), len(tgt)
+    for i, para in enumerate(src):
+        lo, hi = (i * nt) // ns, ((i + 1) * nt) // ns
+        pairs.append((para, "\n".join(tgt[lo:hi])))
+    return pairs
+
+
+class ContextIndex:
+    """BM25 inverted index over the passages of previously translated chapters."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._reset(self._load())
+
+    def _reset(self, records: List[Dict[str, str]]) -> None:
+        self.passages: List[Dict[str, str]] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: List[int] = []
+        self.chapters: Set[str] = set()
+        self._total_length = 0
+        for record in records:
+            self._index(record)
+
+    def _load(self) -> List[Dict[str, str]]:
+        """Records on disk; a chapter that reappears later in the file keeps only its latest block."""
+        blocks: Dict[str, List[Dict[str, str]]] = {}
+        previous = None
+        for record in self._read():
+            chapter = record.get("chapter", "")
+            if chapter != previous:
+                # Capítulo reindexado por uma versão antiga (só anexava): vale o bloco mais recente
+                blocks.pop(chapter, None)
+                blocks[chapter] = []
+                previous = chapter
+            blocks[chapter].append(record)
+        return [record for block in blocks.values() for record in block]
+
+    def _read(self) -> Iterator[Dict[str, str]]:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def _index(self, record: Dict[str, str]) -> None:
+        doc_id = len(self.passages)
+        self.passages.append(record)
+        tokens = _tokenize(record.get("source", "") + " " + record.get("target", ""))
+        tf: Dict[str, int] = {}
+        for tok in tokens:
+            tf[tok] = tf.get(tok, 0) + 1
+        for tok, count in tf.items():
+            self.postings.setdefault(tok, {})[doc_id] = count
+        self.doc_lengths.append(len(tokens))
+        self.chapters.add(record.get("chapter", ""))
+        self._total_length += len(tokens)
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def add_chapter(self, chapter: str, source_text: str, translated_text: str) -> int:
+        """Index a finished chapter and append its passages to disk. Returns passages added.
+
+        A chapter that is already indexed (resume, watch mode, consistency
+        re-runs) has its passages replaced: the file is rewritten and the
+        postings rebuilt, so BM25 never sees two copies of one chapter.
+        """
+        records = [
+            {"chapter": chapter, "source": src, "target": tgt}
+            for src, tgt in align_paragraphs(source_text, translated_text)
+        ]
+        if chapter in self.chapters:
+            kept = [p for p in self.passages if p.get("chapter") != chapter] + records
+            self._rewrite(kept)
+            self._reset(kept)
+            return len(records)
+        if not records:
+            return 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for record in records:
+            self._index(record)
+        return len(records)
+
+    def _rewrite(self, records: List[Dict[str, str]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.passages)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: int = CONTEXT_TOP_K) -> List[Tuple[float, int]]:
+        """Return up to `top_k` (score, passage_id) pairs, best first.
+
+        Capitalized query words (names, places, skills) count double.
+        """
+        if not self.passages:
+            return []
+        weights: Dict[str, float] = {}
+        for word in WORD_RE.findall(query):
+            if len(word) < 3:
+                continue
+            tok = word.lower()
+            if tok not in self.postings:
+                continue
+            weight = 2.0 if word[0].isupper() else 1.0
+            weights[tok] = max(weights.get(tok, 0.0), weight)
+        terms = sorted(weights, key=lambda t: self._idf(t) * weights[t], reverse=True)[:MAX_QUERY_TERMS]
+
+        avgdl = self._total_length / len(self.passages) or 1.0
+        scores: Dict[int, float] = {}
+        for term in terms:
+            idf = self._idf(term) * weights[term]
+            for doc_id, tf in self.postings[term].items():
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        ranked = sorted(((score, doc_id) for doc_id, score in scores.items()), reverse=True)
+        return ranked[:top_k]
+
+    def build_context(
+        self,
+        query: str,
+        top_k: int = CONTEXT_TOP_K,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+    ) -> str:
+        """Render the best passages for `query` as a prompt block within `token_budget`."""
+        blocks = []
+        used = 0
+        for _, doc_id in self.search(query, top_k=top_k):
+            record = self.passages[doc_id]
+            block = (
+                f"[{record.get('chapter', '')}]\n"
+                f"Original: {record.get('source', '')}\n"
+                f"Tradução: {record.get('target', '')}"
+            )
+            cost = estimate_tokens(block)
+            if used + cost > token_budget:
+                continue
+            blocks.append(block)
+            used += cost
+        return "\n\n".join(blocks)
+
+
+def open_context_index(novel_name: str, base_dir: str = ".") -> ContextIndex:
+    """Open the retrieval index stored in the novel's session glossary directory."""
+    return ContextIndex(str(Path(base_dir) / "glossary" / novel_name / "context_index.jsonl"))
+
+
+def format_context_block(context: Optional[str]) -> str:
+    if not context:
+        return ""
+    return (
+        "\nCONTEXTO DE CAPÍTULOS ANTERIORES (apenas referência de continuidade - NÃO traduza nem repita):\n"
+        f"{context}\n"
+    )
@@ -0,0 +1,141 @@
+"""Source-side continuity for translating the chapters of a novel in parallel.
+
+The sequential loop gives each chapter the translations of earlier chapters
+(retrieved through `ContextIndex`), so chapter N waits for N-1. Everything
+here comes from data available before any chapter is translated:
+
+- an entity table (characters from the term store, with their target name
+  and gender), filtered to the names that occur in each chunk;
+- short extractive summaries of the previous *source* chapters;
+- passages already in the retrieval index from earlier runs.
+
+`SourceContinuity.build_context` duck-types `ContextIndex.build_context`, so
+`translate_text` takes it in place of the index without a new prompt slot.
+"""
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .context_index import CONTEXT_TOKEN_BUDGET
+from .glossary_matcher import AhoCorasick
+from .perf_history import estimate_tokens
+
+# Capítulos anteriores resumidos por capítulo e frases por resumo
+CONTINUITY_SUMMARIES = int(os.environ.get("CONTINUITY_SUMMARIES", "2"))
+CONTINUITY_SUMMARY_SENTENCES = int(os.environ.get("CONTINUITY_SUMMARY_SENTENCES", "3"))
+
+SENTENCE_RE = re.compile(r"[^.!?。！？\n]+[.!?。！？]*")
+WORD_RE = re.compile(r"\w+")
+
+# Tipos do terms.db que entram na tabela de entidades
+ENTITY_TYPES = ("character", "personagem")
+
+
+def extractive_summary(text: str, max_sentences: int = CONTINUITY_SUMMARY_SENTENCES) -> str:
+    """The `max_sentences` most central sentences of `text`, in their original order.
+
+    Sentences are scored by the mean document frequency of their words (3+
+    letters), which favours sentences about the chapter's recurring names and
+    events over incidental ones.
+    """
+    sentences = [s.strip() for s in SENTENCE_RE.findall(text) if len(s.strip()) > 1]
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+    words = [[w.lower() for w in WORD_RE.findall(s) if len(w) >= 3] for s in sentences]
+    frequency = Counter(w for ws in words for w in ws)
+
+    def score(i: int) -> float:
+        ws = words[i]
+        return sum(frequency[w] for w in ws) / len(ws) if ws else 0.0
+
+    best = sorted(sorted(range(len(sentences)), key=score, reverse=True)[:max_sentences])
+    return " ".join(sentences[i] for i in best)
+
+
+@dataclass(frozen=True)
+class Entity:
+    source: str
+    target: str
+    gender: str = ""
+    type: str = ""
+
+    def __str__(self) -> str:
+        details = ", ".join(p for p in (self.type, self.gender) if p)
+        return f"{self.source} -> {self.target}" + (f" ({details})" if details else "")
+
+
+class EntityTable:
+    """Known characters, looked up by the names occurring in a passage."""
+
+    def __init__(self, entities: Iterable[Entity]):
+        self.entities = [e for e in entities if e.source]
+        self._automaton = AhoCorasick([e.source for e in self.entities])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> "EntityTable":
+        """Build from term store rows (`GlossaryStore.iter_terms`)."""
+        return cls(
+            Entity(row["source_term"], row["target_term"], row.get("gender") or "", row.get("type") or "")
+            for row in rows
+            if row.get("type") in ENTITY_TYPES
+        )
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def mentioned_in(self, text: str) -> List[Entity]:
+        return [self.entities[i] for i in sorted(self._automaton.found(text))]
+
+
+class SourceContinuity:
+    """Context source for one chapter: entities in the chunk, previous-chapter summaries
+    and (optionally) passages retrieved from chapters translated in earlier runs."""
+
+    def __init__(
+        self,
+        summaries: Sequence[Tuple[str, str]],
+        entities: EntityTable,
+        context_index=None,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+    ):
+        self.summaries = list(summaries)
+        self.entities = entities
+        self.context_index = context_index
+        self.token_budget = token_budget
+
+    def build_context(self, chunk: str) -> str:
+        parts = []
+        mentioned = self.entities.mentioned_in(chunk)
+        if mentioned:
+            parts.append("[personagens]\n" + "\n".join(str(e) for e in mentioned))
+        for chapter, summary in self.summaries:
+            parts.append(f"[resumo de {chapter} (original)]\n{summary}")
+        used = sum(estimate_tokens(p) for p in parts)
+        if self.context_index is not None and used < self.token_budget:
+            retrieved = self.context_index.build_context(chunk, token_budget=self.token_budget - used)
+            if retrieved:
+                parts.append(retrieved)
+        return "\n\n".join(parts)
+
+
+def build_continuity(
+    chapters: Sequence[Tuple[str, str]],
+    entities: EntityTable,
+    context_index=None,
+    previous: int = CONTINUITY_SUMMARIES,
+) -> Dict[str, SourceContinuity]:
+    """Continuity per chapter name from `chapters` = [(name, source text)] in reading order."""
+    summaries = [(name, extractive_summary(text)) for name, text in chapters]
+    result = {}
+    for i, (name, _) in enumerate(chapters):
+        before = [s for s in summaries[max(0, i - previous):i] if s[1]]
+        result[name] = SourceContinuity(before, entities, context_index)
+    return result
+
+
+def longest_first(texts: Dict[str, str], names: Optional[Iterable[str]] = None) -> List[str]:
+    """Scheduling order: the longest chapters start first so the batch ends evenly."""
+    names = list(texts) if names is None else list(names)
+    return sorted(names, key=lambda n: len(texts[n]), reverse=True)
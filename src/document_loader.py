@@ -1,5 +1,4 @@
 from pathlib import Path
-import chardet
 from typing import Optional, Tuple
 import re
 
@@ -21,8 +20,9 @@ def read_text_file(path: str, fallback_encoding: str = "utf-8") -> str:
         raise FileNotFoundError(f"File not found: {path}")
 
     raw = p.read_bytes()
-    # Try detection
+    # Try detection (chardet is imported here so CLI commands that never read input start fast)
     try:
+        import chardet
         detected = chardet.detect(raw)
         encoding = detected.get("encoding") or fallback_encoding
     except Exception:
@@ -1,9 +1,173 @@
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Tuple, Union
+import os
+import re
 import time
+import zipfile
+from xml.sax.saxutils import escape
 
-from docx import Document
-import pandas as pd
+# "stream" (padrão): WordprocessingML escrito direto no zip; "python-docx": caminho antigo
+DOCX_WRITER = os.environ.get("DOCX_WRITER", "stream").lower()
+
+DOCX_SUFFIX = " - [Traduzido - Revisado].docx"
+
+# Um parágrafo é um texto simples (estilo Normal) ou uma tupla (estilo, texto), ex: ("Heading1", "Capítulo 1")
+Paragraph = Union[str, Tuple[str, str]]
+
+# Caracteres de controle não permitidos em XML 1.0
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Tamanho do buffer antes de escrever no stream do zip
+_WRITE_BUFFER_CHARS = 64 * 1024
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '</Types>'
+)
+
+_PACKAGE_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '</Relationships>'
+)
+
+_DOCUMENT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_CORE_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:title>{title}</dc:title>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{created}</dcterms:created>'
+    '</cp:coreProperties>'
+)
+
+# Template fixo de estilos: Normal, Title e Heading1
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:docDefaults><w:rPrDefault><w:rPr>'
+    '<w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="Calibri" w:cs="Calibri"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/><w:lang w:val="pt-BR"/>'
+    '</w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="160" w:line="259" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+    '<w:next w:val="Normal"/><w:qFormat/><w:pPr><w:jc w:val="center"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="48"/><w:szCs w:val="48"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/>'
+    '<w:next w:val="Normal"/><w:qFormat/><w:pPr><w:keepNext/><w:pageBreakBefore/>'
+    '<w:spacing w:before="240" w:after="240"/><w:outlineLvl w:val="0"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="32"/><w:szCs w:val="32"/></w:rPr></w:style>'
+    '</w:styles>'
+)
+
+_DOCUMENT_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+
+_DOCUMENT_TAIL = (
+    '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+    '<w:pgMar w:top="1417" w:right="1701" w:bottom="1417" w:left="1701" w:header="708" w:footer="708" w:gutter="0"/>'
+    '</w:sectPr></w:body></w:document>'
+)
+
+
+def _xml_text(text: str) -> str:
+    return escape(_INVALID_XML_RE.sub("", text))
+
+
+def _paragraph_xml(paragraph: Paragraph) -> str:
+    if isinstance(paragraph, tuple):
+        style, text = paragraph
+        ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>'
+    else:
+        text, ppr = paragraph, ""
+    if not text:
+        return f"<w:p>{ppr}</w:p>"
+    # Quebras de linha simples dentro do parágrafo viram <w:br/>
+    runs = "<w:br/>".join(f'<w:t xml:space="preserve">{_xml_text(line)}</w:t>' for line in text.split("\n"))
+    return f"<w:p>{ppr}<w:r>{runs}</w:r></w:p>"
+
+
+def iter_paragraphs(text: str, separator: str = "\n\n") -> Iterator[str]:
+    """Yield stripped paragraphs from `text` without building the whole split list."""
+    pos = 0
+    while True:
+        idx = text.find(separator, pos)
+        if idx == -1:
+            yield text[pos:].strip()
+            return
+        yield text[pos:idx].strip()
+        pos = idx + len(separator)
+
+
+def write_docx_stream(paragraphs: Iterable[Paragraph], output_path: str, title: str = "") -> str:
+    """Write a .docx by streaming WordprocessingML into the zip, one paragraph at a time.
+
+    Uses a fixed styles template (Normal/Title/Heading1), so memory stays flat
+    regardless of document size and python-docx is not needed.
+    """
+    out = Path(output_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(str(out), "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES_XML)
+        zf.writestr("_rels/.rels", _PACKAGE_RELS_XML)
+        zf.writestr("word/_rels/document.xml.rels", _DOCUMENT_RELS_XML)
+        zf.writestr("word/styles.xml", _STYLES_XML)
+        zf.writestr(
+            "docProps/core.xml",
+            _CORE_XML.format(title=_xml_text(title), created=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())),
+        )
+        with zf.open("word/document.xml", "w") as fh:
+            fh.write(_DOCUMENT_HEAD.encode("utf-8"))
+            buffer: List[str] = []
+            size = 0
+            for paragraph in paragraphs:
+                xml = _paragraph_xml(paragraph)
+                buffer.append(xml)
+                size += len(xml)
+                if size >= _WRITE_BUFFER_CHARS:
+                    fh.write("".join(buffer).encode("utf-8"))
+                    buffer, size = [], 0
+            buffer.append(_DOCUMENT_TAIL)
+            fh.write("".join(buffer).encode("utf-8"))
+    return str(out)
+
+
+def _write_docx_python_docx(paragraphs: Iterable[str], output_path: str) -> str:
+    from docx import Document
+
+    doc = Document()
+    for para in paragraphs:
+        doc.add_paragraph(para)
+    doc.save(output_path)
+    return output_path
 
 
 def create_docx(chapter_filename: str, translated_text: str, output_dir: str) -> str:
@@ -11,19 +175,225 @@ def create_docx(chapter_filename: str, translated_text: str, output_dir: str) ->
     p = Path(output_dir)
     p.mkdir(parents=True, exist_ok=True)
     name = Path(chapter_filename).stem
-    out_name = f"{name} - [Traduzido - Revisado].docx"
+    out_name = f"{name}{DOCX_SUFFIX}"
     out_path = p / out_name
 
-    doc = Document()
-    # Simple split paragraphs
-    for para in translated_text.split('\n\n'):
-        doc.add_paragraph(para.strip())
-
-    doc.save(str(out_path))
+    if DOCX_WRITER == "python-docx":
+        _write_docx_python_docx(iter_paragraphs(translated_text), str(out_path))
+    else:
+        write_docx_stream(iter_paragraphs(translated_text), str(out_path), title=name)
     print(f"Escrevendo DOCX: {out_path}")
     return str(out_path)
 
 
+# ============================================================================
+# EXPORTAÇÃO POR VOLUME (EPUB / DOCX / TXT mesclados)
+# ============================================================================
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def translation_cache_path(novel_output_dir: str, chapter_filename: str) -> Path:
+    """Where the translated text of a chapter is cached (session/translations/<stem>.txt)."""
+    return Path(novel_output_dir) / "session" / "translations" / f"{Path(chapter_filename).stem}.txt"
+
+
+def save_chapter_translation(novel_output_dir: str, chapter_filename: str, translated_text: str) -> str:
+    """Cache a chapter's translation so volume exports never need the model again."""
+    p = translation_cache_path(novel_output_dir, chapter_filename)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(translated_text, encoding="utf-8")
+    return str(p)
+
+
+def _iter_docx_paragraphs(path: Path) -> Iterator[str]:
+    """Stream paragraph texts out of an existing .docx (fallback for chapters without cache)."""
+    import xml.etree.ElementTree as ET
+
+    with zipfile.ZipFile(str(path)) as zf, zf.open("word/document.xml") as fh:
+        parts: List[str] = []
+        for event, elem in ET.iterparse(fh, events=("end",)):
+            if elem.tag == f"{_W_NS}t":
+                parts.append(elem.text or "")
+            elif elem.tag == f"{_W_NS}br":
+                parts.append("\n")
+            elif elem.tag == f"{_W_NS}p":
+                yield "".join(parts).strip()
+                parts = []
+                elem.clear()
+
+
+def iter_chapter_translation(novel_output_dir: str, chapter_filename: str) -> Iterator[str]:
+    """Yield the paragraphs of a translated chapter from the cache or, failing that, its DOCX."""
+    cached = translation_cache_path(novel_output_dir, chapter_filename)
+    if cached.exists():
+        yield from iter_paragraphs(cached.read_text(encoding="utf-8"))
+        return
+    docx_path = Path(novel_output_dir) / f"{Path(chapter_filename).stem}{DOCX_SUFFIX}"
+    if docx_path.exists():
+        yield from _iter_docx_paragraphs(docx_path)
+
+
+def has_chapter_translation(novel_output_dir: str, chapter_filename: str) -> bool:
+    return (
+        translation_cache_path(novel_output_dir, chapter_filename).exists()
+        or (Path(novel_output_dir) / f"{Path(chapter_filename).stem}{DOCX_SUFFIX}").exists()
+    )
+
+
+def _volume_chapters(input_dir: str, novel_output_dir: str) -> List[Tuple[str, str]]:
+    """Return (chapter_filename, title) for every translated chapter, in processing order.
+
+    Chapters follow `pipeline.select_chapters` ("2.txt" before "10.txt") and
+    titles come from `pipeline.normalize_source`, as in the per-chapter output;
+    the file stem is the fallback.
+    """
+    from .document_loader import read_text_file
+    from .pipeline import normalize_source, select_chapters
+
+    chapters = []
+    for f in select_chapters(Path(input_dir).glob("*.txt")):
+        if not has_chapter_translation(novel_output_dir, f.name):
+            print(f"  Aviso: {f.name} ainda não foi traduzido — fora do volume.")
+            continue
+        _, title = normalize_source(read_text_file(str(f)))
+        chapters.append((f.name, title or f.stem))
+    return chapters
+
+
+_XHTML_HEAD = (
+    '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+    '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+    'lang="pt-BR" xml:lang="pt-BR"><head><meta charset="utf-8"/><title>{title}</title></head><body>'
+)
+
+
+def _write_epub(path: Path, book_title: str, chapters: List[Tuple[str, str]], novel_output_dir: str) -> str:
+    import uuid
+
+    book_id = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, book_title)}"
+    with zipfile.ZipFile(str(path), "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        # O mimetype deve ser a primeira entrada, sem compressão.
+        zf.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        zf.writestr(
+            "META-INF/container.xml",
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>',
+        )
+        # Capítulos: um XHTML por capítulo, escrito parágrafo a parágrafo.
+        for i, (chapter_filename, title) in enumerate(chapters, 1):
+            with zf.open(f"OEBPS/chap{i:04d}.xhtml", "w") as fh:
+                fh.write(_XHTML_HEAD.format(title=_xml_text(title)).encode("utf-8"))
+                fh.write(f"<h1>{_xml_text(title)}</h1>".encode("utf-8"))
+                for para in iter_chapter_translation(novel_output_dir, chapter_filename):
+                    if para:
+                        fh.write(f"<p>{_xml_text(para).replace(chr(10), '<br/>')}</p>\n".encode("utf-8"))
+                fh.write(b"</body></html>")
+
+        nav_items = "".join(
+            f'<li><a href="chap{i:04d}.xhtml">{_xml_text(title)}</a></li>' for i, (_, title) in enumerate(chapters, 1)
+        )
+        zf.writestr(
+            "OEBPS/nav.xhtml",
+            _XHTML_HEAD.format(title="Sumário")
+            + f'<nav epub:type="toc" id="toc"><h1>Sumário</h1><ol>{nav_items}</ol></nav></body></html>',
+        )
+        nav_points = "".join(
+            f'<navPoint id="np{i}" playOrder="{i}"><navLabel><text>{_xml_text(title)}</text></navLabel>'
+            f'<content src="chap{i:04d}.xhtml"/></navPoint>'
+            for i, (_, title) in enumerate(chapters, 1)
+        )
+        zf.writestr(
+            "OEBPS/toc.ncx",
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">'
+            f'<head><meta name="dtb:uid" content="{book_id}"/></head>'
+            f"<docTitle><text>{_xml_text(book_title)}</text></docTitle>"
+            f"<navMap>{nav_points}</navMap></ncx>",
+        )
+        manifest = "".join(
+            f'<item id="chap{i:04d}" href="chap{i:04d}.xhtml" media-type="application/xhtml+xml"/>'
+            for i in range(1, len(chapters) + 1)
+        )
+        spine = "".join(f'<itemref idref="chap{i:04d}"/>' for i in range(1, len(chapters) + 1))
+        zf.writestr(
+            "OEBPS/content.opf",
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="bookid">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="bookid">{book_id}</dc:identifier>'
+            f"<dc:title>{_xml_text(book_title)}</dc:title><dc:language>pt-BR</dc:language>"
+            f'<meta property="dcterms:modified">{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}</meta>'
+            "</metadata><manifest>"
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+            '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>'
+            f'{manifest}</manifest><spine toc="ncx">{spine}</spine></package>',
+        )
+    return str(path)
+
+
+def _iter_volume_docx(chapters: List[Tuple[str, str]], novel_output_dir: str, book_title: str) -> Iterator[Paragraph]:
+    yield ("Title", book_title)
+    for chapter_filename, title in chapters:
+        yield ("Heading1", title)
+        yield from iter_chapter_translation(novel_output_dir, chapter_filename)
+
+
+def export_volume(
+    novel_name: str,
+    input_dir: str,
+    output_dir: str,
+    formats: Iterable[str] = ("epub",),
+    volume_title: str = "",
+) -> List[str]:
+    """Merge every translated chapter of a novel, in order, into EPUB/DOCX/TXT files.
+
+    Chapters are read one at a time from the translation cache (or their DOCX)
+    and streamed into the output archives, so no LLM calls are made and the
+    whole book is never held in memory. Returns the written paths.
+    """
+    novel_output_dir = str(Path(output_dir) / novel_name)
+    chapters = _volume_chapters(input_dir, novel_output_dir)
+    if not chapters:
+        print(f"[{novel_name}] Nenhum capítulo traduzido para exportar.")
+        return []
+    book_title = volume_title or novel_name
+    base = Path(novel_output_dir) / f"{book_title} - [Traduzido - Volume]"
+    written = []
+    for fmt in formats:
+        fmt = fmt.lower().lstrip(".")
+        out = base.with_suffix(f".{fmt}")
+        if fmt == "epub":
+            written.append(_write_epub(out, book_title, chapters, novel_output_dir))
+        elif fmt == "docx":
+            written.append(write_docx_stream(_iter_volume_docx(chapters, novel_output_dir, book_title), str(out), title=book_title))
+        elif fmt == "txt":
+            with out.open("w", encoding="utf-8") as fh:
+                for chapter_filename, title in chapters:
+                    fh.write(f"{title}\n\n")
+                    for para in iter_chapter_translation(novel_output_dir, chapter_filename):
+                        fh.write(para + "\n\n")
+            written.append(str(out))
+        else:
+            raise ValueError(f"Formato de volume desconhecido: {fmt} (use epub, docx ou txt)")
+        print(f"[{novel_name}] Volume exportado: {out} ({len(chapters)} capítulos)")
+    return written
+
+
+def _percent_labels(df, numerator: str, denominator: str, threshold: float, flag: str):
+    """Vectorized 'xx.x%' labels, flagged below `threshold`; '0%' where the denominator is zero."""
+    import numpy as np
+    import pandas as pd
+
+    den = pd.to_numeric(df[denominator], errors="coerce").fillna(0)
+    num = pd.to_numeric(df[numerator], errors="coerce").fillna(0)
+    pct = (num / den.where(den > 0) * 100).round(1)
+    label = pct.astype(str) + "%"
+    return np.where(den > 0, np.where(pct < threshold, label + flag, label), "0%")
+
+
 def write_stats_excel(rows: List[Dict], output_path: str) -> str:
     """
     Write execution stats to Excel with 'Fidelidade de Volume' and '% de Retenção' metrics.
@@ -33,39 +403,25 @@ def write_stats_excel(rows: List[Dict], output_path: str) -> str:
     
     Threshold: 90% minimum (changed from 85% for senior localization standard)
     If Retenção < 90%, a warning is emitted indicating possible summarization.
+    
+    On-demand export: pandas/openpyxl are imported only here. Rows usually come
+    from the per-chapter ledger (`stats_ledger.read_stats_rows`).
     """
+    import pandas as pd
+
     df = pd.DataFrame(rows)
     
-    # Calculate Fidelidade de Volume (%) using word counts
+    # Calculate Fidelidade de Volume (%) using word counts (85% threshold flags summarization)
     if "Palavras Originais" in df.columns and "Palavras Traduzidas" in df.columns:
-        def calc_fidelidade(row):
-            orig = row.get("Palavras Originais", 0)
-            trad = row.get("Palavras Traduzidas", 0)
-            if orig > 0:
-                fidelidade = round((trad / orig) * 100, 1)
-                # Flag if summarization detected (85% threshold)
-                if fidelidade < 85:
-                    return f"{fidelidade}% ⚠️ POSSÍVEL RESUMO"
-                return f"{fidelidade}%"
-            return "0%"
-        
-        df["Fidelidade de Volume"] = df.apply(calc_fidelidade, axis=1)
+        df["Fidelidade de Volume"] = _percent_labels(
+            df, "Palavras Traduzidas", "Palavras Originais", 85, " ⚠️ POSSÍVEL RESUMO"
+        )
     
-    # Calculate % de Retenção (%) using character counts - NEW METRIC
-    # New 90% threshold for senior localization standard
+    # Calculate % de Retenção (%) using character counts (90% senior localization standard)
     if "Caracteres Originais" in df.columns and "Caracteres Traduzidos" in df.columns:
-        def calc_retencao(row):
-            orig = row.get("Caracteres Originais", 0)
-            trad = row.get("Caracteres Traduzidos", 0)
-            if orig > 0:
-                retencao = round((trad / orig) * 100, 1)
-                # Flag if below 90% retention threshold (senior standard)
-                if retencao < 90:
-                    return f"{retencao}% ❌ ERRO: ABAIXO DO PADRÃO"
-                return f"{retencao}%"
-            return "0%"
-        
-        df["% de Retenção"] = df.apply(calc_retencao, axis=1)
+        df["% de Retenção"] = _percent_labels(
+            df, "Caracteres Traduzidos", "Caracteres Originais", 90, " ❌ ERRO: ABAIXO DO PADRÃO"
+        )
     
     # Ensure correct column order
     cols = [
@@ -82,10 +438,19 @@ def write_stats_excel(rows: List[Dict], output_path: str) -> str:
     for c in cols:
         if c not in df.columns:
             df[c] = ""
-    df = df[cols]
+    # Contadores extras do pipeline (ex: chunks escalados) vêm depois das colunas padrão
+    extra = [c for c in df.columns if c not in cols]
+    df = df[cols + extra]
     
     out = Path(output_path)
     out.parent.mkdir(parents=True, exist_ok=True)
     df.to_excel(str(out), index=False)
     print(f"Escrevendo estatísticas: {out}")
     return str(out)
+
+
+def export_stats_excel(ledger_file: str, output_path: str) -> str:
+    """Build the XLSX from the stats ledger (latest row per chapter)."""
+    from .stats_ledger import read_stats_rows
+
+    return write_stats_excel(read_stats_rows(ledger_file), output_path)
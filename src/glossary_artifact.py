@@ -0,0 +1,241 @@
+"""Layered glossary compiled into a versioned binary artifact, mmapped on load.
+
+Terms come from three layers, later ones winning on conflicts:
+
+1. global:  `glossary/glossary.json` (GLOSSARY_DIR);
+2. series:  `glossary/series/<series>.json`, where the series is GLOSSARY_SERIES
+   or the "SERIES" key of `glossary/{novel}/config.json`;
+3. novel:   the novel's term store (`terms.db`).
+
+Parsing a 50k-term JSON, flattening it and building both Aho-Corasick
+automata on every start is seconds of work repeated for nothing. The merged
+map and the automata are written once to `glossary-<hash>.glx` next to the
+novel's `terms.db`, keyed by a SHA-256 over the raw layer contents and the
+format version; any edit to any layer changes the name. Loading maps the file
+and hands the automaton arrays to the matcher as zero-copy views.
+
+File layout (little-endian):
+
+    header   magic(8) version(u32) sections(u32) digest(32) terms(u64)
+    table    (offset u64, length u64) per section
+    sections 0: UTF-8 of all sources then all targets
+             1: int32 code-point offsets into section 0 (2 * terms + 1)
+             2..: int32 arrays of the source automaton, then of the target
+                  automaton, in AUTOMATON_ARRAYS order
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .glossary_engine import GLOSSARY_DIR, flatten_glossary, load_novel_config, novel_glossary_dir, open_glossary_store
+from .glossary_matcher import AUTOMATON_ARRAYS, AhoCorasick, GlossaryMatcher, register_glossary_matcher
+
+GLOSSARY_ARTIFACT = os.environ.get("GLOSSARY_ARTIFACT", "1").lower() not in ("0", "false", "no", "off")
+# Série da novel (camada glossary/series/<série>.json); vazio = usa o "SERIES" do config.json da novel
+GLOSSARY_SERIES = os.environ.get("GLOSSARY_SERIES", "")
+
+MAGIC = b"NLPGLOSS"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII32sQ")
+_SECTION = struct.Struct("<QQ")
+_SECTION_COUNT = 2 + 2 * len(AUTOMATON_ARRAYS)
+_ALIGN = 8
+
+
+@dataclass
+class GlossaryLayer:
+    """One layer's raw contents (hashed as-is; parsed only when compiling)."""
+    name: str
+    payload: bytes
+
+    def terms(self) -> Dict[str, str]:
+        try:
+            return flatten_glossary(json.loads(self.payload.decode("utf-8")))
+        except ValueError:
+            return {}
+
+
+def series_for(novel_name: str, glossary_dir: str = GLOSSARY_DIR) -> str:
+    return GLOSSARY_SERIES or str(load_novel_config(novel_name, glossary_dir).get("SERIES") or "")
+
+
+def glossary_layers(
+    novel_name: str,
+    base_dir: Optional[str] = ".",
+    glossary_dir: str = GLOSSARY_DIR,
+    series: Optional[str] = None,
+) -> List[GlossaryLayer]:
+    """Layers in precedence order (global, series, novel); missing files are skipped,
+    and `base_dir=None` leaves out the novel's store (novel not started yet)."""
+    layers = []
+    series = series_for(novel_name, glossary_dir) if series is None else series
+    files = [("global", Path(glossary_dir) / "glossary.json")]
+    if series:
+        files.append((f"série:{series}", Path(glossary_dir) / "series" / f"{series}.json"))
+    for name, path in files:
+        try:
+            layers.append(GlossaryLayer(name, path.read_bytes()))
+        except OSError:
+            continue
+    if base_dir is None:
+        return layers
+    novel_terms = open_glossary_store(novel_name, base_dir).as_mapping()
+    layers.append(GlossaryLayer("novel", json.dumps(novel_terms, ensure_ascii=False, sort_keys=True).encode("utf-8")))
+    return layers
+
+
+def merge_layers(layers: Sequence[GlossaryLayer]) -> Dict[str, str]:
+    merged: Dict[str, str] = {}
+    for layer in layers:
+        merged.update(layer.terms())
+    return {src: tgt for src, tgt in merged.items() if src and tgt}
+
+
+def content_hash(layers: Sequence[GlossaryLayer]) -> str:
+    h = hashlib.sha256(MAGIC + struct.pack("<I", FORMAT_VERSION))
+    for layer in layers:
+        name = layer.name.encode("utf-8")
+        h.update(struct.pack("<II", len(name), len(layer.payload)) + name)
+        h.update(layer.payload)
+    return h.hexdigest()
+
+
+def _int32_bytes(values: Sequence[int]) -> bytes:
+    data = array("i", values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _int32_view(section: memoryview) -> Sequence[int]:
+    if sys.byteorder != "little":
+        data = array("i")
+        data.frombytes(section)
+        data.byteswap()
+        return data
+    return section.cast("i")
+
+
+def compile_artifact(matcher: GlossaryMatcher, digest: str) -> bytes:
+    """Serialize a matcher (its term pairs and both automata) into the artifact format."""
+    strings = matcher.sources + matcher.targets
+    offsets = [0]
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    sections = [("".join(strings)).encode("utf-8"), _int32_bytes(offsets)]
+    for automaton in (matcher.source_automaton, matcher.target_automaton):
+        sections.extend(_int32_bytes(getattr(automaton, name)) for name in AUTOMATON_ARRAYS)
+
+    table = []
+    position = _HEADER.size + _SECTION.size * len(sections)
+    for section in sections:
+        position += -position % _ALIGN
+        table.append((position, len(section)))
+        position += len(section)
+
+    out = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), bytes.fromhex(digest), len(matcher.sources)))
+    for entry in table:
+        out += _SECTION.pack(*entry)
+    for (offset, _), section in zip(table, sections):
+        out += bytes(offset - len(out))
+        out += section
+    return bytes(out)
+
+
+@dataclass
+class CompiledGlossary:
+    """Merged source -> target map plus its matcher, as loaded from (or written to) an artifact."""
+    digest: str
+    mapping: Dict[str, str]
+    matcher: GlossaryMatcher
+    path: Optional[Path] = None
+    from_cache: bool = False
+
+
+def load_artifact(path: Path, digest: Optional[str] = None) -> CompiledGlossary:
+    """Map an artifact; raises ValueError if it is not one, has another version or digest."""
+    with open(path, "rb") as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    if len(view) < _HEADER.size:
+        raise ValueError(f"artefato de glossário truncado: {path}")
+    magic, version, count, raw_digest, terms = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != FORMAT_VERSION or count != _SECTION_COUNT:
+        raise ValueError(f"artefato de glossário incompatível: {path}")
+    if digest is not None and raw_digest.hex() != digest:
+        raise ValueError(f"artefato de glossário não corresponde às camadas: {path}")
+    sections = []
+    for i in range(count):
+        offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+        if offset + length > len(view):
+            raise ValueError(f"artefato de glossário truncado: {path}")
+        sections.append(view[offset:offset + length])
+
+    text = bytes(sections[0]).decode("utf-8")
+    offsets = _int32_view(sections[1])
+    strings = [text[offsets[i]:offsets[i + 1]] for i in range(2 * terms)]
+    sources, targets = strings[:terms], strings[terms:]
+    n = len(AUTOMATON_ARRAYS)
+    automata = []
+    for patterns, arrays in ((sources, sections[2:2 + n]), (targets, sections[2 + n:])):
+        automata.append(AhoCorasick(patterns, {name: _int32_view(a) for name, a in zip(AUTOMATON_ARRAYS, arrays)}))
+    matcher = GlossaryMatcher.from_automata(*automata)
+    # As views mantêm o mmap vivo enquanto o matcher existir
+    return CompiledGlossary(raw_digest.hex(), dict(zip(sources, targets)), matcher, Path(path), from_cache=True)
+
+
+def artifact_path(novel_name: str, base_dir: str, digest: str) -> Path:
+    return novel_glossary_dir(novel_name, base_dir) / f"glossary-{digest[:16]}.glx"
+
+
+def open_compiled_glossary(
+    novel_name: str,
+    base_dir: str = ".",
+    glossary_dir: str = GLOSSARY_DIR,
+    series: Optional[str] = None,
+) -> CompiledGlossary:
+    """Load the artifact for the current layers, compiling (and replacing stale ones) on a miss."""
+    layers = glossary_layers(novel_name, base_dir, glossary_dir, series)
+    digest = content_hash(layers)
+    path = artifact_path(novel_name, base_dir, digest)
+    if path.exists():
+        try:
+            return load_artifact(path, digest)
+        except (OSError, ValueError):
+            pass
+
+    mapping = merge_layers(layers)
+    matcher = GlossaryMatcher(mapping)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(compile_artifact(matcher, digest))
+    os.replace(tmp, path)
+    for stale in path.parent.glob("glossary-*.glx"):
+        if stale != path:
+            try:
+                stale.unlink()
+            except OSError:
+                # No Windows um artefato mapeado por outro processo não pode ser apagado
+                pass
+    return CompiledGlossary(digest, mapping, matcher, path)
+
+
+def load_layered_glossary(
+    novel_name: str,
+    base_dir: str = ".",
+    glossary_dir: str = GLOSSARY_DIR,
+    series: Optional[str] = None,
+) -> Dict[str, str]:
+    """Merged global -> series -> novel mapping; the matcher cache is seeded from the artifact."""
+    if not GLOSSARY_ARTIFACT:
+        return merge_layers(glossary_layers(novel_name, base_dir, glossary_dir, series))
+    compiled = open_compiled_glossary(novel_name, base_dir, glossary_dir, series)
+    register_glossary_matcher(compiled.mapping, compiled.matcher)
+    return compiled.mapping
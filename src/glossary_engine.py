@@ -1,13 +1,42 @@
 import json
+import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterator, List
 
+from .glossary_matcher import get_glossary_matcher
+from .glossary_store import GlossaryStore
 
-def load_glossary(path: str) -> Dict[str, str]:
-    """Load a JSON glossary file into a flat mapping.
 
-    Expected format: a flat object mapping source_term -> preferred_target_term.
+def flatten_glossary(data) -> Dict[str, str]:
+    """Flatten a parsed glossary JSON into source -> target.
+
+    Accepts flat entries ("剑": "espada"), entries with metadata
+    ("Rimuru": {"translation": "Rimuru", "gender": "M", ...}; `pt_br`/`target`
+    also work) and category groups ({"personagens": {"张三": "Zhang San"}}).
     """
+    flat: Dict[str, str] = {}
+    if not isinstance(data, dict):
+        return flat
+    for k, v in data.items():
+        if isinstance(v, str):
+            flat[k] = v
+        elif isinstance(v, dict):
+            target = v.get("translation") or v.get("pt_br") or v.get("target")
+            if isinstance(target, str):
+                flat[k] = target
+                continue
+            for k2, v2 in v.items():
+                if isinstance(v2, str):
+                    flat[k2] = v2
+                elif isinstance(v2, dict) and isinstance(v2.get("translation") or v2.get("pt_br"), str):
+                    flat[k2] = v2.get("translation") or v2.get("pt_br")
+    return flat
+
+
+def load_glossary(path: str) -> Dict[str, str]:
+    """Load a JSON glossary file into a flat mapping (see `flatten_glossary` for the formats)."""
     p = Path(path)
     if not p.exists():
         return {}
@@ -15,18 +44,7 @@ def load_glossary(path: str) -> Dict[str, str]:
         data = json.loads(p.read_text(encoding="utf-8"))
     except Exception:
         return {}
-
-    # If nested structures are present, flatten simply by merging string values.
-    flat = {}
-    if isinstance(data, dict):
-        for k, v in data.items():
-            if isinstance(v, str):
-                flat[k] = v
-            elif isinstance(v, dict):
-                for k2, v2 in v.items():
-                    if isinstance(v2, str):
-                        flat[k2] = v2
-    return flat
+    return flatten_glossary(data)
 
 
 def build_glossary_instructions(glossary: Dict[str, str]) -> str:
@@ -38,43 +56,86 @@ def build_glossary_instructions(glossary: Dict[str, str]) -> str:
 
 
 def apply_glossary_postprocessing(text: str, glossary: Dict[str, str]) -> str:
-    """Optional deterministic post-processing: replace occurrences using glossary where safe.
+    """Optional deterministic post-processing: replace source terms left in the text by their targets.
 
-    This is conservative and literal; for advanced usage prefer model-guided application.
+    One Aho-Corasick scan (see `GlossaryMatcher.replace`); for advanced usage prefer model-guided application.
     """
     if not glossary:
         return text
-    out = text
-    for src, tgt in glossary.items():
-        out = out.replace(src, tgt)
-    return out
+    return get_glossary_matcher(glossary).replace(text)
+
+
+def find_glossary_violations(source: str, translation: str, glossary: Dict[str, str]) -> List[str]:
+    """Return glossary source terms present in `source` whose target is missing from `translation`."""
+    if not glossary:
+        return []
+    return [v.term for v in get_glossary_matcher(glossary).violations(source, translation) if v.kind == "ausente"]
+
+
+def novel_glossary_dir(novel_name: str, base_dir: str = ".") -> Path:
+    return Path(base_dir) / "glossary" / novel_name
+
+
+# Glossários reutilizáveis do projeto (glossary.json global, series/, {novel}/config.json)
+DEFAULT_GLOSSARY_DIR = Path(__file__).resolve().parent.parent / "glossary"
+GLOSSARY_DIR = os.environ.get("GLOSSARY_DIR") or str(DEFAULT_GLOSSARY_DIR)
+
+
+def load_novel_config(novel_name: str, glossary_dir: str = GLOSSARY_DIR) -> Dict[str, Any]:
+    """Per-novel settings from `glossary/{novel}/config.json` (see config/config.example.json)."""
+    try:
+        data = json.loads((Path(glossary_dir) / novel_name / "config.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+# Stores já abertos neste processo, por caminho do terms.db (schema e import legado feitos uma vez)
+_STORES: Dict[str, GlossaryStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def open_glossary_store(novel_name: str, base_dir: str = ".") -> GlossaryStore:
+    """Open (or create) the SQLite term store for a novel.
+
+    The store is created once per process and db file. On first creation, an
+    existing `terms.json` is imported (`import_legacy_json`, once per db even
+    across processes) so older sessions keep their terms.
+    """
+    novel_dir = novel_glossary_dir(novel_name, base_dir)
+    db_path = novel_dir / "terms.db"
+    key = str(db_path.resolve())
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None or not db_path.exists():
+            store = _STORES[key] = GlossaryStore(str(db_path))
+            store.import_legacy_json(str(novel_dir / "terms.json"))
+    return store
 
 
 def ensure_novel_session(novel_name: str, base_dir: str = ".") -> str:
-    """Ensure glossary/{novel_name}/ exists with `terms.json` and `context_memory.txt`.
+    """Ensure glossary/{novel_name}/ exists with `terms.db` and `context_memory.txt`.
 
     Returns the novel glossary dir path as string.
     """
-    base = Path(base_dir)
-    novel_dir = base / "glossary" / novel_name
+    novel_dir = novel_glossary_dir(novel_name, base_dir)
     novel_dir.mkdir(parents=True, exist_ok=True)
-    terms = novel_dir / "terms.json"
+    open_glossary_store(novel_name, base_dir)
     context = novel_dir / "context_memory.txt"
-    if not terms.exists():
-        terms.write_text("{}", encoding="utf-8")
     if not context.exists():
         context.write_text("", encoding="utf-8")
     return str(novel_dir)
 
 
 def load_terms_for_novel(novel_name: str, base_dir: str = ".") -> Dict[str, str]:
-    p = Path(base_dir) / "glossary" / novel_name / "terms.json"
-    if not p.exists():
-        return {}
-    try:
-        return json.loads(p.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
+    """Return the novel's terms as a flat source -> target mapping."""
+    return open_glossary_store(novel_name, base_dir).as_mapping()
+
+
+def export_terms_json(novel_name: str, base_dir: str = ".") -> str:
+    """Export the term store to `terms.json` (same format as before the SQLite store)."""
+    store = open_glossary_store(novel_name, base_dir)
+    return store.export_json(str(novel_glossary_dir(novel_name, base_dir) / "terms.json"))
 
 
 def append_context_memory(novel_name: str, text: str, base_dir: str = ".") -> None:
@@ -91,23 +152,166 @@ def read_context_memory(novel_name: str, base_dir: str = ".") -> str:
     return p.read_text(encoding="utf-8")
 
 
+@contextmanager
+def _exclusive_lock(lock_path: Path, thread_lock: threading.Lock) -> Iterator[None]:
+    """Exclusive lock on `lock_path` across processes (flock / msvcrt) and threads."""
+    with thread_lock:
+        with open(lock_path, "a+b") as fh:
+            try:
+                import fcntl
+            except ImportError:
+                fcntl = None
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+                return
+            import msvcrt
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SuggestionLog:
+    """Append-only JSONL log of term suggestions with in-memory deduplication.
+
+    Each `append` writes a single line; duplicates are rejected through a hash
+    set instead of a list scan. Redundant lines (from concurrent writers or a
+    legacy `suggestions.json` migration) are dropped by `compact`, which runs
+    automatically every `compact_interval` appends when needed. Appends and
+    compaction hold an exclusive lock on `<log>.lock`, so a line written by
+    another process or thread is never lost to a concurrent rewrite.
+    """
+
+    def __init__(self, path: str, compact_interval: int = 500, compact_min_redundant: int = 100):
+        self.path = Path(path)
+        self.compact_interval = compact_interval
+        self.compact_min_redundant = compact_min_redundant
+        self._seen: set = set()
+        self._lines = 0
+        self._appends_since_check = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+        self._thread_lock = threading.Lock()
+        self._migrate_legacy_json()
+        self._scan()
+        self._maybe_compact()
+
+    @staticmethod
+    def _key(suggestion) -> str:
+        return json.dumps(suggestion, ensure_ascii=False, sort_keys=True)
+
+    def _migrate_legacy_json(self) -> None:
+        legacy = self.path.with_suffix(".json")
+        if self.path.exists() or not legacy.exists():
+            return
+        try:
+            data = json.loads(legacy.read_text(encoding="utf-8"))
+        except Exception:
+            data = []
+        with self.path.open("w", encoding="utf-8") as fh:
+            for item in data if isinstance(data, list) else []:
+                fh.write(self._key(item) + "\n")
+
+    def _scan(self) -> None:
+        """Rebuild the dedupe set from disk (picks up lines written by other processes)."""
+        self._seen = set()
+        self._lines = 0
+        for item in self:
+            self._seen.add(self._key(item))
+            self._lines += 1
+
+    def __iter__(self) -> Iterator:
+        """Stream entries from disk without loading the whole log."""
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, suggestion) -> bool:
+        return self._key(suggestion) in self._seen
+
+    def append(self, suggestion) -> bool:
+        """Append `suggestion` unless already logged. Returns True if it was written."""
+        key = self._key(suggestion)
+        if key in self._seen:
+            return False
+        with _exclusive_lock(self._lock_path, self._thread_lock):
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(key + "\n")
+        self._seen.add(key)
+        self._lines += 1
+        self._appends_since_check += 1
+        if self._appends_since_check >= self.compact_interval:
+            self._appends_since_check = 0
+            self._scan()
+            self._maybe_compact()
+        return True
+
+    def _maybe_compact(self) -> None:
+        if self._lines - len(self._seen) >= self.compact_min_redundant:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the log keeping the first occurrence of each entry (atomic replace, under the lock)."""
+        tmp = self.path.with_suffix(".jsonl.tmp")
+        seen = set()
+        with _exclusive_lock(self._lock_path, self._thread_lock):
+            with tmp.open("w", encoding="utf-8") as out:
+                for item in self:
+                    key = self._key(item)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    out.write(key + "\n")
+            tmp.replace(self.path)
+        self._seen = seen
+        self._lines = len(seen)
+
+
+# Um log por arquivo, reaproveitado entre chamadas para manter o conjunto de dedupe em memória.
+_SUGGESTION_LOGS: Dict[str, SuggestionLog] = {}
+
+
+def suggestions_path(novel_name: str, base_dir: str = ".") -> Path:
+    return novel_glossary_dir(novel_name, base_dir) / "suggestions.jsonl"
+
+
+def get_suggestion_log(novel_name: str, base_dir: str = ".") -> SuggestionLog:
+    p = suggestions_path(novel_name, base_dir)
+    key = str(p.resolve())
+    log = _SUGGESTION_LOGS.get(key)
+    if log is None:
+        log = _SUGGESTION_LOGS[key] = SuggestionLog(str(p))
+    return log
+
+
+def iter_suggestions(novel_name: str, base_dir: str = ".") -> Iterator:
+    """Stream suggestions from suggestions.jsonl, one entry at a time."""
+    return iter(get_suggestion_log(novel_name, base_dir))
+
+
 def load_suggestions(novel_name: str, base_dir: str = ".") -> list:
-    """Load suggestion list from suggestions.json."""
-    p = Path(base_dir) / "glossary" / novel_name / "suggestions.json"
-    if not p.exists():
-        return []
-    try:
-        data = json.loads(p.read_text(encoding="utf-8"))
-        return data if isinstance(data, list) else []
-    except Exception:
-        return []
+    """Load the whole suggestion list (prefer `iter_suggestions` for large logs)."""
+    return list(iter_suggestions(novel_name, base_dir))
 
 
 def append_suggestion(novel_name: str, suggestion: str, base_dir: str = ".") -> None:
-    """Append a suggestion to suggestions.json (avoid duplicates)."""
-    p = Path(base_dir) / "glossary" / novel_name / "suggestions.json"
-    p.parent.mkdir(parents=True, exist_ok=True)
-    suggestions = load_suggestions(novel_name, base_dir)
-    if suggestion not in suggestions:
-        suggestions.append(suggestion)
-    p.write_text(json.dumps(suggestions, ensure_ascii=False, indent=2), encoding="utf-8")
+    """Append a suggestion to suggestions.jsonl (avoid duplicates)."""
+    get_suggestion_log(novel_name, base_dir).append(suggestion)
@@ -0,0 +1,255 @@
+"""Multi-pattern glossary matching (Aho-Corasick) and the local consistency check.
+
+`find_glossary_violations` used to test every glossary entry with `in`
+against the chunk and its translation: O(terms x text) per chunk, repeated
+for every chunk of every chapter. `GlossaryMatcher` builds one automaton over
+the glossary's source terms and one over its targets, so a chunk is scanned
+once regardless of glossary size.
+
+The automata are stored as flat integer arrays (sorted edges per state,
+failure links, output lists) rather than dicts of dicts: cheap to build and
+walk, and directly serializable.
+"""
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+# Arrays que definem um autômato (ordem usada na serialização do artefato do glossário)
+AUTOMATON_ARRAYS = ("edge_start", "edge_chars", "edge_targets", "fail", "out_start", "out_ids", "lengths")
+
+
+def _is_word_char(ch: str) -> bool:
+    # Só letras/dígitos latinos delimitam palavras; termos CJK casam em qualquer posição.
+    return ch.isalnum() and ord(ch) < 0x2E80
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over `patterns`, frozen into arrays.
+
+    State `s` has edges `edge_chars[edge_start[s]:edge_start[s + 1]]` (sorted
+    code points) leading to `edge_targets[...]`; `fail[s]` is its failure link
+    and `out_ids[out_start[s]:out_start[s + 1]]` the patterns ending there
+    (including those reached through failure links).
+
+    `arrays` skips the build and adopts previously frozen arrays (any integer
+    sequences: `array`, or `memoryview`s over an mmapped artifact).
+    """
+
+    def __init__(self, patterns: Sequence[str], arrays: Optional[Mapping[str, Sequence[int]]] = None):
+        self.patterns = list(patterns)
+        if arrays is not None:
+            for name in AUTOMATON_ARRAYS:
+                setattr(self, name, arrays[name])
+            return
+        goto: List[Dict[int, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                code = ord(ch)
+                nxt = goto[state].get(code)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][code] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            if pattern:
+                outputs[state].append(pid)
+
+        fail = [0] * len(goto)
+        order = list(goto[0].values())
+        for state in order:
+            for code, nxt in goto[state].items():
+                order.append(nxt)
+                f = fail[state]
+                while f and code not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(code, 0) if goto[f].get(code, 0) != nxt else 0
+                outputs[nxt].extend(outputs[fail[nxt]])
+
+        self.edge_start = array("l", [0])
+        self.edge_chars = array("l")
+        self.edge_targets = array("l")
+        self.out_start = array("l", [0])
+        self.out_ids = array("l")
+        for state, edges in enumerate(goto):
+            for code in sorted(edges):
+                self.edge_chars.append(code)
+                self.edge_targets.append(edges[code])
+            self.edge_start.append(len(self.edge_chars))
+            self.out_ids.extend(outputs[state])
+            self.out_start.append(len(self.out_ids))
+        self.fail = array("l", fail)
+        self.lengths = array("l", (len(p) for p in self.patterns))
+
+    def _root_edges(self) -> Dict[int, int]:
+        # Dict das arestas da raiz: a maioria dos caracteres do texto para (e fica) nela
+        root = getattr(self, "_root", None)
+        if root is None:
+            lo, hi = self.edge_start[0], self.edge_start[1]
+            root = self._root = {self.edge_chars[i]: self.edge_targets[i] for i in range(lo, hi)}
+        return root
+
+    def _step(self, state: int, code: int) -> int:
+        while True:
+            lo, hi = self.edge_start[state], self.edge_start[state + 1]
+            i = bisect_left(self.edge_chars, code, lo, hi)
+            if i < hi and self.edge_chars[i] == code:
+                return self.edge_targets[i]
+            if state == 0:
+                return 0
+            state = self.fail[state]
+
+    def finditer(self, text: str, whole_words: bool = True) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, pattern_id) for every occurrence, overlapping ones included.
+
+        With `whole_words`, matches glued to a latin letter/digit on either side are skipped
+        ("Rim" does not match inside "Rimuru").
+        """
+        state = 0
+        n = len(text)
+        root = self._root_edges()
+        for i, ch in enumerate(text):
+            if state == 0:
+                state = root.get(ord(ch), 0)
+                if not state:
+                    continue
+            else:
+                state = self._step(state, ord(ch))
+            for k in range(self.out_start[state], self.out_start[state + 1]):
+                pid = self.out_ids[k]
+                start, end = i + 1 - self.lengths[pid], i + 1
+                if whole_words and (
+                    (start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]))
+                    or (end < n and _is_word_char(text[end]) and _is_word_char(text[end - 1]))
+                ):
+                    continue
+                yield start, end, pid
+
+    def found(self, text: str) -> Set[int]:
+        return {pid for _, _, pid in self.finditer(text)}
+
+
+@dataclass(frozen=True)
+class GlossaryViolation:
+    term: str
+    expected: str
+    kind: str  # "ausente": alvo não aparece; "não traduzido": termo original ficou na tradução
+
+    def __str__(self) -> str:
+        if self.kind == "ausente":
+            return f"'{self.term}' deveria aparecer como '{self.expected}'"
+        return f"'{self.term}' ficou sem traduzir (use '{self.expected}')"
+
+
+class GlossaryMatcher:
+    """Source-term and target-term automata for one glossary snapshot."""
+
+    def __init__(self, glossary: Dict[str, str]):
+        items = [(src, tgt) for src, tgt in glossary.items() if src and tgt]
+        self.sources = [src for src, _ in items]
+        self.targets = [tgt for _, tgt in items]
+        self.source_automaton = AhoCorasick(self.sources)
+        self.target_automaton = AhoCorasick(self.targets)
+
+    @classmethod
+    def from_automata(cls, source_automaton: AhoCorasick, target_automaton: AhoCorasick) -> "GlossaryMatcher":
+        """Matcher over prebuilt automata (pattern i of each is the i-th glossary pair)."""
+        matcher = cls.__new__(cls)
+        matcher.sources = source_automaton.patterns
+        matcher.targets = target_automaton.patterns
+        matcher.source_automaton = source_automaton
+        matcher.target_automaton = target_automaton
+        return matcher
+
+    def violations(self, source: str, translation: str) -> List[GlossaryViolation]:
+        """Glossary terms in `source` whose target is missing from `translation`, and
+        source terms left untranslated in `translation`."""
+        result: List[GlossaryViolation] = []
+        target_spans = list(self.target_automaton.finditer(translation))
+        present_targets = {self.targets[pid] for _, _, pid in target_spans}
+        for pid in sorted(self.source_automaton.found(source)):
+            if self.targets[pid] not in present_targets:
+                result.append(GlossaryViolation(self.sources[pid], self.targets[pid], "ausente"))
+        flagged = {v.term for v in result}
+        for start, end, pid in self.source_automaton.finditer(translation):
+            src, tgt = self.sources[pid], self.targets[pid]
+            if src == tgt or src in flagged:
+                continue
+            # Original dentro de um alvo ("Tempest" em "Rimuru Tempest") não conta
+            if any(s <= start and end <= e for s, e, _ in target_spans):
+                continue
+            result.append(GlossaryViolation(src, tgt, "não traduzido"))
+            flagged.add(src)
+        return result
+
+    def replace(self, text: str) -> str:
+        """Replace source terms left in `text` by their targets in one scan.
+
+        Leftmost-longest, non-overlapping; occurrences inside a target that is
+        already there ("Tempest" in "Rimuru Tempest") are kept, so applying it
+        twice changes nothing.
+        """
+        target_spans = [(s, e) for s, e, _ in self.target_automaton.finditer(text)]
+        hits = sorted(
+            (start, -(end - start), end, pid)
+            for start, end, pid in self.source_automaton.finditer(text)
+            if self.sources[pid] != self.targets[pid]
+        )
+        if not hits:
+            return text
+        parts: List[str] = []
+        pos = 0
+        for start, _, end, pid in hits:
+            if start < pos or any(s <= start and end <= e for s, e in target_spans):
+                continue
+            parts.append(text[pos:start])
+            parts.append(self.targets[pid])
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+
+# Cache keyed by (id, len, generation) of the glossary dict: O(1) per lookup,
+# instead of hashing every entry. The entry keeps a reference to the dict so
+# its id cannot be reused by another glossary while cached.
+_MATCHER_CACHE: Dict[Tuple[int, int, int], Tuple[Dict[str, str], GlossaryMatcher]] = {}
+_GENERATIONS: Dict[int, int] = {}
+
+
+def glossary_changed(glossary: Dict[str, str]) -> None:
+    """Mark `glossary` as mutated in place, so its cached matcher is rebuilt.
+
+    Call it after every `update`/assignment on a glossary that is still in use;
+    a change that keeps the size (a term with a new translation) is otherwise
+    invisible to the cache.
+    """
+    _GENERATIONS[id(glossary)] = _GENERATIONS.get(id(glossary), 0) + 1
+
+
+def _cache_key(glossary: Dict[str, str]) -> Tuple[int, int, int]:
+    return id(glossary), len(glossary), _GENERATIONS.get(id(glossary), 0)
+
+
+def _store(key: Tuple[int, int, int], glossary: Dict[str, str], matcher: GlossaryMatcher) -> None:
+    if len(_MATCHER_CACHE) > 8:
+        _MATCHER_CACHE.clear()
+    _MATCHER_CACHE[key] = (glossary, matcher)
+
+
+def get_glossary_matcher(glossary: Dict[str, str]) -> GlossaryMatcher:
+    """Matcher for the glossary's current contents (rebuilt only when they change)."""
+    key = _cache_key(glossary)
+    entry = _MATCHER_CACHE.get(key)
+    if entry is not None and entry[0] is glossary:
+        return entry[1]
+    matcher = GlossaryMatcher(glossary)
+    _store(key, glossary, matcher)
+    return matcher
+
+
+def register_glossary_matcher(glossary: Dict[str, str], matcher: GlossaryMatcher) -> None:
+    """Seed the cache with a matcher loaded from a compiled artifact, so it is not rebuilt."""
+    _store(_cache_key(glossary), glossary, matcher)
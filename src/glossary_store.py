@@ -0,0 +1,217 @@
+"""SQLite-backed glossary store for per-novel terms.
+
+Replaces the read-modify-write cycle on ``terms.json``: every chapter only
+upserts the rows it touches inside a transaction, and WAL mode lets several
+readers (other runs, the CLI, the review tool) query the store while a writer
+is active. ``terms.json`` remains the interchange format via import/export.
+"""
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    source_term TEXT PRIMARY KEY,
+    target_term TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'misc',
+    gender TEXT NOT NULL DEFAULT '',
+    en TEXT NOT NULL DEFAULT '',
+    context TEXT NOT NULL DEFAULT '',
+    frequency INTEGER NOT NULL DEFAULT 0,
+    added_date TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_terms_source_nocase ON terms(source_term COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_terms_type ON terms(type);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Marca em `meta`: o terms.json legado já foi importado (ou não havia o que importar)
+LEGACY_IMPORT_KEY = "legacy_terms_json_imported"
+
+# Colunas na ordem usada por INSERT/SELECT.
+COLUMNS = ("source_term", "target_term", "type", "gender", "en", "context", "frequency", "added_date")
+
+# Tempo máximo (ms) que um leitor/escritor espera por um lock antes de falhar.
+BUSY_TIMEOUT_MS = 5000
+
+
+def _normalize_entry(source_term: str, value: Any) -> Dict[str, Any]:
+    """Convert a terms.json value (plain string or metadata dict) into a row dict."""
+    if isinstance(value, str):
+        info: Dict[str, Any] = {"pt_br": value}
+    elif isinstance(value, dict):
+        info = value
+    else:
+        info = {}
+    target = info.get("pt_br") or info.get("target") or source_term
+    return {
+        "source_term": source_term,
+        "target_term": str(target),
+        "type": str(info.get("type") or "misc"),
+        "gender": str(info.get("gender") or ""),
+        "en": str(info.get("en") or ""),
+        "context": str(info.get("context") or ""),
+        "frequency": int(info.get("frequency") or 0),
+        "added_date": str(info.get("added_date") or time.strftime("%Y-%m-%d %H:%M:%S")),
+    }
+
+
+def _read_terms_json(path: str) -> Dict[str, Any]:
+    p = Path(path)
+    if not p.exists():
+        return {}
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class GlossaryStore:
+    """Typed, transactional glossary for a single novel.
+
+    Each operation opens its own short-lived connection, so a store instance
+    can be shared between threads and several processes can use the same file.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self) -> int:
+        with self._transaction() as conn:
+            return conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+
+    def upsert_terms(self, terms: Dict[str, Any], overwrite: bool = False) -> Dict[str, str]:
+        """Insert or update terms in a single transaction.
+
+        ``terms`` maps source term -> metadata dict (or plain target string).
+        Existing rows keep their curated target/gender/type unless
+        ``overwrite`` is True; their frequency is incremented either way.
+
+        Returns only the terms that did not exist before, as source -> target.
+        """
+        rows = [_normalize_entry(src, info) for src, info in terms.items()]
+        if not rows:
+            return {}
+        with self._transaction() as conn:
+            # BEGIN IMMEDIATE garante que a checagem de existência e o upsert vejam o mesmo estado.
+            conn.execute("BEGIN IMMEDIATE")
+            return self._upsert_rows(conn, rows, overwrite)
+
+    @staticmethod
+    def _upsert_rows(conn: sqlite3.Connection, rows, overwrite: bool) -> Dict[str, str]:
+        if overwrite:
+            conflict = (
+                "target_term=excluded.target_term, type=excluded.type, gender=excluded.gender, "
+                "en=excluded.en, context=excluded.context, frequency=excluded.frequency"
+            )
+        else:
+            conflict = (
+                "frequency=terms.frequency + excluded.frequency, "
+                "context=CASE WHEN terms.context = '' THEN excluded.context ELSE terms.context END"
+            )
+        sql = (
+            f"INSERT INTO terms ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+            f"ON CONFLICT(source_term) DO UPDATE SET {conflict}"
+        )
+        created: Dict[str, str] = {}
+        for row in rows:
+            exists = conn.execute(
+                "SELECT 1 FROM terms WHERE source_term = ?", (row["source_term"],)
+            ).fetchone()
+            conn.execute(sql, [row[c] for c in COLUMNS])
+            if not exists:
+                created[row["source_term"]] = row["target_term"]
+        return created
+
+    def get(self, source_term: str) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT * FROM terms WHERE source_term = ?", (source_term,)).fetchone()
+        return dict(row) if row else None
+
+    def iter_terms(self, term_type: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield rows ordered by source term, optionally filtered by type."""
+        with self._transaction() as conn:
+            if term_type is None:
+                cursor = conn.execute("SELECT * FROM terms ORDER BY source_term")
+            else:
+                cursor = conn.execute("SELECT * FROM terms WHERE type = ? ORDER BY source_term", (term_type,))
+            for row in cursor:
+                yield dict(row)
+
+    def as_mapping(self) -> Dict[str, str]:
+        """Return the flat source -> target mapping consumed by the translator."""
+        with self._transaction() as conn:
+            return {row[0]: row[1] for row in conn.execute("SELECT source_term, target_term FROM terms")}
+
+    def import_json(self, path: str, overwrite: bool = False) -> int:
+        """Import a terms.json file (flat or with metadata). Returns the number of new terms."""
+        return len(self.upsert_terms(_read_terms_json(path), overwrite=overwrite))
+
+    def import_legacy_json(self, path: str) -> int:
+        """Import a legacy terms.json once per store, however many processes open it.
+
+        The "already imported?" check, the import and the marker run in one
+        `BEGIN IMMEDIATE` transaction, so two runs opening a fresh novel at the
+        same time cannot both import it (which would double the frequencies).
+        A store that already has terms is only marked.
+        """
+        with self._transaction() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (LEGACY_IMPORT_KEY,)).fetchone():
+                return 0
+            created: Dict[str, str] = {}
+            if not conn.execute("SELECT 1 FROM terms LIMIT 1").fetchone():
+                rows = [_normalize_entry(src, info) for src, info in _read_terms_json(path).items()]
+                created = self._upsert_rows(conn, rows, overwrite=False)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                (LEGACY_IMPORT_KEY, time.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+        return len(created)
+
+    def export_json(self, path: str) -> str:
+        """Write the store in the terms.json format (source -> metadata dict)."""
+        data = {}
+        for row in self.iter_terms():
+            data[row["source_term"]] = {
+                "type": row["type"],
+                "pt_br": row["target_term"],
+                "en": row["en"],
+                "context": row["context"],
+                "added_date": row["added_date"],
+                "gender": row["gender"],
+                "frequency": row["frequency"],
+            }
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(p.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(p)
+        return str(p)
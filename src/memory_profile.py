@@ -0,0 +1,239 @@
+"""Opt-in memory profiling of the chapter pipeline (MEMORY_PROFILE=1 or `--profile-memory`).
+
+Each pipeline stage (normalization, translation, export, indexing) runs
+inside `MemoryProfiler.stage`, which records:
+
+- the traced Python heap (tracemalloc): peak during the stage and growth;
+- the process RSS: sampled in a background thread for the peak, before and
+  after for the growth (psutil when installed, else /proc/self/statm).
+
+Per-chapter totals ("Memória Pico (MB)", "Memória Retida (MB)", "RSS Pico
+(MB)", "RSS Retido (MB)") and per-stage peaks go into the chapter stats and
+therefore the ledger. When a stage's traced peak exceeds
+MEMORY_PROFILE_DUMP_MB, the top allocation sites still alive at its end
+(compared to the start of the chapter) are written to
+`output/{novel}/memory/<chapter>-<stage>.txt`.
+
+tracemalloc slows Python code down noticeably, so this is off by default.
+Figures are process-wide: with parallel chapters, stages of different
+chapters overlap and their numbers mix. Each chapter still gets its own
+totals: chapter state is kept per chapter, and the running chapter of each
+thread is the one `begin_chapter` was last called for in that thread.
+"""
+import linecache
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+MEMORY_PROFILE = os.environ.get("MEMORY_PROFILE", "0").lower() not in ("0", "false", "no", "off")
+# Pico (MB, heap rastreado) de uma etapa a partir do qual as maiores alocações são despejadas
+MEMORY_PROFILE_DUMP_MB = float(os.environ.get("MEMORY_PROFILE_DUMP_MB", "200"))
+MEMORY_PROFILE_TOP = int(os.environ.get("MEMORY_PROFILE_TOP", "25"))
+# Quadros de pilha guardados por alocação e intervalo de amostragem do RSS (s)
+MEMORY_PROFILE_FRAMES = int(os.environ.get("MEMORY_PROFILE_FRAMES", "5"))
+MEMORY_PROFILE_INTERVAL = float(os.environ.get("MEMORY_PROFILE_INTERVAL", "0.05"))
+
+_MB = 1024 * 1024
+
+# Profilers abertos: o tracemalloc só para quando o último fecha
+_TRACING_USERS = 0
+_TRACING_LOCK = threading.Lock()
+
+# Alocações do próprio profiler e do mecanismo de import não interessam no despejo
+_IGNORED = (
+    tracemalloc.Filter(False, __file__, all_frames=True),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 when it cannot be read)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return 0
+
+
+class RssSampler:
+    """Background thread tracking the highest RSS seen since the last `take_peak`."""
+
+    def __init__(self, interval: float = MEMORY_PROFILE_INTERVAL):
+        self.interval = interval
+        self._peak = current_rss()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            with self._lock:
+                self._peak = max(self._peak, rss)
+
+    def take_peak(self) -> int:
+        """Peak since the previous call (the current RSS counts too), then start over."""
+        rss = current_rss()
+        with self._lock:
+            peak, self._peak = max(self._peak, rss), rss
+        return peak
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _reset_traced_peak() -> None:
+    # Python < 3.9 não tem reset_peak: o pico passa a ser o do processo inteiro
+    reset = getattr(tracemalloc, "reset_peak", None)
+    if reset is not None:
+        reset()
+
+
+def _mb(n: float) -> float:
+    return round(n / _MB, 1)
+
+
+class MemoryProfiler:
+    """tracemalloc + RSS measurements around pipeline stages, aggregated per chapter."""
+
+    def __init__(
+        self,
+        dump_dir: str,
+        dump_threshold_mb: float = MEMORY_PROFILE_DUMP_MB,
+        top: int = MEMORY_PROFILE_TOP,
+        frames: int = MEMORY_PROFILE_FRAMES,
+    ):
+        self.dump_dir = Path(dump_dir)
+        self.dump_threshold = dump_threshold_mb * _MB
+        self.top = top
+        global _TRACING_USERS
+        with _TRACING_LOCK:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            _TRACING_USERS += 1
+        self.sampler = RssSampler()
+        self._chapters: Dict[str, Dict[str, Any]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _current(self) -> Dict[str, Any]:
+        """State of the chapter running in this thread (empty outside a chapter)."""
+        key = getattr(self._local, "chapter", None)
+        with self._lock:
+            return self._chapters.get(key, {}) if key is not None else {}
+
+    def begin_chapter(self, name: str) -> None:
+        key = Path(name).stem
+        state = {
+            "name": key,
+            "traced": tracemalloc.get_traced_memory()[0],
+            "rss": current_rss(),
+            "traced_peak": 0,
+            "rss_peak": 0,
+            "baseline": tracemalloc.take_snapshot().filter_traces(_IGNORED),
+        }
+        with self._lock:
+            self._chapters[key] = state
+        self._local.chapter = key
+
+    @contextmanager
+    def stage(self, name: str, stats: Optional[Dict[str, Any]] = None) -> Iterator[None]:
+        traced_before = tracemalloc.get_traced_memory()[0]
+        _reset_traced_peak()
+        self.sampler.take_peak()
+        try:
+            yield
+        finally:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            rss_peak = self.sampler.take_peak()
+            chapter = self._current()
+            if chapter:
+                with self._lock:
+                    chapter["traced_peak"] = max(chapter["traced_peak"], traced_peak)
+                    chapter["rss_peak"] = max(chapter["rss_peak"], rss_peak)
+            if stats is not None:
+                stats[f"Memória Pico - {name} (MB)"] = _mb(traced_peak)
+            print(
+                f"  [memória] {name}: pico {_mb(traced_peak)} MB, "
+                f"{_mb(traced_after - traced_before):+} MB retidos, RSS pico {_mb(rss_peak)} MB"
+            )
+            if traced_peak >= self.dump_threshold:
+                self.dump(name)
+
+    def end_chapter(self, stats: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Totals of this thread's chapter since `begin_chapter`; also merged into `stats`."""
+        key = getattr(self._local, "chapter", None)
+        self._local.chapter = None
+        with self._lock:
+            chapter = self._chapters.pop(key, None) if key is not None else None
+        if not chapter:
+            return {}
+        totals = {
+            "Memória Pico (MB)": _mb(chapter["traced_peak"]),
+            "Memória Retida (MB)": _mb(tracemalloc.get_traced_memory()[0] - chapter["traced"]),
+            "RSS Pico (MB)": _mb(chapter["rss_peak"]),
+            "RSS Retido (MB)": _mb(current_rss() - chapter["rss"]),
+        }
+        if stats is not None:
+            stats.update(totals)
+        return totals
+
+    def dump(self, stage: str) -> Path:
+        """Write the top allocation sites alive now, with their growth since the chapter began."""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        current = self._current()
+        baseline = current.get("baseline")
+        chapter = current.get("name", "processo")
+        if baseline is not None:
+            top = snapshot.compare_to(baseline, "traceback")[:self.top]
+        else:
+            top = snapshot.statistics("traceback")[:self.top]
+        entries: List[str] = []
+        for stat in top:
+            entries.append(str(stat))
+            entries.extend(f"    {line}" for line in stat.traceback.format())
+        self.dump_dir.mkdir(parents=True, exist_ok=True)
+        path = self.dump_dir / f"{chapter}-{stage}.txt"
+        header = f"# {time.strftime('%Y-%m-%d %H:%M:%S')} capítulo {chapter}, etapa {stage}: top {len(top)} alocações\n"
+        path.write_text(header + "\n".join(entries) + "\n", encoding="utf-8")
+        print(f"  [memória] Limite de {_mb(self.dump_threshold)} MB excedido em '{stage}': {path}")
+        return path
+
+    def close(self) -> None:
+        """Stop the RSS sampler, and tracemalloc when no other profiler is open. Idempotent."""
+        global _TRACING_USERS
+        if self._closed:
+            return
+        self._closed = True
+        self.sampler.stop()
+        with self._lock:
+            self._chapters.clear()
+        with _TRACING_LOCK:
+            _TRACING_USERS -= 1
+            if _TRACING_USERS <= 0:
+                _TRACING_USERS = 0
+                tracemalloc.stop()
+
+
+def open_memory_profiler(novel_output_dir: str) -> Optional[MemoryProfiler]:
+    """Profiler dumping into `{novel_output_dir}/memory/`, or None unless MEMORY_PROFILE is on."""
+    if not MEMORY_PROFILE:
+        return None
+    return MemoryProfiler(str(Path(novel_output_dir) / "memory"))
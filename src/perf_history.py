@@ -0,0 +1,119 @@
+"""Measured LLM throughput per host and model, used by the dry-run planner.
+
+Every model call made by `translator_core` is recorded in memory (estimated
+prompt/completion tokens and wall seconds). `flush_perf_history` merges the
+totals into `perf_history.json` in the output directory, keyed by host
+(PERF_HOST, default: the machine's hostname) and model. Only running sums are
+stored, enough to fit `seconds ≈ a·prompt_tokens + b·completion_tokens`.
+"""
+import json
+import os
+import re
+import socket
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+
+PERF_HISTORY_NAME = "perf_history.json"
+PERF_HOST = os.environ.get("PERF_HOST") or socket.gethostname()
+
+# Vazões assumidas quando não há histórico (tokens/s): prefill e geração de um 7B em GPU doméstica.
+DEFAULT_PROMPT_TPS = 500.0
+DEFAULT_COMPLETION_TPS = 25.0
+
+# Ideogramas, kana e hangul: cerca de um token por caractere
+CJK_RE = re.compile("[\u2e80-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+SUM_KEYS = ("n", "p", "c", "s", "pp", "cc", "pc", "ps", "cs")
+
+_PENDING: Dict[str, Dict[str, float]] = {}
+_PENDING_LOCK = threading.Lock()
+
+
+def estimate_tokens(text_or_chars, cjk_chars: int = 0) -> int:
+    """Token estimate: ~4 chars per token for alphabetic text, ~1 per CJK character.
+
+    Accepts a string, or a character count plus how many of them are CJK.
+    """
+    if isinstance(text_or_chars, str):
+        cjk_chars = len(CJK_RE.findall(text_or_chars))
+        text_or_chars = len(text_or_chars)
+    return max(1, int((text_or_chars - cjk_chars) / 4 + cjk_chars))
+
+
+def record_call(model: str, prompt_tokens: int, completion_tokens: int, seconds: float) -> None:
+    """Add one successful model call to the in-memory totals."""
+    p, c, s = float(prompt_tokens), float(completion_tokens), float(seconds)
+    with _PENDING_LOCK:
+        sums = _PENDING.setdefault(model, dict.fromkeys(SUM_KEYS, 0.0))
+        for key, value in (("n", 1), ("p", p), ("c", c), ("s", s), ("pp", p * p), ("cc", c * c),
+                           ("pc", p * c), ("ps", p * s), ("cs", c * s)):
+            sums[key] += value
+
+
+def perf_history_path(output_root: str) -> Path:
+    return Path(output_root) / PERF_HISTORY_NAME
+
+
+def load_perf_history(path: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """{host: {model: sums}} from disk (empty when missing or unreadable)."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def flush_perf_history(path: str, host: str = PERF_HOST) -> None:
+    """Merge the calls recorded since the last flush into the history file."""
+    with _PENDING_LOCK:
+        pending = dict(_PENDING)
+        _PENDING.clear()
+    if not pending:
+        return
+    history = load_perf_history(path)
+    models = history.setdefault(host, {})
+    for model, sums in pending.items():
+        stored = models.setdefault(model, dict.fromkeys(SUM_KEYS, 0.0))
+        for key in SUM_KEYS:
+            stored[key] = stored.get(key, 0.0) + sums[key]
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(".tmp")
+    tmp.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    os.replace(tmp, p)
+
+
+@dataclass(frozen=True)
+class ThroughputModel:
+    """Wall seconds of a call as a linear function of its prompt and completion tokens."""
+    seconds_per_prompt_token: float
+    seconds_per_completion_token: float
+    calls: int = 0
+
+    @property
+    def measured(self) -> bool:
+        return self.calls > 0
+
+    def seconds(self, prompt_tokens: float, completion_tokens: float) -> float:
+        return self.seconds_per_prompt_token * prompt_tokens + self.seconds_per_completion_token * completion_tokens
+
+
+DEFAULT_THROUGHPUT = ThroughputModel(1 / DEFAULT_PROMPT_TPS, 1 / DEFAULT_COMPLETION_TPS)
+
+
+def fit_throughput(sums: Dict[str, float]) -> ThroughputModel:
+    """Least-squares fit of `seconds ≈ a·prompt + b·completion` (no intercept) from running sums."""
+    n = int(sums.get("n", 0))
+    if n == 0 or sums.get("c", 0) <= 0:
+        return DEFAULT_THROUGHPUT
+    pp, cc, pc = sums["pp"], sums["cc"], sums["pc"]
+    ps, cs = sums["ps"], sums["cs"]
+    det = pp * cc - pc * pc
+    if n >= 3 and det > 1e-9 * pp * cc:
+        a = (ps * cc - cs * pc) / det
+        b = (cs * pp - ps * pc) / det
+        if a >= 0 and b > 0:
+            return ThroughputModel(a, b, n)
+    # Poucos pontos ou prompts/respostas proporcionais: atribua todo o tempo à geração.
+    return ThroughputModel(0.0, sums["s"] / sums["c"], n)
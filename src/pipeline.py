@@ -0,0 +1,425 @@
+"""Per-novel translation session (glossary, retrieval index, ledger) and chapter loop.
+
+`NovelSession` owns the state that is expensive to build — glossary store,
+context index, term extractor — so callers that translate chapter by chapter
+(the CLI, watch mode) load it once per novel and keep it warm.
+"""
+import fnmatch
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .document_loader import (
+    read_text_file,
+    normalize_stylistic_abbreviations,
+    normalize_chapter_titles,
+)
+from .glossary_engine import (
+    ensure_novel_session,
+    append_context_memory,
+    open_glossary_store,
+    load_novel_config,
+    export_terms_json,
+    suggestions_path,
+)
+from .glossary_artifact import load_layered_glossary
+from .glossary_matcher import get_glossary_matcher, glossary_changed
+from .translator_core import LARGE_TIER, chunk_profile, extract_new_terms, save_new_glossary_terms, translate_text
+from .chunk_controller import ADAPTIVE_CHUNKING, open_chunk_controller, save_chunk_controller
+from .continuity import EntityTable, SourceContinuity, build_continuity, longest_first
+from .term_extractor import TermExtractor
+from .context_index import open_context_index
+from .translation_memory import TRANSLATION_MEMORY, open_translation_memory
+from .exporter import (
+    create_docx,
+    export_volume,
+    export_stats_excel,
+    has_chapter_translation,
+    save_chapter_translation,
+)
+from .stats_ledger import STAT_SOURCE_TOKENS, STAT_TARGET_TOKENS, append_stats_row, ledger_path
+from .memory_profile import open_memory_profiler
+from .perf_history import estimate_tokens, flush_perf_history, perf_history_path
+
+
+def count_new_terms_in_source(source_text: str, glossary_keys) -> int:
+    # Very simple heuristic: count unique words (non-ascii sequences) not in glossary
+    tokens = set(re.findall(r"[\w\u4e00-\u9fff\uac00-\ud7af]+", source_text))
+    new = 0
+    for t in tokens:
+        if t not in glossary_keys:
+            # Heuristic: consider non-ASCII tokens/words as potential new terms
+            if any(ord(c) > 127 for c in t):
+                new += 1
+    return new
+
+
+def count_words(text: str) -> int:
+    """Count words in text (simple split on whitespace)."""
+    return len(text.split())
+
+
+def count_chars(text: str) -> int:
+    """Count characters in text (excluding whitespace)."""
+    return len(text.replace('\n', '').replace(' ', '').replace('\t', ''))
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() not in ("0", "false", "no", "off")
+
+
+# Capítulos traduzidos ao mesmo tempo (0/1 = um por vez, com contexto das traduções anteriores)
+PARALLEL_CHAPTERS = int(os.environ.get("PARALLEL_CHAPTERS", "0"))
+# No modo paralelo, capítulos com mais violações de glossário que isso são retraduzidos uma vez
+CONSISTENCY_MAX_VIOLATIONS = int(os.environ.get("CONSISTENCY_MAX_VIOLATIONS", "2"))
+
+
+def normalize_source(raw_text: str) -> Tuple[str, Optional[str]]:
+    """Semantic normalization applied before translation. Returns (text, detected title)."""
+    return normalize_chapter_titles(normalize_stylistic_abbreviations(raw_text))
+
+
+def chapter_sort_key(path: Path) -> Tuple:
+    """Natural order for chapter files ("2.txt" before "10.txt")."""
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part.lower()) for part in re.findall(r"\d+|\D+", path.name))
+
+
+def select_chapters(files: Iterable[Path], chapters: Optional[Iterable[str]] = None) -> List[Path]:
+    """Filter chapter files by name, stem or glob pattern (all files when `chapters` is empty)."""
+    files = sorted(files, key=chapter_sort_key)
+    wanted = [c for c in (chapters or []) if c]
+    if not wanted:
+        return files
+    return [
+        f for f in files
+        if any(w in (f.name, f.stem) or fnmatch.fnmatch(f.name, w) for w in wanted)
+    ]
+
+
+class NovelSession:
+    """Translation state of one novel: session dir, glossary, retrieval index and ledger."""
+
+    def __init__(self, novel_name: str, input_dir: Path, output_dir: Path):
+        self.novel_name = novel_name
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir)
+        # Diretório de saída para a novel específica.
+        self.out_novel_dir = self.output_dir / novel_name
+        self.out_novel_dir.mkdir(parents=True, exist_ok=True)
+        # Subdiretório 'session' para arquivos de estado (glossário, memória).
+        self.session_dir = self.out_novel_dir / "session"
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+
+        # Garanta os diretórios da sessão e carregue o glossário (global -> série -> novel) + índice de contexto.
+        ensure_novel_session(novel_name, str(self.session_dir))
+        self.glossary = load_layered_glossary(novel_name, str(self.session_dir))
+        self.context_index = open_context_index(novel_name, str(self.session_dir))
+        self.term_extractor = TermExtractor()
+        # Memória de tradução por parágrafo (TRANSLATION_MEMORY=0 desliga)
+        self.translation_memory = open_translation_memory(novel_name, str(self.session_dir)) if TRANSLATION_MEMORY else None
+        # Estatísticas por capítulo vão para o ledger CSV assim que cada capítulo termina
+        self.stats_ledger = str(ledger_path(str(self.out_novel_dir)))
+        self.api_key = os.environ.get("GOOGLE_API_KEY")
+        # Aspas 「」 ou travessão nos diálogos: glossary/{novel}/config.json, senão JAPANESE_MODE
+        japanese_mode = load_novel_config(novel_name).get("JAPANESE_MODE")
+        if isinstance(japanese_mode, str):
+            japanese_mode = japanese_mode.lower() not in ("0", "false", "no", "off")
+        self.japanese_mode = japanese_mode
+        # Tamanho de chunk adaptativo, retomado da última execução desta novel e modelo (ADAPTIVE_CHUNKING=1)
+        self.chunk_controller = (
+            open_chunk_controller(novel_name, LARGE_TIER.model, chunk_profile().chunk_size, str(self.session_dir))
+            if ADAPTIVE_CHUNKING else None
+        )
+        # Perfil de memória por etapa (MEMORY_PROFILE=1 ou --profile-memory)
+        self.memory_profiler = open_memory_profiler(str(self.out_novel_dir))
+        # Serializa ledger, memória de contexto e índice quando capítulos rodam em paralelo
+        self._write_lock = threading.Lock()
+
+    def chapter_files(self, chapters: Optional[Iterable[str]] = None, resume: bool = False) -> List[Path]:
+        """Chapters to translate; with `resume`, skip those already in the translation cache."""
+        files = select_chapters(self.input_dir.glob("*.txt"), chapters)
+        if resume:
+            files = [f for f in files if not has_chapter_translation(str(self.out_novel_dir), f.name)]
+        return files
+
+    def translate_chapter(self, f: Path) -> Optional[str]:
+        """Translate, export and index one chapter file. Returns the DOCX path, or None on failure."""
+        print(f"\n[{self.novel_name}] Processando: {f.name}")
+        try:
+            return self.translate_source(f.name, read_text_file(str(f)))[1]
+        except Exception:
+            return None
+
+    def translate_source(
+        self, chapter_filename: str, raw_text: str, continuity: Optional[SourceContinuity] = None
+    ) -> Tuple[str, str]:
+        """Translate, export and index one chapter given its text. Returns (translation, DOCX path).
+
+        On failure the error is recorded in the ledger and re-raised. With
+        `continuity` (parallel mode) it replaces the retrieval index as context,
+        and term extraction and indexing are left to `translate_parallel`.
+        """
+        novel_name = self.novel_name
+        start = time.time()
+        chapter_stats = {}
+        self._open_memory_profiler()
+        if self.memory_profiler is not None:
+            self.memory_profiler.begin_chapter(chapter_filename)
+
+        # Etapa de Carregamento e Normalização Semântica
+        print("  Aplicando normalização semântica...")
+        with self._memory_stage("normalização", chapter_stats):
+            clean_text, detected_title = normalize_source(raw_text)
+        if detected_title:
+            print(f"     → Título detectado e normalizado: '{detected_title}'")
+
+        # Traduza usando o Core. O contexto de capítulos anteriores é recuperado por chunk
+        # a partir do índice (top-k passagens relevantes), não colado por inteiro no prompt.
+        # Falhas ficam registradas no ledger; quem chama decide se continua.
+        try:
+            with self._memory_stage("tradução", chapter_stats):
+                translated = translate_text(
+                    clean_text,
+                    source_lang=None,
+                    glossary=self.glossary,
+                    api_key=self.api_key,
+                    glossary_path=str(self.session_dir) if continuity is None else None,
+                    novel_name=novel_name,
+                    enable_semantic_review=True,
+                    is_mature_content=True,
+                    term_extractor=self.term_extractor,
+                    context_index=self.context_index if continuity is None else continuity,
+                    stats=chapter_stats,
+                    translation_memory=self.translation_memory,
+                    japanese_mode=self.japanese_mode,
+                    chunk_controller=self.chunk_controller,
+                )
+        except Exception as e:
+            print(f"[{novel_name}] Erro ao traduzir {chapter_filename}: {e}")
+            self._save_chunking()
+            if self.memory_profiler is not None:
+                self.memory_profiler.end_chapter(chapter_stats)
+            # Grave a estatística de falha
+            self._append_stats(
+                {
+                    "Nome do Ficheiro": chapter_filename,
+                    "Palavras Originais": count_words(clean_text),
+                    "Palavras Traduzidas": 0,
+                    "Caracteres Originais": count_chars(clean_text),
+                    "Caracteres Traduzidos": 0,
+                    "Novos Termos no Glossário": 0,
+                    "Tempo de Execução (s)": 0,
+                    **chapter_stats,
+                }
+            )
+            raise
+
+        self._save_chunking()
+        with self._memory_stage("exportação", chapter_stats):
+            # Exporte para docx: salve na estrutura da pasta output/
+            docx_path = create_docx(chapter_filename, translated, str(self.out_novel_dir))
+            # Guarde a tradução no cache da sessão (usado pela exportação por volume e por `resume`)
+            save_chapter_translation(str(self.out_novel_dir), chapter_filename, translated)
+
+        # CRÍTICO: Indexe o capítulo para que os próximos recuperem a continuidade relevante.
+        if continuity is None:
+            with self._memory_stage("indexação", chapter_stats):
+                self._index_chapter(chapter_filename, clean_text, translated)
+
+        elapsed = time.time() - start
+        if self.memory_profiler is not None:
+            self.memory_profiler.end_chapter(chapter_stats)
+        self._append_stats(
+            {
+                "Nome do Ficheiro": chapter_filename,
+                "Palavras Originais": count_words(clean_text),
+                "Palavras Traduzidas": count_words(translated),
+                "Caracteres Originais": count_chars(clean_text),
+                "Caracteres Traduzidos": count_chars(translated),
+                "Novos Termos no Glossário": count_new_terms_in_source(clean_text, self.glossary.keys()),
+                "Tempo de Execução (s)": round(elapsed, 2),
+                # Tokens estimados: a razão de expansão do `plan` é em tokens, não em caracteres
+                STAT_SOURCE_TOKENS: estimate_tokens(clean_text),
+                STAT_TARGET_TOKENS: estimate_tokens(translated),
+                **chapter_stats,
+            }
+        )
+        if chapter_stats.get("Chunks Escalados"):
+            print(
+                f"[{novel_name}] Cascata: {chapter_stats['Chunks Escalados']}/"
+                f"{chapter_stats.get('Chunks Traduzidos', 0)} chunks escalados"
+            )
+        print(f"[{novel_name}] Escrito: {docx_path} (tempo {elapsed:.2f}s)")
+        return translated, docx_path
+
+    def _open_memory_profiler(self) -> None:
+        # Reaberto após `close` quando a sessão continua quente (watch, serve)
+        with self._write_lock:
+            if self.memory_profiler is None:
+                self.memory_profiler = open_memory_profiler(str(self.out_novel_dir))
+
+    def close(self) -> None:
+        """Stop the memory profiler (sampler thread and tracemalloc); a later chapter reopens it."""
+        with self._write_lock:
+            profiler, self.memory_profiler = self.memory_profiler, None
+        if profiler is not None:
+            profiler.close()
+
+    def _memory_stage(self, name: str, stats: Optional[Dict] = None):
+        """Profiled stage when MEMORY_PROFILE is on, otherwise a no-op context."""
+        if self.memory_profiler is None:
+            return nullcontext()
+        return self.memory_profiler.stage(name, stats)
+
+    def _append_stats(self, row: Dict) -> None:
+        with self._write_lock:
+            append_stats_row(self.stats_ledger, row)
+
+    def _save_chunking(self) -> None:
+        if self.chunk_controller is not None:
+            with self._write_lock:
+                save_chunk_controller(self.chunk_controller, self.novel_name, LARGE_TIER.model, str(self.session_dir))
+
+    def _index_chapter(self, chapter_filename: str, clean_text: str, translated: str) -> None:
+        with self._write_lock:
+            append_context_memory(self.novel_name, translated, base_dir=str(self.session_dir))
+            self.context_index.add_chapter(Path(chapter_filename).stem, clean_text, translated)
+
+    def translate_parallel(self, files: List[Path], workers: int) -> int:
+        """Translate `files` concurrently with source-side continuity. Returns how many succeeded.
+
+        Chapters are scheduled longest first on `workers` slots. Their context
+        is the entity table, summaries of the previous source chapters and
+        passages from runs before this one; the glossary stays fixed while the
+        batch runs. Afterwards, in reading order, new terms are extracted and
+        each chapter is checked against the updated glossary; chapters with
+        more than CONSISTENCY_MAX_VIOLATIONS violations are translated once more.
+        Only then are the final translations indexed.
+        """
+        novel_name = self.novel_name
+        # Resumos vêm de todos os capítulos do input (inclusive os fora da seleção)
+        every = select_chapters(self.input_dir.glob("*.txt"))
+        sources = {f.name: normalize_source(read_text_file(str(f)))[0] for f in every}
+        raw = {f.name: read_text_file(str(f)) for f in files}
+        entities = EntityTable.from_rows(open_glossary_store(novel_name, str(self.session_dir)).iter_terms())
+        continuity = build_continuity(list(sources.items()), entities, self.context_index)
+        print(
+            f"[{novel_name}] Modo paralelo: {len(files)} capítulos em {workers} vagas "
+            f"({len(entities)} personagens na tabela de entidades)"
+        )
+
+        def run(names: List[str]) -> Dict[str, str]:
+            def one(name: str) -> Optional[str]:
+                print(f"\n[{novel_name}] Processando: {name}")
+                try:
+                    return self.translate_source(name, raw[name], continuity=continuity[name])[0]
+                except Exception:
+                    return None
+
+            order = longest_first(sources, names)
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(order)))) as pool:
+                results = dict(zip(order, pool.map(one, order)))
+            return {name: text for name, text in results.items() if text is not None}
+
+        reading_order = [f.name for f in files]
+        translated = run(reading_order)
+
+        # Termos novos na ordem de leitura (o extrator acumula frequências entre capítulos)
+        for name in reading_order:
+            if name in translated:
+                new_terms = extract_new_terms(translated[name], self.glossary, self.term_extractor)
+                if new_terms:
+                    self.glossary.update(save_new_glossary_terms(new_terms, str(self.session_dir), novel_name))
+                    glossary_changed(self.glossary)
+
+        matcher = get_glossary_matcher(self.glossary)
+        failing = [
+            name for name in reading_order
+            if name in translated
+            and len(matcher.violations(sources[name], translated[name])) > CONSISTENCY_MAX_VIOLATIONS
+        ]
+        if failing:
+            print(f"[{novel_name}] Consistência: retraduzindo {len(failing)} capítulo(s): {', '.join(failing)}")
+            translated.update(run(failing))
+
+        for name in reading_order:
+            if name in translated:
+                self._index_chapter(name, sources[name], translated[name])
+        return len(translated)
+
+    def translate_snippet(self, text: str, review: bool = False) -> str:
+        """Translate a loose passage with the novel's glossary and context, without exporting or indexing it."""
+        return translate_text(
+            text,
+            source_lang=None,
+            glossary=self.glossary,
+            api_key=self.api_key,
+            enable_semantic_review=review,
+            is_mature_content=True,
+            context_index=self.context_index,
+            japanese_mode=self.japanese_mode,
+        )
+
+    def finish(self) -> None:
+        """End-of-run exports: terms.json, the stats XLSX and the optional volume."""
+        novel_name = self.novel_name
+        # Exporte o glossário da sessão para terms.json (formato de intercâmbio/edição manual)
+        terms_path = export_terms_json(novel_name, str(self.session_dir))
+        print(f"[{novel_name}] Glossário exportado: {terms_path}")
+
+        # Exporte o Excel a partir do ledger (STATS_XLSX=0 deixa só o CSV; gere depois com `stats --xlsx`)
+        print(f"[{novel_name}] Ledger de estatísticas: {self.stats_ledger}")
+        if _env_flag("STATS_XLSX", "1"):
+            stats_path = self.out_novel_dir / "stats_execucao.xlsx"
+            with self._memory_stage("estatísticas (xlsx)"):
+                export_stats_excel(self.stats_ledger, str(stats_path))
+            print(f"[{novel_name}] Estatísticas: {stats_path}")
+
+        # Exportação por volume opcional (ex: VOLUME_EXPORT_FORMATS=epub,docx)
+        volume_formats = [f for f in os.environ.get("VOLUME_EXPORT_FORMATS", "").split(",") if f.strip()]
+        if volume_formats:
+            with self._memory_stage("volume"):
+                export_volume(novel_name, str(self.input_dir), str(self.output_dir), formats=volume_formats)
+
+        # Vazão medida nesta execução, usada pelas projeções do `plan`
+        flush_perf_history(str(perf_history_path(str(self.output_dir))))
+
+        # Mostre a localização do arquivo de sugestões
+        print(f"[{novel_name}] Sugestões de termos: {suggestions_path(novel_name, str(self.session_dir))}")
+        self.close()
+
+
+def process_novel_session(
+    novel_name: str,
+    input_dir: Path,
+    output_dir: Path,
+    project_root: Optional[Path] = None,
+    chapters: Optional[Iterable[str]] = None,
+    resume: bool = False,
+    parallel: Optional[int] = None,
+) -> int:
+    """Translate the selected chapters of one novel. Returns how many were translated.
+
+    `parallel` (default PARALLEL_CHAPTERS) > 1 runs chapters concurrently; see
+    `NovelSession.translate_parallel`.
+    """
+    session = NovelSession(novel_name, input_dir, output_dir)
+    try:
+        files = session.chapter_files(chapters, resume=resume)
+        if not files:
+            print(f"[{novel_name}] Nenhum capítulo pendente.")
+            return 0
+        workers = PARALLEL_CHAPTERS if parallel is None else parallel
+        if workers > 1 and len(files) > 1:
+            done = session.translate_parallel(files, workers)
+        else:
+            done = sum(1 for f in files if session.translate_chapter(f))
+        session.finish()
+        return done
+    finally:
+        session.close()
@@ -0,0 +1,282 @@
+"""Dry-run planner: estimate calls, tokens and wall time before a run.
+
+Runs loading, normalization and `chunk_text_by_paragraphs` over the input
+tree exactly as the pipeline would, but never calls the model. For each
+novel it counts chunks and model calls (first pass, cascade escalations,
+fidelity and network retries, semantic reviews), estimates prompt and
+completion tokens from the real prompt templates and tracks how the
+retrieval context grows chapter after chapter.
+
+Rates (retries, escalations, translation expansion) come from the stats
+ledgers of previous runs, and wall time is projected for every host in
+`perf_history.json` from its measured throughput.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .context_index import CONTEXT_TOKEN_BUDGET, CONTEXT_TOP_K, format_context_block, split_paragraphs
+from .document_loader import normalize_chapter_titles, normalize_stylistic_abbreviations, read_text_file
+from .exporter import has_chapter_translation
+from .glossary_artifact import glossary_layers, merge_layers
+from .perf_history import (
+    DEFAULT_THROUGHPUT,
+    PERF_HOST,
+    ThroughputModel,
+    estimate_tokens,
+    fit_throughput,
+    load_perf_history,
+    perf_history_path,
+)
+from .pipeline import select_chapters
+from .stats_ledger import STAT_SOURCE_TOKENS, STAT_TARGET_TOKENS, ledger_path, read_stats_rows
+from . import translator_core as core
+
+# Taxas usadas quando ainda não há ledger de execuções anteriores
+DEFAULT_RATES = {
+    "fidelity_retry": 0.05,
+    "network_retry": 0.02,
+    "escalation": 0.25,
+    # Tokens da tradução por token do original
+    "expansion": 1.15,
+    "review_window": 0.3,
+}
+
+
+@dataclass
+class CallGroup:
+    """Model calls of one kind: how many, and their total prompt/completion tokens."""
+    model: str
+    calls: float = 0.0
+    prompt_tokens: float = 0.0
+    completion_tokens: float = 0.0
+
+    def add(self, calls: float, prompt_tokens: float, completion_tokens: float) -> None:
+        self.calls += calls
+        self.prompt_tokens += calls * prompt_tokens
+        self.completion_tokens += calls * completion_tokens
+
+
+@dataclass
+class NovelPlan:
+    novel: str
+    chapters: int = 0
+    chars: int = 0
+    chunks: int = 0
+    passages_before: int = 0
+    passages_after: int = 0
+    max_prompt_tokens: int = 0
+    groups: Dict[str, CallGroup] = field(default_factory=dict)
+
+    def group(self, name: str, model: str) -> CallGroup:
+        return self.groups.setdefault(name, CallGroup(model))
+
+    @property
+    def calls(self) -> float:
+        return sum(g.calls for g in self.groups.values())
+
+    @property
+    def prompt_tokens(self) -> float:
+        return sum(g.prompt_tokens for g in self.groups.values())
+
+    @property
+    def completion_tokens(self) -> float:
+        return sum(g.completion_tokens for g in self.groups.values())
+
+    def project_seconds(self, throughput: Dict[str, ThroughputModel], request_delay: float = 0.0) -> float:
+        """Wall time with one throughput model per model name (DEFAULT_THROUGHPUT if unknown)."""
+        total = self.calls * request_delay
+        for g in self.groups.values():
+            total += throughput.get(g.model, DEFAULT_THROUGHPUT).seconds(g.prompt_tokens, g.completion_tokens)
+        return total
+
+
+def history_rates(output_root: Path) -> Dict[str, float]:
+    """Retry/escalation/expansion rates aggregated over every ledger under `output_root`."""
+    totals = dict.fromkeys(
+        ("chunks", "fidelity", "network", "escalated", "src_tokens", "tgt_tokens", "reviewed", "unreviewed"), 0.0
+    )
+    ledgers = output_root.glob("*/" + ledger_path("").name) if output_root.exists() else []
+    for ledger in ledgers:
+        for row in read_stats_rows(str(ledger)):
+            if not row.get("Caracteres Traduzidos"):
+                continue
+            totals["chunks"] += row.get("Chunks Traduzidos", 0) or 0
+            totals["fidelity"] += row.get("Reprocessamentos de Fidelidade", 0) or 0
+            totals["network"] += row.get("Retentativas LLM", 0) or 0
+            totals["escalated"] += row.get("Chunks Escalados", 0) or 0
+            # Expansão em tokens: razão de caracteres superestima muito as saídas de fontes CJK.
+            # Linhas antigas, sem tokens estimados, ficam de fora.
+            if row.get(STAT_SOURCE_TOKENS) and row.get(STAT_TARGET_TOKENS):
+                totals["src_tokens"] += row[STAT_SOURCE_TOKENS]
+                totals["tgt_tokens"] += row[STAT_TARGET_TOKENS]
+            totals["reviewed"] += row.get("Janelas Revisadas", 0) or 0
+            totals["unreviewed"] += row.get("Janelas sem Revisão (Glossário OK)", 0) or 0
+    rates = dict(DEFAULT_RATES)
+    if totals["chunks"]:
+        rates["fidelity_retry"] = totals["fidelity"] / totals["chunks"]
+        rates["network_retry"] = totals["network"] / totals["chunks"]
+        if totals["escalated"]:
+            rates["escalation"] = totals["escalated"] / totals["chunks"]
+    if totals["reviewed"] + totals["unreviewed"]:
+        rates["review_window"] = totals["reviewed"] / (totals["reviewed"] + totals["unreviewed"])
+    if totals["src_tokens"]:
+        rates["expansion"] = totals["tgt_tokens"] / totals["src_tokens"]
+    return rates
+
+
+def _count_passages(path: Path) -> int:
+    if not path.exists():
+        return 0
+    with path.open("rb") as fh:
+        return sum(1 for _ in fh)
+
+
+def plan_novel(
+    novel_name: str,
+    input_dir: Path,
+    output_root: Path,
+    chapters: Optional[Iterable[str]] = None,
+    resume: bool = False,
+    rates: Optional[Dict[str, float]] = None,
+    enable_semantic_review: bool = True,
+) -> NovelPlan:
+    """Walk the chapters like `translate_text` would and tally the expected model calls."""
+    rates = rates or DEFAULT_RATES
+    out_novel_dir = Path(output_root) / novel_name
+    session_dir = out_novel_dir / "session"
+    glossary = merge_layers(glossary_layers(novel_name, str(session_dir) if session_dir.exists() else None))
+    plan = NovelPlan(novel_name)
+    # Mesmo chunking que translate_text usará (valores do `tune` ou env)
+    profile = core.chunk_profile()
+
+    # Prompt sem o texto: custo fixo de cada chamada (sistema + glossário + tarefa)
+    chunk_overhead = estimate_tokens(core.build_chunk_prompt("", glossary))
+    warning_overhead = estimate_tokens(core.build_chunk_prompt("", glossary, force_fidelity=True)) - chunk_overhead
+    review_overhead = estimate_tokens(core.build_review_prompt("", glossary))
+    context_header = estimate_tokens(format_context_block("-"))
+
+    passages = _count_passages(session_dir / "glossary" / novel_name / "context_index.jsonl")
+    plan.passages_before = passages
+    avg_passage_tokens = 0.0
+
+    files = select_chapters(Path(input_dir).glob("*.txt"), chapters)
+    if resume:
+        files = [f for f in files if not has_chapter_translation(str(out_novel_dir), f.name)]
+
+    for f in files:
+        text = normalize_stylistic_abbreviations(read_text_file(str(f)))
+        text, _ = normalize_chapter_titles(text)
+        plan.chapters += 1
+        plan.chars += len(text)
+        paragraphs = split_paragraphs(text)
+        if paragraphs:
+            chapter_passage = sum(estimate_tokens(p) for p in paragraphs) / len(paragraphs) * (1 + rates["expansion"])
+            avg_passage_tokens = chapter_passage if not avg_passage_tokens else (avg_passage_tokens + chapter_passage) / 2
+
+        # O contexto recuperado cresce até o orçamento conforme o índice ganha passagens.
+        context_tokens = 0
+        if passages:
+            context_tokens = context_header + min(CONTEXT_TOKEN_BUDGET, min(passages, CONTEXT_TOP_K) * avg_passage_tokens)
+
+        if len(text) < profile.chunk_size:
+            pieces = [text]
+        else:
+            pieces = [
+                chunk for chunk, _, _ in
+                core.chunk_text_by_paragraphs(text, chunk_size=profile.chunk_size, overlap=profile.overlap)
+            ]
+        plan.chunks += len(pieces)
+
+        chapter_completion = 0.0
+        for piece in pieces:
+            src_tokens = estimate_tokens(piece)
+            completion = src_tokens * rates["expansion"]
+            prompt = chunk_overhead + context_tokens + src_tokens
+            plan.max_prompt_tokens = max(plan.max_prompt_tokens, int(prompt + completion))
+            chapter_completion += completion
+            if core.CASCADE_MODE:
+                plan.group("primeira passagem (pequeno)", core.SMALL_TIER.model).add(1, prompt, completion)
+                plan.group("escalonamentos", core.LARGE_TIER.model).add(rates["escalation"], prompt, completion)
+            else:
+                plan.group("primeira passagem", core.LARGE_TIER.model).add(1, prompt, completion)
+            plan.group("reprocessamentos de fidelidade", core.LARGE_TIER.model).add(
+                rates["fidelity_retry"], prompt + warning_overhead, completion
+            )
+
+        if enable_semantic_review and len(pieces) > 1:
+            if core.REVIEW_GATE:
+                # Só as janelas com violações de glossário são revisadas
+                window = chapter_completion / len(pieces)
+                prompt = review_overhead + window
+                plan.group("revisão semântica", core.LARGE_TIER.model).add(
+                    len(pieces) * rates["review_window"], prompt, window
+                )
+            else:
+                prompt = review_overhead + chapter_completion
+                plan.max_prompt_tokens = max(plan.max_prompt_tokens, int(prompt + chapter_completion))
+                plan.group("revisão semântica", core.LARGE_TIER.model).add(1, prompt, chapter_completion)
+
+        passages += len(paragraphs)
+
+    # Retentativas de rede repetem uma fração de todas as chamadas
+    if plan.groups and rates["network_retry"]:
+        retry = plan.group("retentativas de rede", core.LARGE_TIER.model)
+        for g in [g for g in plan.groups.values() if g is not retry]:
+            retry.calls += g.calls * rates["network_retry"]
+            retry.prompt_tokens += g.prompt_tokens * rates["network_retry"]
+            retry.completion_tokens += g.completion_tokens * rates["network_retry"]
+    plan.passages_after = passages
+    return plan
+
+
+def host_throughputs(output_root: Path) -> Dict[str, Dict[str, ThroughputModel]]:
+    """Fitted throughput per host and model; the current host is always present."""
+    history = load_perf_history(str(perf_history_path(str(output_root))))
+    fitted = {host: {model: fit_throughput(sums) for model, sums in models.items()} for host, models in history.items()}
+    fitted.setdefault(PERF_HOST, {})
+    return fitted
+
+
+def _hours(seconds: float) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h{rest // 60:02d}m{rest % 60:02d}s"
+
+
+def format_plan(plans: List[NovelPlan], throughputs: Dict[str, Dict[str, ThroughputModel]], rates: Dict[str, float]) -> str:
+    lines = [
+        "Taxas: reprocessamento {:.1%}, retentativa {:.1%}, escalonamento {:.1%}, expansão {:.2f}x, "
+        "janelas revisadas {:.1%}".format(
+            rates["fidelity_retry"], rates["network_retry"], rates["escalation"], rates["expansion"],
+            rates.get("review_window", DEFAULT_RATES["review_window"]),
+        )
+    ]
+    delay = float(core.REQUEST_DELAY_SECONDS)
+    for plan in plans:
+        lines.append(
+            f"\n[{plan.novel}] {plan.chapters} capítulos, {plan.chars} caracteres, {plan.chunks} chunks"
+        )
+        for name, g in plan.groups.items():
+            lines.append(
+                f"  {name:<32} {g.calls:>8.1f} chamadas  {int(g.prompt_tokens):>10} tok prompt  "
+                f"{int(g.completion_tokens):>10} tok saída  ({g.model})"
+            )
+        lines.append(
+            f"  {'TOTAL':<32} {plan.calls:>8.1f} chamadas  {int(plan.prompt_tokens):>10} tok prompt  "
+            f"{int(plan.completion_tokens):>10} tok saída"
+        )
+        lines.append(
+            f"  Contexto: {plan.passages_before} → {plan.passages_after} passagens no índice; "
+            f"maior janela necessária ≈ {plan.max_prompt_tokens} tokens"
+        )
+        for host, models in sorted(throughputs.items()):
+            seconds = plan.project_seconds(models, delay)
+            measured = [m for m in {g.model for g in plan.groups.values()} if m in models and models[m].measured]
+            source = "medido" if measured else "padrão, sem histórico"
+            marker = " (este host)" if host == PERF_HOST else ""
+            lines.append(f"  Tempo estimado em {host}{marker}: {_hours(seconds)} ({source})")
+    if len(plans) > 1:
+        for host, models in sorted(throughputs.items()):
+            total = sum(p.project_seconds(models, delay) for p in plans)
+            lines.append(f"\nTotal em {host}: {_hours(total)}")
+    return "\n".join(lines)
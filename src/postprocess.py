@@ -0,0 +1,248 @@
+"""Paragraph-level post-processing of model output.
+
+The translated text used to go through `remove_translation_noise`,
+`fix_japanese_quotes`, glossary replacement and word counting one after the
+other, each splitting, rebuilding and copying the whole chapter string.
+`PostProcessor` splits the output into paragraphs once and runs every
+transform on one paragraph at a time, counting words on the way out; time
+spent in each transform is accumulated for the chapter stats.
+
+Transforms (POSTPROCESS_STEPS, in order):
+
+- "ruído":     disclaimers/preambles added by the model;
+- "aspas":     dialogue marks: 「」 with JAPANESE_MODE, else em-dash dialogue;
+- "glossário": source terms left untranslated -> glossary target;
+- "espaços":   trailing spaces on each line.
+
+JAPANESE_MODE comes from the novel's `glossary/{novel}/config.json` (see
+config/config.example.json), falling back to the env var.
+"""
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .glossary_matcher import GlossaryMatcher, get_glossary_matcher
+from .stream_guard import NOISE_PREFIX_RE
+
+# Padrão quando a novel não tem config.json com JAPANESE_MODE (1 = aspas 「」, como antes)
+JAPANESE_MODE = os.environ.get("JAPANESE_MODE", "1").lower() not in ("0", "false", "no", "off")
+DEFAULT_STEPS = ("ruído", "aspas", "glossário", "espaços")
+POSTPROCESS_STEPS = tuple(
+    s.strip() for s in os.environ.get("POSTPROCESS_STEPS", ",".join(DEFAULT_STEPS)).split(",") if s.strip()
+)
+
+PARAGRAPH_SPLIT_RE = re.compile(r"\n[ \t]*\n")
+DASH_LINE_RE = re.compile(r"^[ \t]*[-–—][ \t]*", re.M)
+QUOTE_LINE_RE = re.compile(r'^[ \t]*"([^"\n]*)"?[ \t]*([^\n]*)$', re.M)
+QUOTED_SPAN_RE = re.compile(r'"([^"\n]*)"?')
+
+
+def remove_translation_noise(text: str) -> str:
+    """
+    Remove avisos éticos, preâmbulos e poluição adicionados pelo modelo.
+
+    Padrões para remover:
+    - "Entendo que..." (preâmbulos de disclaimer)
+    - "No entanto..." (mas com avisos)
+    - "Por favor..." (pedidos educados antes/depois)
+    - "É importante..." (avisos éticos)
+    - "Ainda assim..." (concessões)
+    - Linhas com "---" (separadores)
+    - Avisos de conteúdo sensível
+    """
+    lines = text.split('\n')
+    cleaned_lines = []
+    skip_mode = False
+
+    for line in lines:
+        stripped = line.strip()
+
+        # Detectar início de avisos éticos
+        if NOISE_PREFIX_RE.match(stripped):
+            skip_mode = True
+            continue
+
+        # Linhas separadoras marcam fim de avisos
+        if stripped in ['---', ''] and skip_mode:
+            skip_mode = False
+            continue
+
+        # Ignorar linhas vazias do início de avisos
+        if skip_mode and stripped == '':
+            continue
+
+        # Se não é aviso, adicionar
+        if not skip_mode:
+            cleaned_lines.append(line)
+
+    # Remover linhas vazias no início e final
+    while cleaned_lines and cleaned_lines[0].strip() == '':
+        cleaned_lines.pop(0)
+    while cleaned_lines and cleaned_lines[-1].strip() == '':
+        cleaned_lines.pop()
+
+    return '\n'.join(cleaned_lines)
+
+
+def fix_japanese_quotes(text: str) -> str:
+    """
+    Corrige aspas japonesas invertidas ou mal formatadas.
+
+    Regra: Todo diálogo DEVE ser: 「texto」(não 」texto「)
+
+    Ordem CRÍTICA de processamento:
+    1. Remove triplas: 「」」 → 「
+    2. Corrige invertidas: 」...「 → 「...」 (ANTES de balancear!)
+    3. Remove duplicadas: 」」 → 」
+    4. Aspas duplas: "..." → 「...」
+    5. Travessões: — ... → 「...」
+    6. Balanceia casos faltando abertura/fechamento
+    """
+    # Step 0: Remove triplas malformadas 「」」 → 「
+    text = re.sub(r'「」」', r'「', text)
+
+    # Step 1: CRÍTICO - Corrige invertidas PRIMEIRO antes de qualquer balanceamento
+    # Padrão: fechamento + conteúdo + abertura → inverter
+    text = re.sub(r'」([^」「]*?)「', r'「\1」', text)
+
+    # Step 2: Remove fechamentos duplicados 」」 → 」 (mas não 」「)
+    text = re.sub(r'」」(?!「)', r'」', text)
+
+    # Step 3: Aspas duplas "..." → 「...」
+    quote_pairs = re.findall(r'"([^"]+)"', text)
+    for pair in quote_pairs:
+        text = text.replace(f'"{pair}"', f'「{pair}」', 1)
+
+    # Step 4: Travessão solo em contexto de diálogo
+    text = re.sub(r'—\s*([^。\n]+)', r'「\1」', text)
+
+    # Step 5: Balanceamento final linha por linha
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        open_count = line.count('「')
+        close_count = line.count('」')
+
+        # Mais fechamentos que aberturas - adicionar abertura antes do primeiro desbalanceado
+        while close_count > open_count:
+            for idx, ch in enumerate(line):
+                if ch == '」':
+                    before = line[:idx]
+                    if before.count('「') <= before.count('」'):
+                        line = line[:idx] + '「' + line[idx:]
+                        open_count += 1
+                        close_count = line.count('」')
+                        break
+            else:
+                break
+
+        # Mais aberturas que fechamentos - adicionar fechamento no final
+        while open_count > close_count:
+            line = line + '」'
+            close_count += 1
+
+        lines[i] = line
+
+    return '\n'.join(lines)
+
+
+def _dash_speech(speech: str, rest: str) -> str:
+    # Falas seguintes na mesma linha ('disse ela. "Venha aqui."') também viram travessão
+    span = QUOTED_SPAN_RE.search(rest)
+    if span:
+        head = rest[:span.start()].strip()
+        tail = _dash_speech(span.group(1), rest[span.end():].strip())
+        rest = f"{head} {tail}" if head else tail
+    return f"— {speech} — {rest}" if rest else f"— {speech}"
+
+
+def _quoted_line(m: "re.Match") -> str:
+    return _dash_speech(m.group(1), m.group(2))
+
+
+def dash_dialogue(text: str) -> str:
+    """PT-BR dialogue: lines opened by a hyphen/dash or a double quote start with "— ",
+    and narration after the closing quote is set off by another dash."""
+    text = DASH_LINE_RE.sub("— ", text)
+    return QUOTE_LINE_RE.sub(_quoted_line, text)
+
+
+def _noise(paragraph: str, processor: "PostProcessor") -> str:
+    return remove_translation_noise(paragraph)
+
+
+def _quotes(paragraph: str, processor: "PostProcessor") -> str:
+    return fix_japanese_quotes(paragraph) if processor.japanese_mode else dash_dialogue(paragraph)
+
+
+def _glossary(paragraph: str, processor: "PostProcessor") -> str:
+    return processor.matcher.replace(paragraph) if processor.matcher is not None else paragraph
+
+
+def _trailing_spaces(paragraph: str, processor: "PostProcessor") -> str:
+    return "\n".join(line.rstrip() for line in paragraph.split("\n"))
+
+
+TRANSFORMS: Dict[str, Callable[[str, "PostProcessor"], str]] = {
+    "ruído": _noise,
+    "aspas": _quotes,
+    "glossário": _glossary,
+    "espaços": _trailing_spaces,
+}
+
+
+@dataclass
+class PostResult:
+    text: str
+    words: int
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+
+class PostProcessor:
+    """Ordered paragraph transforms (names from TRANSFORMS) run in a single pass."""
+
+    def __init__(
+        self,
+        steps: Sequence[str] = POSTPROCESS_STEPS,
+        glossary: Optional[Dict[str, str]] = None,
+        japanese_mode: Optional[bool] = None,
+    ):
+        unknown = [s for s in steps if s not in TRANSFORMS]
+        if unknown:
+            raise ValueError(f"Etapas de pós-processamento desconhecidas: {', '.join(unknown)}")
+        self.steps = list(steps)
+        self.glossary = glossary or {}
+        # Um autômato por execução, não um lookup no cache por parágrafo
+        self.matcher: Optional[GlossaryMatcher] = (
+            get_glossary_matcher(self.glossary) if self.glossary and "glossário" in self.steps else None
+        )
+        self.japanese_mode = JAPANESE_MODE if japanese_mode is None else japanese_mode
+
+    def run(self, text: str) -> PostResult:
+        """Transformed text (paragraphs joined by one blank line) and its word count."""
+        seconds = {step: 0.0 for step in self.steps}
+        transforms = [(step, TRANSFORMS[step]) for step in self.steps]
+        out: List[str] = []
+        words = 0
+        for paragraph in PARAGRAPH_SPLIT_RE.split(text.replace("\r\n", "\n").replace("\r", "\n")):
+            for step, transform in transforms:
+                if not paragraph:
+                    break
+                start = time.perf_counter()
+                paragraph = transform(paragraph, self)
+                seconds[step] += time.perf_counter() - start
+            paragraph = paragraph.strip("\n")
+            if paragraph.strip():
+                out.append(paragraph)
+                words += len(paragraph.split())
+        return PostResult("\n\n".join(out), words, seconds)
+
+
+def postprocess(
+    text: str,
+    glossary: Optional[Dict[str, str]] = None,
+    japanese_mode: Optional[bool] = None,
+    steps: Sequence[str] = POSTPROCESS_STEPS,
+) -> PostResult:
+    return PostProcessor(steps, glossary, japanese_mode).run(text)
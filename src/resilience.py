@@ -0,0 +1,238 @@
+"""Retry, hedging and circuit breaking for LLM calls.
+
+`call_with_resilience` wraps a single backend call with:
+
+- a timeout scaled to the prompt size (instead of a flat OLLAMA_TIMEOUT);
+- retries with jittered exponential backoff ("full jitter");
+- optional hedging: if the call is slower than the endpoint's p95 for its size,
+  a duplicate is sent and whichever finishes first wins;
+- a per-endpoint circuit breaker that fails fast after repeated errors.
+
+Each event increments a counter in the caller's per-chapter stats dict.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+from .backends import OLLAMA_TIMEOUT, BackendTimeoutError
+
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "2.0"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "60"))
+
+# Timeout = LLM_TIMEOUT_MIN + LLM_TIMEOUT_PER_1K_CHARS por 1000 caracteres de prompt, limitado a OLLAMA_TIMEOUT
+LLM_TIMEOUT_MIN = float(os.environ.get("LLM_TIMEOUT_MIN", "30"))
+LLM_TIMEOUT_PER_1K_CHARS = float(os.environ.get("LLM_TIMEOUT_PER_1K_CHARS", "15"))
+
+# Hedging: envia uma cópia da requisição após o p95 de latência (precisa de histórico mínimo)
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "0").lower() in ("1", "true", "yes", "on")
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Circuit breaker: abre após N falhas seguidas e volta a testar após o cooldown
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "60"))
+
+# Nomes dos contadores gravados nas estatísticas do capítulo
+STAT_RETRIES = "Retentativas LLM"
+STAT_TIMEOUTS = "Timeouts LLM"
+STAT_HEDGES = "Requisições Hedge"
+STAT_HEDGE_WINS = "Hedges Vencedores"
+STAT_CIRCUIT_REJECTIONS = "Rejeições do Circuito"
+
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without contacting the endpoint while its circuit is open."""
+
+
+# Protege o dict de estatísticas do capítulo, atualizado por threads de chunks e de hedge;
+# translator_core usa a mesma trava para os seus contadores.
+STATS_LOCK = threading.Lock()
+
+
+def _bump(stats: Optional[Dict[str, Any]], key: str) -> None:
+    if stats is not None:
+        with STATS_LOCK:
+            stats[key] = stats.get(key, 0) + 1
+
+
+def scaled_timeout(payload_chars: int) -> float:
+    """Timeout proportional to the request size, capped at OLLAMA_TIMEOUT."""
+    return min(float(OLLAMA_TIMEOUT), LLM_TIMEOUT_MIN + LLM_TIMEOUT_PER_1K_CHARS * payload_chars / 1000)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures -> half-open after `reset_seconds`."""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._half_open_probe = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self.state
+            if state == "open":
+                raise CircuitOpenError(
+                    f"Circuito aberto após {self.failures} falhas seguidas; "
+                    f"nova tentativa em {self.reset_seconds - (time.monotonic() - self.opened_at):.0f}s"
+                )
+            if state == "half-open":
+                # Apenas uma requisição de teste passa enquanto o circuito está meio aberto.
+                if self._half_open_probe:
+                    raise CircuitOpenError("Circuito meio aberto: aguardando a requisição de teste")
+                self._half_open_probe = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._half_open_probe = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._half_open_probe = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling seconds-per-character samples of successful calls to one endpoint."""
+
+    def __init__(self, maxlen: int = 200):
+        self.samples: Deque[float] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, payload_chars: int) -> None:
+        with self._lock:
+            self.samples.append(seconds / max(1, payload_chars))
+
+    def p95_delay(self, payload_chars: int) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[int(0.95 * (len(ordered) - 1))] * payload_chars
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_LATENCIES: Dict[str, LatencyTracker] = {}
+_REGISTRY_LOCK = threading.Lock()
+# Threads para requisições hedge; a perdedora termina em segundo plano (HTTP síncrono não é cancelável).
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _REGISTRY_LOCK:
+        return _BREAKERS.setdefault(endpoint, CircuitBreaker())
+
+
+def get_latency_tracker(endpoint: str) -> LatencyTracker:
+    with _REGISTRY_LOCK:
+        return _LATENCIES.setdefault(endpoint, LatencyTracker())
+
+
+def _hedged_call(
+    fn: Callable[[float], T],
+    timeout: float,
+    delay: float,
+    stats: Optional[Dict[str, Any]],
+) -> T:
+    primary = _HEDGE_POOL.submit(fn, timeout)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    _bump(stats, STAT_HEDGES)
+    hedge = _HEDGE_POOL.submit(fn, timeout)
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    _bump(stats, STAT_HEDGE_WINS)
+                return future.result()
+            error = future.exception()
+    raise error  # type: ignore[misc]
+
+
+def call_with_resilience(
+    fn: Callable[[float], T],
+    endpoint: str,
+    payload_chars: int,
+    stats: Optional[Dict[str, Any]] = None,
+    max_retries: int = LLM_MAX_RETRIES,
+    hedge: bool = LLM_HEDGE,
+    is_complete: Optional[Callable[[T], bool]] = None,
+) -> T:
+    """Run `fn(timeout)` with retries, optional hedging and the endpoint's circuit breaker.
+
+    `fn` must raise RuntimeError (or a subclass) on failure. CircuitOpenError is
+    raised immediately while the endpoint's circuit is open. `fn` may run more
+    than once (retries) and concurrently (hedging), so it must not share
+    per-call state between invocations. A result for which `is_complete`
+    returns False (a stream the caller cut short) is not a latency sample for
+    hedging.
+    """
+    breaker = get_breaker(endpoint)
+    latency = get_latency_tracker(endpoint)
+    timeout = scaled_timeout(payload_chars)
+    last_error: Optional[RuntimeError] = None
+
+    for attempt in range(max_retries + 1):
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            _bump(stats, STAT_CIRCUIT_REJECTIONS)
+            raise
+        start = time.monotonic()
+        try:
+            delay = latency.p95_delay(payload_chars) if hedge else None
+            result = _hedged_call(fn, timeout, delay, stats) if delay else fn(timeout)
+        except RuntimeError as e:
+            breaker.record_failure()
+            last_error = e
+            if isinstance(e, BackendTimeoutError):
+                _bump(stats, STAT_TIMEOUTS)
+            if attempt >= max_retries:
+                break
+            _bump(stats, STAT_RETRIES)
+            wait_s = backoff_delay(attempt)
+            print(f"    Falha na chamada ao modelo ({e.__class__.__name__}); nova tentativa em {wait_s:.1f}s...")
+            time.sleep(wait_s)
+            continue
+        except BaseException:
+            # Erro inesperado (parse, OSError, interrupção): conta como falha e libera o teste do meio aberto
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        if is_complete is None or is_complete(result):
+            latency.record(time.monotonic() - start, payload_chars)
+        return result
+
+    assert last_error is not None
+    raise last_error
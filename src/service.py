@@ -0,0 +1,378 @@
+"""Local HTTP translation service (`python main.py serve`).
+
+Endpoints (JSON):
+
+- `POST /jobs` with `{"novel", "kind": "chapter"|"chunk", "text", "name"?, "review"?}`
+  queues a job and answers 202 with its id
+- `GET /jobs/<id>` returns the job status; `GET /jobs/<id>/result` its translation
+- `GET /jobs?novel=&status=` lists recent jobs; `GET /health` reports queue sizes
+
+Jobs live in a SQLite queue (`service_jobs.db` in the output directory), so
+queued work survives restarts. A pool of worker threads shares the process's
+backend connection and one warm `NovelSession` per novel. A novel is held by
+at most one worker at a time, and that worker drains the novel's jobs in
+submission order, so chapter N+1 always sees the context of chapter N.
+
+Chapter jobs produce the same artifacts as the CLI (DOCX, translation cache,
+ledger row, context index); chunk jobs are translated with the novel's
+glossary and context but leave no trace in the session.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+SERVICE_HOST = os.environ.get("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("SERVICE_PORT", "8765"))
+SERVICE_WORKERS = int(os.environ.get("SERVICE_WORKERS", "2"))
+# Tamanho máximo do corpo de uma requisição (bytes)
+SERVICE_MAX_BODY = int(os.environ.get("SERVICE_MAX_BODY", str(5 * 1024 * 1024)))
+
+JOB_KINDS = ("chapter", "chunk")
+NOVEL_NAME_RE = re.compile(r"^[\w][\w .\-]*$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    novel TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    review INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    source TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, novel, seq);
+"""
+
+# Colunas devolvidas no status (sem texto de origem/resultado)
+STATUS_COLUMNS = ("id", "novel", "kind", "name", "status", "error", "created_at", "started_at", "finished_at")
+
+BUSY_TIMEOUT_MS = 5000
+
+
+class JobStore:
+    """Persistent FIFO of translation jobs (SQLite, WAL)."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, novel: str, kind: str, text: str, name: str = "", review: bool = False) -> str:
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, novel, kind, name, review, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, novel, kind, name, int(review), text, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str, with_text: bool = False) -> Optional[Dict[str, Any]]:
+        columns = "*" if with_text else ", ".join(STATUS_COLUMNS)
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, novel: Optional[str] = None, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        where, params = [], []
+        if novel:
+            where.append("novel = ?")
+            params.append(novel)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        sql = f"SELECT {', '.join(STATUS_COLUMNS)} FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seq DESC LIMIT ?"
+        with self._transaction() as conn:
+            return [dict(r) for r in conn.execute(sql, params + [limit])]
+
+    def claim_next(self, novel: Optional[str] = None, exclude: Iterable = ()) -> Optional[Dict[str, Any]]:
+        """Atomically mark the oldest queued job as running and return it.
+
+        With `novel`, only that novel's jobs are considered; `exclude` skips
+        novels currently held by other workers.
+        """
+        where, params = ["status = 'queued'"], []
+        if novel is not None:
+            where.append("novel = ?")
+            params.append(novel)
+        excluded = list(exclude)
+        if excluded:
+            where.append(f"novel NOT IN ({', '.join('?' * len(excluded))})")
+            params.extend(excluded)
+        with self._transaction() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE {' AND '.join(where)} ORDER BY seq LIMIT 1", params
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE seq = ?", (time.time(), row["seq"]))
+        job = dict(row)
+        job["status"] = "running"
+        return job
+
+    def finish(self, job_id: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        status = "failed" if error is not None else "done"
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """Put jobs left 'running' by a crashed process back in the queue."""
+        with self._transaction() as conn:
+            return conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'").rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._transaction() as conn:
+            return {r[0]: r[1] for r in conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")}
+
+
+class WorkerPool:
+    """Worker threads that run queued jobs, one novel per worker at a time."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        input_root: Path,
+        output_root: Path,
+        workers: int = SERVICE_WORKERS,
+        session_factory: Optional[Callable] = None,
+    ):
+        self.store = store
+        self.input_root = Path(input_root)
+        self.output_root = Path(output_root)
+        self.workers = max(1, workers)
+        if session_factory is None:
+            from .pipeline import NovelSession
+            session_factory = NovelSession
+        self.session_factory = session_factory
+        self.sessions: Dict[str, Any] = {}
+        self._busy: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        requeued = self.store.requeue_running()
+        if requeued:
+            print(f"[serve] {requeued} jobs interrompidos voltaram para a fila")
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"nlp-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self.notify()
+        for t in self._threads:
+            t.join(timeout)
+
+    def notify(self) -> None:
+        """Wake idle workers (called after a job is submitted)."""
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _session(self, novel: str):
+        # Só o worker que detém a novel chega aqui, então a criação não disputa com outra thread.
+        if novel not in self.sessions:
+            input_dir = self.input_root / novel
+            self.sessions[novel] = self.session_factory(novel, input_dir, self.output_root)
+        return self.sessions[novel]
+
+    def _acquire(self) -> Optional[Dict[str, Any]]:
+        with self._wakeup:
+            while not self._stop.is_set():
+                job = self.store.claim_next(exclude=self._busy)
+                if job is not None:
+                    self._busy.add(job["novel"])
+                    return job
+                self._wakeup.wait(timeout=1.0)
+        return None
+
+    def _release(self, novel: str) -> None:
+        with self._wakeup:
+            self._busy.discard(novel)
+            self._wakeup.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            job = self._acquire()
+            if job is None:
+                return
+            novel = job["novel"]
+            chapters_done = False
+            try:
+                # Esvazie a fila desta novel antes de soltá-la: ordem e sessão quente garantidas.
+                while job is not None:
+                    chapters_done |= self._execute(job)
+                    job = None if self._stop.is_set() else self.store.claim_next(novel=novel)
+                if chapters_done:
+                    try:
+                        self._session(novel).finish()
+                    except Exception as e:
+                        print(f"[serve] Falha nas exportações de '{novel}': {e}")
+            finally:
+                self._release(novel)
+
+    def _execute(self, job: Dict[str, Any]) -> bool:
+        """Run one job and store its outcome. Returns True for successful chapter jobs."""
+        try:
+            session = self._session(job["novel"])
+            if job["kind"] == "chapter":
+                translated, _ = session.translate_source(job["name"] or f"{job['id']}.txt", job["source"])
+            else:
+                translated = session.translate_snippet(job["source"], review=bool(job["review"]))
+        except Exception as e:
+            self.store.finish(job["id"], error=f"{e.__class__.__name__}: {e}")
+            return False
+        self.store.finish(job["id"], result=translated)
+        return job["kind"] == "chapter"
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over the job store; `server.store` and `server.pool` are set by `serve`."""
+
+    server_version = "NLPService/1.0"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, code: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, code: int, message: str) -> None:
+        self._send(code, {"error": message})
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        store: JobStore = self.server.store  # type: ignore[attr-defined]
+        if parts == ["health"]:
+            self._send(200, {"status": "ok", "workers": self.server.pool.workers, "jobs": store.counts()})  # type: ignore[attr-defined]
+        elif parts == ["jobs"]:
+            query = parse_qs(url.query)
+            self._send(200, {"jobs": store.list(
+                novel=query.get("novel", [None])[0],
+                status=query.get("status", [None])[0],
+                limit=min(1000, int(query.get("limit", ["100"])[0] or 100)),
+            )})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = store.get(parts[1])
+            self._send(200, job) if job else self._error(404, "job não encontrado")
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            job = store.get(parts[1], with_text=True)
+            if not job:
+                self._error(404, "job não encontrado")
+            elif job["status"] == "done":
+                self._send(200, {"id": job["id"], "status": "done", "result": job["result"]})
+            elif job["status"] == "failed":
+                self._send(200, {"id": job["id"], "status": "failed", "error": job["error"]})
+            else:
+                self._send(409, {"id": job["id"], "status": job["status"]})
+        else:
+            self._error(404, "rota desconhecida")
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            self._error(404, "rota desconhecida")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > SERVICE_MAX_BODY:
+            self._error(413 if length > SERVICE_MAX_BODY else 400, "corpo ausente ou grande demais")
+            return
+        try:
+            data = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            self._error(400, "JSON inválido")
+            return
+        novel = str(data.get("novel") or "")
+        kind = str(data.get("kind") or "chapter")
+        text = data.get("text")
+        name = os.path.basename(str(data.get("name") or ""))
+        if not NOVEL_NAME_RE.match(novel):
+            self._error(400, "campo 'novel' ausente ou inválido")
+        elif kind not in JOB_KINDS:
+            self._error(400, f"'kind' deve ser um de: {', '.join(JOB_KINDS)}")
+        elif not isinstance(text, str) or not text.strip():
+            self._error(400, "campo 'text' ausente")
+        else:
+            if kind == "chapter" and name and not name.endswith(".txt"):
+                name += ".txt"
+            store: JobStore = self.server.store  # type: ignore[attr-defined]
+            job_id = store.submit(novel, kind, text, name=name, review=bool(data.get("review")))
+            self.server.pool.notify()  # type: ignore[attr-defined]
+            self._send(202, {"id": job_id, "status": "queued"})
+
+
+def make_server(
+    input_root: Path,
+    output_root: Path,
+    host: str = SERVICE_HOST,
+    port: int = SERVICE_PORT,
+    workers: int = SERVICE_WORKERS,
+    session_factory: Optional[Callable] = None,
+) -> ThreadingHTTPServer:
+    """Build the HTTP server with its job store and (started) worker pool."""
+    store = JobStore(str(Path(output_root) / "service_jobs.db"))
+    pool = WorkerPool(store, input_root, output_root, workers=workers, session_factory=session_factory)
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.store = store  # type: ignore[attr-defined]
+    server.pool = pool  # type: ignore[attr-defined]
+    pool.start()
+    return server
+
+
+def serve(input_root: Path, output_root: Path, host: str = SERVICE_HOST, port: int = SERVICE_PORT, workers: int = SERVICE_WORKERS) -> None:
+    server = make_server(input_root, output_root, host, port, workers)
+    print(f"[serve] Ouvindo em http://{host}:{server.server_address[1]} com {workers} workers. Ctrl+C para sair.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[serve] Encerrando...")
+    finally:
+        server.server_close()
+        server.pool.stop()  # type: ignore[attr-defined]
@@ -0,0 +1,92 @@
+"""Per-chapter stats ledger (CSV), appended as each chapter finishes.
+
+A crash mid-run no longer loses the stats of the chapters already done, and
+building the XLSX becomes an on-demand export (`exporter.write_stats_excel`).
+Counters that vary between runs (cascade, retries, ...) are kept as JSON in
+the `Métricas Extras` column and expanded back into columns on read.
+"""
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+LEDGER_NAME = "stats_execucao.csv"
+
+# Colunas fixas do ledger, na ordem da planilha
+BASE_COLUMNS = [
+    "Nome do Ficheiro",
+    "Palavras Originais",
+    "Palavras Traduzidas",
+    "Caracteres Originais",
+    "Caracteres Traduzidos",
+    "Novos Termos no Glossário",
+    "Tempo de Execução (s)",
+]
+TIMESTAMP_COLUMN = "Registrado em"
+EXTRA_COLUMN = "Métricas Extras"
+LEDGER_COLUMNS = BASE_COLUMNS + [TIMESTAMP_COLUMN, EXTRA_COLUMN]
+
+# Tokens estimados (perf_history.estimate_tokens) do original e da tradução
+STAT_SOURCE_TOKENS = "Tokens Originais (Est.)"
+STAT_TARGET_TOKENS = "Tokens Traduzidos (Est.)"
+
+
+def ledger_path(novel_output_dir: str) -> Path:
+    return Path(novel_output_dir) / LEDGER_NAME
+
+
+def append_stats_row(path: str, row: Dict[str, Any]) -> None:
+    """Append one chapter's stats to the ledger, writing the header on first use."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    is_new = not p.exists() or p.stat().st_size == 0
+    extras = {k: v for k, v in row.items() if k not in BASE_COLUMNS}
+    record = {c: row.get(c, "") for c in BASE_COLUMNS}
+    record[TIMESTAMP_COLUMN] = time.strftime("%Y-%m-%d %H:%M:%S")
+    record[EXTRA_COLUMN] = json.dumps(extras, ensure_ascii=False) if extras else ""
+    with p.open("a", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=LEDGER_COLUMNS)
+        if is_new:
+            writer.writeheader()
+        writer.writerow(record)
+
+
+def _number(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+def read_stats_rows(path: str, latest_only: bool = True) -> List[Dict[str, Any]]:
+    """Read ledger rows with extras expanded into columns.
+
+    With `latest_only`, a chapter translated in several runs keeps only its most
+    recent row (in the position of its first appearance).
+    """
+    p = Path(path)
+    if not p.exists():
+        return []
+    rows: List[Dict[str, Any]] = []
+    index: Dict[str, int] = {}
+    with p.open("r", encoding="utf-8", newline="") as fh:
+        for raw in csv.DictReader(fh):
+            row: Dict[str, Any] = {c: _number(raw.get(c) or "") if c in BASE_COLUMNS[1:] else raw.get(c, "") for c in BASE_COLUMNS}
+            row[TIMESTAMP_COLUMN] = raw.get(TIMESTAMP_COLUMN, "")
+            extras = raw.get(EXTRA_COLUMN) or ""
+            if extras:
+                try:
+                    row.update(json.loads(extras))
+                except ValueError:
+                    pass
+            name = row["Nome do Ficheiro"]
+            if latest_only and name in index:
+                rows[index[name]] = row
+            else:
+                index[name] = len(rows)
+                rows.append(row)
+    return rows
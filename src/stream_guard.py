@@ -0,0 +1,257 @@
+"""Checks that run on the model's token stream and stop a bad generation early.
+
+`remove_translation_noise` can only clean a response after it is complete;
+when the model opens with a refusal or disclaimer ("Entendo que...",
+"Aviso:"), or gets stuck repeating one sentence, waiting for the rest means
+paying for thousands of useless tokens. `StreamGuard` consumes the backend
+stream piece by piece and stops reading (which closes the connection and ends
+the generation server-side) as soon as one of its checks trips. The caller
+decides whether to retry.
+
+`output_token_cap` bounds every request (`num_predict`) from the source
+length, so a runaway that the checks miss still ends well before the timeout.
+A response that reaches the cap is asked again with a larger one
+(`raised_output_cap`); if the last attempt is still cut, `OutputTruncatedError`
+is raised instead of returning the partial text.
+"""
+import os
+import re
+import time
+from collections import Counter, deque
+from typing import Deque, Iterable, Iterator, List, Optional
+
+from .perf_history import estimate_tokens
+
+STREAM_GUARD = os.environ.get("STREAM_GUARD", "1").lower() not in ("0", "false", "no", "off")
+# Tentativas abortadas antes de aceitar a resposta inteira (a limpeza pós-geração continua valendo)
+STREAM_GUARD_RETRIES = int(os.environ.get("STREAM_GUARD_RETRIES", "2"))
+
+# Teto de tokens de saída (num_predict) = tokens do original x expansão esperada do PT-BR x folga.
+# NUM_PREDICT_HEADROOM=0 remove o teto.
+OUTPUT_EXPANSION_RATIO = float(os.environ.get("OUTPUT_EXPANSION_RATIO", "1.2"))
+NUM_PREDICT_HEADROOM = float(os.environ.get("NUM_PREDICT_HEADROOM", "1.5"))
+NUM_PREDICT_MIN = int(os.environ.get("NUM_PREDICT_MIN", "256"))
+
+# Loop: o mesmo n-grama de palavras repetido REPEAT_MAX_COUNT vezes nas últimas REPEAT_WINDOW_WORDS palavras
+REPEAT_NGRAM = int(os.environ.get("REPEAT_NGRAM", "8"))
+REPEAT_MAX_COUNT = int(os.environ.get("REPEAT_MAX_COUNT", "4"))
+REPEAT_WINDOW_WORDS = int(os.environ.get("REPEAT_WINDOW_WORDS", "400"))
+
+# Nomes dos contadores gravados nas estatísticas do capítulo
+STAT_PREAMBLE = "Gerações Abortadas (Preâmbulo)"
+STAT_REPETITION = "Gerações em Loop Canceladas"
+STAT_LENGTH_CAP = "Saídas no Limite de Tokens"
+STAT_SECONDS_SAVED = "Tempo Poupado por Abortos (s)"
+
+_HASH_BASE = 1_000_003
+_HASH_MOD = (1 << 61) - 1
+
+# Início de linha que marca aviso ético/preâmbulo (também usado por remove_translation_noise)
+NOISE_PREFIXES = (
+    "Entendo que",
+    "No entanto",
+    "Por favor",
+    "É importante",
+    "Ainda assim",
+    "Aviso:",
+    "AVISO:",
+    "Este texto",
+    "Este tipo",
+    "Conteúdo",
+    "conteúdo",
+    "Além disso",
+)
+NOISE_PREFIX_RE = re.compile("|".join(re.escape(p) for p in NOISE_PREFIXES))
+
+# Aberturas de aviso/preâmbulo que abortam o stream. Só frases de disclaimer: conectivos
+# comuns ("No entanto", "Além disso", "Por favor" num diálogo) abrem prosa legítima.
+PREAMBLE_PHRASES = (
+    r"Entendo que",
+    r"Compreendo que",
+    r"Aviso\s*:",
+    r"AVISO\s*:",
+    r"Nota\s*:",
+    r"Observação\s*:",
+    r"Como (?:um |uma )?(?:modelo de linguagem|assistente|IA)\b",
+    r"(?:Desculpe|Lamento|Sinto muito),? mas",
+    r"Não posso (?:traduzir|ajudar|fornecer|continuar)",
+    r"(?:Aqui está|Segue) (?:a|uma) tradução",
+    r"Tradução\s*:",
+    r"É importante (?:notar|ressaltar|destacar|lembrar|mencionar)",
+    r"Por favor,? (?:note|observe|tenha em mente|esteja ciente)",
+    r"Este (?:texto|conteúdo|trecho) (?:contém|aborda|descreve|inclui|apresenta)",
+    r"Este tipo de conteúdo",
+    r"Conteúdo (?:sensível|adulto|explícito)",
+)
+PREAMBLE_RE = re.compile("|".join(PREAMBLE_PHRASES))
+# A abertura é decidida na primeira quebra de linha ou após estes caracteres
+_PREAMBLE_WINDOW = 80
+
+
+class OutputTruncatedError(RuntimeError):
+    """The response still reached its output token cap on the last attempt."""
+
+
+class PreambleCheck:
+    """Trips when the first non-empty line of the output opens with a disclaimer phrase.
+
+    Matches `PREAMBLE_PHRASES` only (refusals, notes, "here is the
+    translation"), not connectives a translation may legitimately start with.
+    Decides once: as soon as a phrase matches, or clears the output once the
+    opening line is complete or `_PREAMBLE_WINDOW` chars long; later lines are
+    left to `remove_translation_noise`.
+    """
+
+    reason = "preâmbulo"
+    stat = STAT_PREAMBLE
+
+    def __init__(self):
+        self._opening = ""
+        self._decided = False
+
+    def feed(self, piece: str) -> Optional[str]:
+        if self._decided:
+            return None
+        self._opening = (self._opening + piece).lstrip()
+        if PREAMBLE_RE.match(self._opening):
+            self._decided = True
+            return self.reason
+        if "\n" in self._opening or len(self._opening) >= _PREAMBLE_WINDOW:
+            self._decided = True
+        return None
+
+
+class RepetitionCheck:
+    """Trips when the output loops: one word n-gram recurs too often in a recent window.
+
+    Keeps a rolling polynomial hash over the last `n` words, so each new word
+    costs O(1). N-grams with fewer than three distinct words ("ha ha ha...")
+    are ignored; onomatopoeia is legitimate prose. `allowance` raises the
+    limit when the source itself repeats (see `source_repeat_count`).
+    """
+
+    reason = "repetição"
+    stat = STAT_REPETITION
+
+    def __init__(
+        self,
+        n: int = REPEAT_NGRAM,
+        max_count: int = REPEAT_MAX_COUNT,
+        window: int = REPEAT_WINDOW_WORDS,
+        allowance: int = 0,
+    ):
+        self.n = n
+        self.max_count = max_count + allowance
+        self.window = window
+        self._partial = ""
+        self._words: Deque[int] = deque(maxlen=n)
+        self._hash = 0
+        self._drop = pow(_HASH_BASE, n - 1, _HASH_MOD)
+        self._recent: Deque[int] = deque()
+        self._counts: Counter = Counter()
+
+    def _push(self, word: str) -> bool:
+        h = hash(word.lower()) % _HASH_MOD
+        if len(self._words) == self.n:
+            self._hash = (self._hash - self._words[0] * self._drop) % _HASH_MOD
+        self._words.append(h)
+        self._hash = (self._hash * _HASH_BASE + h) % _HASH_MOD
+        if len(self._words) < self.n or len(set(self._words)) < 3:
+            return False
+        self._recent.append(self._hash)
+        self._counts[self._hash] += 1
+        if len(self._recent) > self.window:
+            old = self._recent.popleft()
+            self._counts[old] -= 1
+        return self._counts[self._hash] >= self.max_count
+
+    def feed(self, piece: str) -> Optional[str]:
+        words = (self._partial + piece).split()
+        # A última palavra pode continuar no próximo pedaço
+        self._partial = "" if not words or piece[-1:].isspace() else words.pop()
+        for word in words:
+            if self._push(word):
+                return self.reason
+        return None
+
+
+def source_repeat_count(text: str, n: int = REPEAT_NGRAM) -> int:
+    """How often the source's most repeated word n-gram occurs (repeated status lines, refrains).
+
+    A faithful translation repeats about as much, so this is added to the loop limit.
+    """
+    words = [w.lower() for w in text.split()]
+    if len(words) < n:
+        return 0
+    counts = Counter(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+    return max(counts.values())
+
+
+class StreamGuard:
+    """Consume a token stream, stopping at the first check that trips.
+
+    Checks are objects with `feed(piece) -> Optional[str]` returning the reason
+    to abort. After `consume`, `aborted` holds that reason (None if the stream
+    ran to the end), `pieces` the number of pieces read and
+    `first_piece_seconds` / `elapsed` the timings used by `seconds_saved`.
+    """
+
+    def __init__(self, checks: Iterable):
+        self.checks = list(checks)
+        self.aborted: Optional[str] = None
+        self.aborted_stat = ""
+        self.pieces = 0
+        self.first_piece_seconds = 0.0
+        self.elapsed = 0.0
+
+    def consume(self, stream: Iterator[str]) -> str:
+        start = time.monotonic()
+        parts: List[str] = []
+        try:
+            for piece in stream:
+                if not self.pieces:
+                    self.first_piece_seconds = time.monotonic() - start
+                self.pieces += 1
+                parts.append(piece)
+                for check in self.checks:
+                    reason = check.feed(piece)
+                    if reason:
+                        self.aborted, self.aborted_stat = reason, check.stat
+                        break
+                if self.aborted:
+                    break
+        finally:
+            # Fechar o gerador encerra a conexão e a geração no servidor
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            self.elapsed = time.monotonic() - start
+        return "".join(parts)
+
+    def seconds_saved(self, expected_pieces: float, fallback_seconds_per_piece: float) -> float:
+        """Generation time skipped by aborting: remaining pieces at this stream's decode rate."""
+        if not self.aborted or expected_pieces <= self.pieces:
+            return 0.0
+        if self.pieces > 1:
+            per_piece = (self.elapsed - self.first_piece_seconds) / (self.pieces - 1)
+        else:
+            per_piece = fallback_seconds_per_piece
+        return (expected_pieces - self.pieces) * per_piece
+
+
+def output_token_cap(source: str, expansion: float = OUTPUT_EXPANSION_RATIO) -> int:
+    """`num_predict` for a request whose output should be about `expansion` x the source (0 = no cap)."""
+    if not NUM_PREDICT_HEADROOM:
+        return 0
+    return max(NUM_PREDICT_MIN, int(estimate_tokens(source) * expansion * NUM_PREDICT_HEADROOM))
+
+
+def raised_output_cap(cap: int, prompt_tokens: int, num_ctx: int = 0) -> int:
+    """Cap for the retry of a response cut at `cap`: doubled, within what `num_ctx` leaves free.
+
+    Returns 0 when the context window leaves no room to raise it.
+    """
+    raised = cap * 2
+    if num_ctx:
+        raised = min(raised, num_ctx - prompt_tokens)
+    return raised if raised > cap else 0
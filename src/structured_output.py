@@ -0,0 +1,104 @@
+"""Paragraph-indexed JSON output (STRUCTURED_OUTPUT=1).
+
+Free-form output needs heuristics before it can be trusted: word-count
+fidelity, noise stripping, a full-chapter review and proportional paragraph
+alignment. In structured mode each batch of source paragraphs goes to the
+model as `{"paragraphs": [{"id": 1, "text": ...}, ...]}` and the backend is
+asked (Ollama `format`, OpenAI `response_format`, llama.cpp `json_schema`)
+to answer with the same shape, so:
+
+- a missing or empty id is known exactly and only that paragraph is asked again;
+- stitching is `"\\n\\n".join` in id order and alignment with the source is 1:1;
+- the DOCX gets one paragraph per source paragraph.
+"""
+import json
+import os
+import re
+from typing import Dict, List, Sequence
+
+STRUCTURED_OUTPUT = os.environ.get("STRUCTURED_OUTPUT", "0").lower() not in ("0", "false", "no", "off")
+# Novas tentativas (um parágrafo por pedido) para ids ausentes ou vazios na resposta
+STRUCTURED_RETRIES = int(os.environ.get("STRUCTURED_RETRIES", "2"))
+
+STAT_INVALID_JSON = "Respostas JSON Inválidas"
+STAT_MISSING_IDS = "Parágrafos Ausentes (JSON)"
+STAT_RETRIED_IDS = "Parágrafos Re-pedidos (JSON)"
+
+RESPONSE_SCHEMA: Dict = {
+    "type": "object",
+    "properties": {
+        "paragraphs": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "text": {"type": "string"},
+                },
+                "required": ["id", "text"],
+            },
+        },
+    },
+    "required": ["paragraphs"],
+}
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+_BLANK_LINES_RE = re.compile(r"\n[ \t]*\n+")
+
+
+def encode_paragraphs(paragraphs: Sequence[str], first_id: int = 1) -> str:
+    """The batch as sent to the model: ids are 1-based positions in `paragraphs`."""
+    items = [{"id": first_id + i, "text": text} for i, text in enumerate(paragraphs)]
+    return json.dumps({"paragraphs": items}, ensure_ascii=False, indent=1)
+
+
+def as_paragraph(text: str) -> str:
+    """`text` as a single paragraph (blank lines collapsed), for free-form fallbacks."""
+    return _BLANK_LINES_RE.sub("\n", text.strip())
+
+
+def parse_paragraphs(raw: str) -> Dict[int, str]:
+    """`{id: text}` from a model response; empty when it is not the expected JSON.
+
+    Texts are stripped and blank lines inside one text are collapsed, so a
+    translated paragraph can never turn into two.
+    """
+    try:
+        data = json.loads(_FENCE_RE.sub("", raw))
+    except ValueError:
+        return {}
+    items = data.get("paragraphs") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return {}
+    out: Dict[int, str] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            pid = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        text = item.get("text")
+        if isinstance(text, str) and text.strip():
+            out[pid] = as_paragraph(text)
+    return out
+
+
+def missing_ids(expected: Sequence[int], parsed: Dict[int, str]) -> List[int]:
+    return [pid for pid in expected if not parsed.get(pid)]
+
+
+def batch_paragraphs(paragraphs: Sequence[str], max_chars: int) -> List[List[int]]:
+    """Indexes of `paragraphs` grouped into consecutive batches of about `max_chars` (no overlap)."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    size = 0
+    for i, paragraph in enumerate(paragraphs):
+        if current and size + len(paragraph) > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += len(paragraph) + 2
+    if current:
+        batches.append(current)
+    return batches
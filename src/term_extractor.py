@@ -0,0 +1,152 @@
+"""One-pass proper-noun extraction with cross-chapter accumulation.
+
+`TermExtractor.feed` tokenizes a translated chapter once and, in the same
+pass, counts capitalized candidates, records the first position of each one
+and detects multi-word names ("Rimuru Tempest"); the words of a multi-word
+name are not counted on their own. Counts accumulate across every chapter
+fed to the same instance, so a name that appears once per chapter is still
+picked up after a few chapters.
+
+The type comes from the term's own words ("Floresta Jura") or a cue word
+right next to it ("a cidade de Ingrassia"), not from anywhere in the
+surrounding sentence.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent.parent / "config" / "term_extraction.json"
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Critérios de seleção (mesmos do extrator original).
+MIN_FREQUENCY = 2
+MIN_LENGTH = 4
+CONTEXT_RADIUS = 60
+
+# Preposições puladas entre a palavra-pista e o termo ("cidade de Ingrassia")
+LINKING_WORDS = frozenset({"de", "do", "da", "dos", "das"})
+
+
+@lru_cache(maxsize=None)
+def load_extraction_config(path: Optional[str] = None) -> Tuple[FrozenSet[str], FrozenSet[str], Tuple[Tuple[str, Tuple[str, ...]], ...]]:
+    """Load and compile the stopword sets once per process.
+
+    Returns (common_words, english_indicators, type_hints). The path defaults to
+    `config/term_extraction.json` and can be overridden with TERM_EXTRACTION_CONFIG.
+    """
+    cfg_path = Path(path or os.environ.get("TERM_EXTRACTION_CONFIG") or DEFAULT_CONFIG_PATH)
+    try:
+        data = json.loads(cfg_path.read_text(encoding="utf-8"))
+    except Exception:
+        data = {}
+    common = frozenset(data.get("common_words", []))
+    english = frozenset(data.get("english_indicators", []))
+    hints = tuple(
+        (term_type, tuple(words)) for term_type, words in data.get("type_hints", {}).items()
+    )
+    return common, english, hints
+
+
+class TermExtractor:
+    """Accumulates proper-noun candidates over the chapters of a session."""
+
+    def __init__(self, config_path: Optional[str] = None, min_frequency: int = MIN_FREQUENCY):
+        self.common_words, self.english_indicators, self.type_hints = load_extraction_config(config_path)
+        self.min_frequency = min_frequency
+        self.frequency: Dict[str, int] = {}
+        self.context: Dict[str, str] = {}
+        # Posição do termo dentro do seu contexto (para achar as palavras vizinhas)
+        self.context_offset: Dict[str, int] = {}
+        self._emitted: Set[str] = set()
+
+    def _is_candidate_word(self, token: str) -> bool:
+        return (
+            token[0].isupper()
+            and not token[0].isdigit()
+            and token not in self.common_words
+            and token not in self.english_indicators
+        )
+
+    def _record(self, term: str, text: str, start: int, end: int) -> None:
+        count = self.frequency.get(term)
+        if count is None:
+            self.frequency[term] = 1
+            context_start = max(0, start - CONTEXT_RADIUS)
+            self.context[term] = text[context_start:min(len(text), end + CONTEXT_RADIUS)]
+            self.context_offset[term] = start - context_start
+        else:
+            self.frequency[term] = count + 1
+
+    def _flush_run(self, run: list, text: str) -> None:
+        if len(run) >= 2:
+            phrase = " ".join(m.group() for m in run)
+            self._record(phrase, text, run[0].start(), run[-1].end())
+        elif run and len(run[0].group()) >= MIN_LENGTH:
+            self._record(run[0].group(), text, run[0].start(), run[0].end())
+
+    def feed(self, text: str) -> None:
+        """Tokenize `text` once, updating counts, first contexts and multi-word names."""
+        run: list = []
+        prev_end = -1
+        for m in TOKEN_RE.finditer(text):
+            token = m.group()
+            if self._is_candidate_word(token):
+                # Nomes compostos: palavras capitalizadas separadas por um único espaço.
+                if run and text[prev_end:m.start()] != " ":
+                    self._flush_run(run, text)
+                    run = []
+                run.append(m)
+            elif run:
+                self._flush_run(run, text)
+                run = []
+            prev_end = m.end()
+        self._flush_run(run, text)
+
+    def _hint_type(self, word: str) -> Optional[str]:
+        word = word.lower()
+        for term_type, words in self.type_hints:
+            if word in words or (word.endswith("s") and word[:-1] in words):
+                return term_type
+        return None
+
+    def _classify(self, term: str) -> str:
+        """Type from the term's own words, else from the cue word right before or after it."""
+        context = self.context.get(term, "")
+        offset = self.context_offset.get(term, 0)
+        before = TOKEN_RE.findall(context[:offset])
+        after = TOKEN_RE.findall(context[offset + len(term):])
+        if len(before) >= 2 and before[-1].lower() in LINKING_WORDS:
+            before.pop()
+        neighbours = before[-1:] + after[:1]
+        for word in TOKEN_RE.findall(term) + neighbours:
+            term_type = self._hint_type(word)
+            if term_type:
+                return term_type
+        return "character"
+
+    def candidates(self, known_terms: Iterable[str] = ()) -> Dict[str, Dict]:
+        """Return terms that reached `min_frequency` and were not emitted before.
+
+        Each term is emitted once per session; its `frequency` is the
+        accumulated count over all chapters fed so far.
+        """
+        known = set(known_terms)
+        new_terms = {}
+        for term, freq in self.frequency.items():
+            if freq < self.min_frequency or term in known or term in self._emitted:
+                continue
+            if len(term) < MIN_LENGTH:
+                continue
+            context = self.context.get(term, "")
+            new_terms[term] = {
+                "type": self._classify(term),
+                "pt_br": term,
+                "frequency": freq,
+                "context": context,
+            }
+            self._emitted.add(term)
+        return new_terms
@@ -0,0 +1,292 @@
+"""Paragraph-level translation memory with exact and fuzzy (MinHash) lookup.
+
+Web novels repeat whole paragraphs with small changes: status windows,
+skill announcements, "System:" messages, recaps. Each translated paragraph
+is stored per novel in `tm.db` (SQLite, next to `terms.db`):
+
+- exact hit (same text up to whitespace) -> the stored translation is reused;
+- same text except for numbers ("Level 5" vs "Level 6", looked up by a
+  digit-masked hash) -> reused with the numbers swapped in, when the stored
+  translation carries them in order;
+- fuzzy hit at or above TM_FUZZY_THRESHOLD (character 4-gram Jaccard, found
+  through a MinHash LSH index) -> the stored pair is given to the model as a
+  reference ("pre-fill") instead of being reused blindly.
+
+Signatures are persisted with the segments, so reopening a memory only
+rebuilds the in-memory LSH buckets.
+"""
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+TRANSLATION_MEMORY = os.environ.get("TRANSLATION_MEMORY", "1").lower() not in ("0", "false", "no", "off")
+# Similaridade mínima (Jaccard de 4-gramas) para usar um segmento parecido como referência no prompt
+TM_FUZZY_THRESHOLD = float(os.environ.get("TM_FUZZY_THRESHOLD", "0.85"))
+# Segmentos menores que isso não entram na busca aproximada (só igualdade, inclusive por números)
+TM_MIN_FUZZY_CHARS = int(os.environ.get("TM_MIN_FUZZY_CHARS", "20"))
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1729)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+WHITESPACE_RE = re.compile(r"\s+")
+NUMBER_RE = re.compile(r"\d+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    hash TEXT PRIMARY KEY,
+    skeleton TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    signature BLOB,
+    uses INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_segments_skeleton ON segments(skeleton);
+"""
+
+BUSY_TIMEOUT_MS = 5000
+
+
+def normalize_segment(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def segment_hash(text: str) -> str:
+    return hashlib.sha1(normalize_segment(text).encode("utf-8")).hexdigest()
+
+
+def skeleton_hash(text: str) -> str:
+    """Hash of the segment with every number masked: equal for "Level 5" and "Level 6"."""
+    return segment_hash(NUMBER_RE.sub("#", normalize_segment(text)))
+
+
+def shingles(text: str) -> Set[str]:
+    norm = normalize_segment(text).lower()
+    if len(norm) <= SHINGLE_SIZE:
+        return {norm}
+    return {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(grams: Iterable[str]) -> Tuple[int, ...]:
+    """MinHash signature (NUM_PERM values) over stable crc32 hashes of the shingles."""
+    values = [zlib.crc32(g.encode("utf-8")) for g in grams] or [0]
+    return tuple(min(((a * x + b) % _PRIME) & _MAX_HASH for x in values) for a, b in _PERMS)
+
+
+def renumber(old_source: str, new_source: str, old_target: str) -> Optional[str]:
+    """Reuse `old_target` for `new_source` when the sources differ only in numbers.
+
+    Returns None unless both sources share the same non-numeric skeleton and
+    the target carries the old numbers in the same order.
+    """
+    if NUMBER_RE.sub("#", normalize_segment(old_source)) != NUMBER_RE.sub("#", normalize_segment(new_source)):
+        return None
+    old_nums = NUMBER_RE.findall(old_source)
+    new_nums = NUMBER_RE.findall(new_source)
+    if NUMBER_RE.findall(old_target) != old_nums:
+        return None
+    replacements = iter(new_nums)
+    return NUMBER_RE.sub(lambda m: next(replacements), old_target)
+
+
+@dataclass
+class MemoryMatch:
+    """Lookup result for one source segment."""
+    source: str
+    kind: str  # "exact", "numbers", "fuzzy" ou "none"
+    target: Optional[str] = None
+    similarity: float = 0.0
+    reference_source: str = ""
+    reference_target: str = ""
+
+    @property
+    def reusable(self) -> bool:
+        return self.kind in ("exact", "numbers")
+
+
+class TranslationMemory:
+    """Per-novel segment store with an in-memory MinHash LSH index."""
+
+    def __init__(self, db_path: str, fuzzy_threshold: float = TM_FUZZY_THRESHOLD):
+        self.db_path = str(db_path)
+        self.fuzzy_threshold = fuzzy_threshold
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            rows = conn.execute("SELECT hash, signature FROM segments WHERE signature IS NOT NULL").fetchall()
+        for row in rows:
+            self._index(row["hash"], tuple(array("Q", row["signature"])))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _index(self, seg_hash: str, signature: Tuple[int, ...]) -> None:
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS])
+            self._buckets.setdefault(key, []).append(seg_hash)
+
+    def __len__(self) -> int:
+        with self._transaction() as conn:
+            return conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    def add(self, pairs: Iterable[Tuple[str, str]]) -> int:
+        """Store (source, target) segment pairs; existing sources get the newer translation."""
+        rows = []
+        for source, target in pairs:
+            source, target = source.strip(), target.strip()
+            if not source or not target:
+                continue
+            seg_hash = segment_hash(source)
+            signature = None
+            if len(source) >= TM_MIN_FUZZY_CHARS:
+                signature = minhash(shingles(source))
+            rows.append((seg_hash, skeleton_hash(source), source, target, signature))
+        if not rows:
+            return 0
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        new_hashes = []
+        with self._transaction() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for seg_hash, skeleton, source, target, signature in rows:
+                exists = conn.execute("SELECT 1 FROM segments WHERE hash = ?", (seg_hash,)).fetchone()
+                blob = array("Q", signature).tobytes() if signature else None
+                conn.execute(
+                    "INSERT INTO segments (hash, skeleton, source, target, signature, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(hash) DO UPDATE SET target=excluded.target, updated_at=excluded.updated_at",
+                    (seg_hash, skeleton, source, target, blob, now),
+                )
+                if not exists and signature:
+                    new_hashes.append((seg_hash, signature))
+        for seg_hash, signature in new_hashes:
+            self._index(seg_hash, signature)
+        return len(rows)
+
+    def _fetch(self, conn: sqlite3.Connection, hashes: Iterable[str]) -> List[sqlite3.Row]:
+        hashes = list(hashes)
+        rows: List[sqlite3.Row] = []
+        # Lotes abaixo do limite de variáveis do SQLite antigo (999)
+        for i in range(0, len(hashes), 500):
+            batch = hashes[i:i + 500]
+            rows.extend(conn.execute(
+                f"SELECT hash, source, target FROM segments WHERE hash IN ({', '.join('?' * len(batch))})", batch
+            ).fetchall())
+        return rows
+
+    def lookup(self, segments: List[str]) -> List[MemoryMatch]:
+        """Match each segment: exact hash, then numbers-only variants, then LSH candidates verified by true Jaccard."""
+        matches = [MemoryMatch(seg, "none") for seg in segments]
+        with self._transaction() as conn:
+            hashes = [segment_hash(seg) for seg in segments]
+            exact = {row["hash"]: row for row in self._fetch(conn, set(hashes))}
+            used = []
+            for match, seg_hash in zip(matches, hashes):
+                row = exact.get(seg_hash)
+                if row is not None:
+                    match.kind, match.target, match.similarity = "exact", row["target"], 1.0
+                    used.append(seg_hash)
+                    continue
+                if NUMBER_RE.search(match.source):
+                    same_shape = conn.execute(
+                        "SELECT hash, source, target FROM segments WHERE skeleton = ?", (skeleton_hash(match.source),)
+                    ).fetchall()
+                    for row in same_shape:
+                        renumbered = renumber(row["source"], match.source, row["target"])
+                        if renumbered is not None:
+                            match.kind, match.target = "numbers", renumbered
+                            match.similarity = jaccard(shingles(match.source), shingles(row["source"]))
+                            used.append(row["hash"])
+                            break
+                    if match.kind == "numbers":
+                        continue
+                if len(match.source.strip()) < TM_MIN_FUZZY_CHARS:
+                    continue
+                grams = shingles(match.source)
+                signature = minhash(grams)
+                candidates = set()
+                for band in range(BANDS):
+                    candidates.update(self._buckets.get((band, signature[band * ROWS:(band + 1) * ROWS]), ()))
+                best: Optional[Tuple[float, sqlite3.Row]] = None
+                for row in self._fetch(conn, candidates):
+                    score = jaccard(grams, shingles(row["source"]))
+                    if best is None or score > best[0]:
+                        best = (score, row)
+                if best is None or best[0] < self.fuzzy_threshold:
+                    continue
+                score, row = best
+                match.kind, match.similarity = "fuzzy", score
+                match.reference_source, match.reference_target = row["source"], row["target"]
+            if used:
+                conn.executemany("UPDATE segments SET uses = uses + 1 WHERE hash = ?", [(h,) for h in used])
+        return matches
+
+
+def open_translation_memory(novel_name: str, base_dir: str = ".") -> TranslationMemory:
+    """Open (or create) the translation memory stored next to the novel's terms.db."""
+    return TranslationMemory(str(Path(base_dir) / "glossary" / novel_name / "tm.db"))
+
+
+def format_memory_blocks(matches: Iterable[MemoryMatch]) -> str:
+    """Fuzzy matches rendered like retrieved passages, so they ride in the context block."""
+    blocks = [
+        f"[memória de tradução, {m.similarity:.0%} similar]\n"
+        f"Original: {m.reference_source}\n"
+        f"Tradução: {m.reference_target}"
+        for m in matches
+        if m.kind == "fuzzy"
+    ]
+    return "\n\n".join(blocks)
+
+
+class MemoryContext:
+    """Context source for `translate_text`: fuzzy TM references first, then the retrieval index.
+
+    Duck-types `ContextIndex.build_context`, so pre-filled segments reach the
+    chunk prompt without a new prompt slot.
+    """
+
+    def __init__(self, matches: List[MemoryMatch], context_index=None):
+        self.matches = [m for m in matches if m.kind == "fuzzy"]
+        self.context_index = context_index
+
+    def build_context(self, chunk: str) -> str:
+        parts = [format_memory_blocks(m for m in self.matches if m.source in chunk)]
+        if self.context_index is not None:
+            parts.append(self.context_index.build_context(chunk))
+        return "\n\n".join(p for p in parts if p)
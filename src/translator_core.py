@@ -1,34 +1,120 @@
 import os
 import time
-import re
 import json
-from typing import Dict, Optional, List, Tuple, Set
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, List, Tuple, Set
 
-try:
-    import ollama
-    from httpx import TimeoutException
-    HAS_OLLAMA = True
-except Exception:
-    ollama = None
-    TimeoutException = None
-    HAS_OLLAMA = False
+from .glossary_engine import (
+    append_suggestion,
+    build_glossary_instructions,
+    apply_glossary_postprocessing,
+    find_glossary_violations,
+    open_glossary_store,
+)
+from .glossary_matcher import get_glossary_matcher, glossary_changed
+from .term_extractor import TermExtractor
+from .context_index import ContextIndex, format_context_block, split_paragraphs
+from .backends import OLLAMA_TIMEOUT, OllamaBackend, get_backend
+from .resilience import STATS_LOCK as _STATS_LOCK, call_with_resilience
+from .autotune import TuningProfile, tuning_for
+from .perf_history import DEFAULT_THROUGHPUT, estimate_tokens, record_call
+from .stream_guard import (
+    OUTPUT_EXPANSION_RATIO,
+    STAT_LENGTH_CAP,
+    STAT_SECONDS_SAVED,
+    STREAM_GUARD,
+    STREAM_GUARD_RETRIES,
+    OutputTruncatedError,
+    PreambleCheck,
+    RepetitionCheck,
+    StreamGuard,
+    output_token_cap,
+    raised_output_cap,
+    source_repeat_count,
+)
+from .chunk_controller import STAT_CHUNK_DECREASES, STAT_CHUNK_SIZE, ChunkSizeController
+from .translation_memory import MemoryContext, MemoryMatch, TranslationMemory
+from .postprocess import PostProcessor, PostResult, fix_japanese_quotes, postprocess, remove_translation_noise
+from .structured_output import (
+    RESPONSE_SCHEMA,
+    STAT_INVALID_JSON,
+    STAT_MISSING_IDS,
+    STAT_RETRIED_IDS,
+    STRUCTURED_OUTPUT,
+    STRUCTURED_RETRIES,
+    as_paragraph,
+    batch_paragraphs,
+    encode_paragraphs,
+    missing_ids,
+    parse_paragraphs,
+)
 
-from .glossary_engine import build_glossary_instructions, apply_glossary_postprocessing
+# Revisão semântica só nas janelas (chunks) com violações de glossário; 0 = revisa o capítulo inteiro sempre
+REVIEW_GATE = os.environ.get("REVIEW_GATE", "1").lower() not in ("0", "false", "no", "off")
 
 # Delay between requests (seconds). Configurable via env var REQUEST_DELAY_SECONDS
 REQUEST_DELAY_SECONDS = int(os.environ.get("REQUEST_DELAY_SECONDS", "1"))
 
-# Ollama configuration - now PRIMARY provider
-OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+# Model configuration (server/driver selection lives in src/backends.py, LLM_BACKEND)
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "qwen2.5:7b")
 OLLAMA_TEMPERATURE = float(os.environ.get("OLLAMA_TEMPERATURE", "0.3"))
-OLLAMA_TIMEOUT = int(os.environ.get("OLLAMA_TIMEOUT", "300"))
+# Janela de contexto (num_ctx) do modelo principal; 0 = padrão do servidor
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "0"))
+
+# Modo cascata: um modelo pequeno faz a primeira passagem e o modelo principal
+# (OLLAMA_MODEL) só é usado quando o chunk falha nas verificações de fidelidade,
+# ruído ou consistência de glossário.
+CASCADE_MODE = os.environ.get("CASCADE_MODE", "0").lower() in ("1", "true", "yes", "on")
+CASCADE_SMALL_MODEL = os.environ.get("CASCADE_SMALL_MODEL", "qwen2.5:3b")
+CASCADE_SMALL_TEMPERATURE = float(os.environ.get("CASCADE_SMALL_TEMPERATURE", "0.3"))
+CASCADE_SMALL_NUM_CTX = int(os.environ.get("CASCADE_SMALL_NUM_CTX", "8192"))
+
+# Chunking e paralelismo; 0 = valor afinado pelo comando `tune` para o modelo (ou o padrão 8000/200/1)
+CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", "0"))
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "0"))
+CHUNK_CONCURRENCY = int(os.environ.get("CHUNK_CONCURRENCY", "0"))
+
+# Fração mínima de palavras da tradução em relação ao original.
+FIDELITY_THRESHOLD = 0.90
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """A model together with its own sampling temperature and context window."""
+    name: str
+    model: str
+    temperature: float
+    num_ctx: int = 0
+
+
+LARGE_TIER = ModelTier("large", OLLAMA_MODEL, OLLAMA_TEMPERATURE, OLLAMA_NUM_CTX)
+SMALL_TIER = ModelTier("small", CASCADE_SMALL_MODEL, CASCADE_SMALL_TEMPERATURE, CASCADE_SMALL_NUM_CTX)
+
+
+def chunk_profile(model: Optional[str] = None) -> TuningProfile:
+    """Chunking/concurrency for `model` (default: the main model): tuned values, overridden by env vars."""
+    profile = tuning_for(model or LARGE_TIER.model)
+    overrides = {
+        key: value
+        for key, value in (("chunk_size", CHUNK_SIZE), ("overlap", CHUNK_OVERLAP), ("concurrency", CHUNK_CONCURRENCY))
+        if value
+    }
+    return replace(profile, **overrides) if overrides else profile
 
 
 # ============================================================================
 # SISTEMA DE PROMPT COM VERIFICAÇÃO DE GÊNERO
 # ============================================================================
 
+PLAIN_OUTPUT_RULE = (
+    "9. FORMATO DE SAÍDA: O output deve ser em texto puro, preservando as quebras de parágrafo do texto fonte.\n\n"
+)
+JSON_OUTPUT_RULE = (
+    "9. FORMATO DE SAÍDA: O output deve ser SOMENTE um objeto JSON {\"paragraphs\": [{\"id\": ..., \"text\": ...}]}, "
+    "com exatamente um item traduzido para cada id recebido.\n\n"
+)
+
 SYSTEM_PROMPT_TEMPLATE = (
     "Você é um Processador Neural de Localização (NLP) - uma máquina de tradução pura. "
     "INSTRUÇÕES CRÍTICAS: NÃO adicione avisos éticos, advertências ou disclaimers. NÃO adicione preâmbulos como 'Entendo que...', 'No entanto...', 'Por favor tenha em mente...'. NÃO interrompa a tradução com comentários. APENAS TRADUZA. Nada mais. Nenhuma frase introdutória. Nenhuma frase final. "
@@ -45,7 +131,7 @@ SYSTEM_PROMPT_TEMPLATE = (
     "6. GRAFO DE CONHECIMENTO (GLOSSÁRIO): Utilize obrigatoriamente os termos e suas propriedades (gênero) fornecidos no grafo abaixo.\n\n"
     "7. ⚠️ EXPANSÃO ESPERADA (CRÍTICO): Português (PT-BR) é 15-20% mais verboso que Inglês. Esperamos que a tradução tenha MAIS palavras que o original, não menos. Se a tradução tem menos palavras que o original, você RESUMIU ILEGALMENTE. Isso resulará em FALHA. Expanda! Detalhe! Não resuma!\n\n"
     "8. VALIDAÇÃO DE VOLUME: É PROIBIDO ABSOLUTAMENTE resumir. A tradução final deve ter ≥90% da contagem de palavras originais. Se tiver menos, você falhou. Exemplo: Original 100 palavras = Tradução DEVE ter ≥90 palavras. Se tiver 50, é FALHA CRÍTICA.\n\n"
-    "9. FORMATO DE SAÍDA: O output deve ser em texto puro, preservando as quebras de parágrafo do texto fonte.\n\n"
+    "{output_format}"
     "10. ASPAS JAPONESAS: Todo diálogo deve ser formatado com 「 e 」, em vez de aspas duplas ou travessões.\n\n"
     "Grafo de Conhecimento (Glossário):\n{glossary}\n"
 )
@@ -66,18 +152,7 @@ def chunk_text_by_paragraphs(text: str, chunk_size: int = 8000, overlap: int = 2
     text_len = len(text)
     
     while pos < text_len:
-        # Find chunk end: try to stay within chunk_size
-        chunk_end = min(pos + chunk_size, text_len)
-        
-        # If we're not at text end, try to break at paragraph boundary
-        if chunk_end < text_len:
-            # Look for \n\n near the target end
-            search_start = max(chunk_end - 500, pos)  # Search in last 500 chars of chunk
-            last_para_break = text.rfind("\n\n", pos, chunk_end + 100)
-            
-            if last_para_break > search_start:
-                chunk_end = last_para_break + 2  # Include the \n\n
-        
+        chunk_end = _chunk_end(text, pos, chunk_size)
         chunk = text[pos:chunk_end]
         chunks.append((chunk, pos, chunk_end))
         
@@ -92,174 +167,125 @@ def chunk_text_by_paragraphs(text: str, chunk_size: int = 8000, overlap: int = 2
 
 
 
-def _call_ollama_text(prompt: str, temperature: float = 0.3) -> str:
-    """
-    Call Ollama locally using native ollama package.
-    
-    Uses OpenAI-compatible endpoint at localhost:11434/v1
-    Model: qwen2.5:7b (configurable via OLLAMA_MODEL)
-    """
-    if not HAS_OLLAMA:
-        raise RuntimeError(
-            "Ollama package not installed. Install via: pip install ollama"
-        )
+def _chunk_end(text: str, pos: int, chunk_size: int) -> int:
+    """End of the chunk starting at `pos`: about `chunk_size` chars, at a paragraph break when one is near."""
+    text_len = len(text)
+    # Find chunk end: try to stay within chunk_size
+    chunk_end = min(pos + chunk_size, text_len)
     
-    try:
-        # Use the ollama package's chat interface
-        # It connects to http://localhost:11434 by default and has a configurable timeout
-        client = ollama.Client(host=OLLAMA_BASE_URL, timeout=OLLAMA_TIMEOUT)
-        response = client.chat(
-            model=OLLAMA_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            options={
-                "temperature": temperature,
-            }
-        )
+    # If we're not at text end, try to break at paragraph boundary
+    if chunk_end < text_len:
+        # Look for \n\n near the target end
+        search_start = max(chunk_end - 500, pos)  # Search in last 500 chars of chunk
+        last_para_break = text.rfind("\n\n", pos, chunk_end + 100)
         
-        # Extract text from response
-        text = response.get("message", {}).get("content", "")
-        time.sleep(REQUEST_DELAY_SECONDS)
-        return text
-        
-    except (ConnectionError, ollama.ResponseError, ollama.RequestError, TimeoutException) as e:
-        # Catch connection errors, including timeouts
-        raise RuntimeError(
-            f"Conexão com Ollama em {OLLAMA_BASE_URL} falhou (timeout de {OLLAMA_TIMEOUT}s).\n"
-            f"Verifique se o Ollama está rodando e acessível:\n"
-            f"  1. Instale e execute o app Ollama: https://ollama.com\n"
-            f"  2. (Opcional) Execute no terminal: ollama serve\n"
-            f"  3. Baixe o modelo necessário: ollama pull {OLLAMA_MODEL}\n"
-            f"Se o timeout persistir, aumente a variável de ambiente OLLAMA_TIMEOUT.\n"
-            f"Erro original: {e.__class__.__name__}"
-        )
-    except Exception as e:
-        raise RuntimeError(f"Erro inesperado no Ollama: {e}")
-
+        if last_para_break > search_start:
+            chunk_end = last_para_break + 2  # Include the \n\n
+    return chunk_end
 
-def _call_model_text(model: str, prompt: str, temperature: float = 0.3) -> str:
-    """Call Ollama (único provedor)."""
-    return _call_ollama_text(prompt, temperature=temperature)
 
-
-def remove_translation_noise(text: str) -> str:
-    """
-    Remove avisos éticos, preâmbulos e poluição adicionados pelo modelo.
-    
-    Padrões para remover:
-    - "Entendo que..." (preâmbulos de disclaimer)
-    - "No entanto..." (mas com avisos)
-    - "Por favor..." (pedidos educados antes/depois)
-    - "É importante..." (avisos éticos)
-    - "Ainda assim..." (concessões)
-    - Linhas com "---" (separadores)
-    - Avisos de conteúdo sensível
+def _call_ollama_text(
+    prompt: str,
+    temperature: float = 0.3,
+    model: Optional[str] = None,
+    num_ctx: int = 0,
+) -> str:
     """
-    lines = text.split('\n')
-    cleaned_lines = []
-    skip_mode = False
-    
-    for line in lines:
-        stripped = line.strip()
-        
-        # Detectar início de avisos éticos
-        if any(stripped.startswith(prefix) for prefix in [
-            'Entendo que',
-            'No entanto',
-            'Por favor',
-            'É importante',
-            'Ainda assim',
-            'Aviso:',
-            'AVISO:',
-            'Este texto',
-            'Este tipo',
-            'Conteúdo',
-            'conteúdo',
-            'Além disso'
-        ]):
-            skip_mode = True
-            continue
-        
-        # Linhas separadoras marcam fim de avisos
-        if stripped in ['---', ''] and skip_mode:
-            skip_mode = False
-            continue
-        
-        # Ignorar linhas vazias do início de avisos
-        if skip_mode and stripped == '':
-            continue
-        
-        # Se não é aviso, adicionar
-        if not skip_mode:
-            cleaned_lines.append(line)
-    
-    # Remover linhas vazias no início e final
-    while cleaned_lines and cleaned_lines[0].strip() == '':
-        cleaned_lines.pop(0)
-    while cleaned_lines and cleaned_lines[-1].strip() == '':
-        cleaned_lines.pop()
+    Call Ollama directly, regardless of LLM_BACKEND.
     
-    return '\n'.join(cleaned_lines)
+    Kept for setup checks; the pipeline goes through `_call_model_text`.
+    """
+    return OllamaBackend().generate(prompt, model or OLLAMA_MODEL, temperature=temperature, num_ctx=num_ctx)
+
 
+def _was_aborted(guard: Optional[StreamGuard]) -> bool:
+    return guard is not None and bool(guard.aborted)
 
-def fix_japanese_quotes(text: str) -> str:
+
+def _call_model_text(
+    model: str,
+    prompt: str,
+    temperature: float = 0.3,
+    num_ctx: int = 0,
+    stats: Optional[Dict[str, Any]] = None,
+    num_predict: int = 0,
+    expected_tokens: int = 0,
+    repeat_allowance: int = 0,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> str:
     """
-    Corrige aspas japonesas invertidas ou mal formatadas.
-    
-    Regra: Todo diálogo DEVE ser: 「texto」(não 」texto「)
+    Call the configured inference backend (LLM_BACKEND) with the given model name.
     
-    Ordem CRÍTICA de processamento:
-    1. Remove triplas: 「」」 → 「
-    2. Corrige invertidas: 」...「 → 「...」 (ANTES de balancear!)
-    3. Remove duplicadas: 」」 → 」
-    4. Aspas duplas: "..." → 「...」
-    5. Travessões: — ... → 「...」
-    6. Balanceia casos faltando abertura/fechamento
+    Retries, size-scaled timeouts, hedging and the circuit breaker come from
+    `call_with_resilience`; their counters go into `stats`.
+
+    `num_predict` caps the output length (see `output_token_cap`). On streaming
+    backends the output is read through a `StreamGuard`: a response that opens
+    with a disclaimer, falls into a repetition loop or runs into the cap is cut
+    off and requested again right away (up to STREAM_GUARD_RETRIES times; loops
+    are retried slightly hotter). A response that reaches `num_predict`, on any
+    backend, is asked again with the cap doubled (bounded by `num_ctx`); if it
+    is still cut on the last attempt, `OutputTruncatedError` is raised rather
+    than returning a truncated translation. `expected_tokens` (the expected output
+    length) is used to estimate the generation time this saves, and
+    `repeat_allowance` (see `source_repeat_count`) tolerates repetition that
+    the source already has. `response_format` is a JSON schema the response
+    must follow (structured mode, see src/structured_output.py).
     """
-    # Step 0: Remove triplas malformadas 「」」 → 「
-    text = re.sub(r'「」」', r'「', text)
-    
-    # Step 1: CRÍTICO - Corrige invertidas PRIMEIRO antes de qualquer balanceamento
-    # Padrão: fechamento + conteúdo + abertura → inverter
-    text = re.sub(r'」([^」「]*?)「', r'「\1」', text)
-    
-    # Step 2: Remove fechamentos duplicados 」」 → 」 (mas não 」「)
-    text = re.sub(r'」」(?!「)', r'」', text)
-    
-    # Step 3: Aspas duplas "..." → 「...」
-    quote_pairs = re.findall(r'"([^"]+)"', text)
-    for pair in quote_pairs:
-        text = text.replace(f'"{pair}"', f'「{pair}」', 1)
-    
-    # Step 4: Travessão solo em contexto de diálogo
-    text = re.sub(r'—\s*([^。\n]+)', r'「\1」', text)
-    
-    # Step 5: Balanceamento final linha por linha
-    lines = text.split('\n')
-    for i, line in enumerate(lines):
-        open_count = line.count('「')
-        close_count = line.count('」')
-        
-        # Mais fechamentos que aberturas - adicionar abertura antes do primeiro desbalanceado
-        while close_count > open_count:
-            for idx, ch in enumerate(line):
-                if ch == '」':
-                    before = line[:idx]
-                    if before.count('「') <= before.count('」'):
-                        line = line[:idx] + '「' + line[idx:]
-                        open_count += 1
-                        close_count = line.count('」')
-                        break
-            else:
-                break
-        
-        # Mais aberturas que fechamentos - adicionar fechamento no final
-        while open_count > close_count:
-            line = line + '」'
-            close_count += 1
-        
-        lines[i] = line
-    
-    return '\n'.join(lines)
+    backend = get_backend()
+    guarded = STREAM_GUARD and backend.capabilities.streaming
+    options: Dict[str, Any] = {"num_predict": num_predict} if num_predict else {}
+    if response_format:
+        options["format"] = response_format
+    # Contexto e threads afinados pelo `tune` (OLLAMA_NUM_CTX explícito tem prioridade)
+    tuned = tuning_for(model)
+    num_ctx = num_ctx or tuned.num_ctx
+    if tuned.num_thread:
+        options["num_thread"] = tuned.num_thread
+    for attempt in range(STREAM_GUARD_RETRIES + 1):
+        # A última tentativa ainda conta os tokens, mas não aborta mais
+        last_attempt = attempt >= STREAM_GUARD_RETRIES
+        start = time.monotonic()
+
+        def call(timeout: float, temperature: float = temperature) -> Tuple[str, Optional[StreamGuard]]:
+            # Um guard novo por stream: retentativas e hedges de call_with_resilience não compartilham estado
+            if not guarded:
+                text = backend.generate(prompt, model, temperature=temperature, num_ctx=num_ctx, timeout=timeout, **options)
+                return text, None
+            checks = [] if last_attempt else [PreambleCheck(), RepetitionCheck(allowance=repeat_allowance)]
+            guard = StreamGuard(checks)
+            text = guard.consume(
+                backend.stream(prompt, model, temperature=temperature, num_ctx=num_ctx, timeout=timeout, **options)
+            )
+            return text, guard
+
+        text, guard = call_with_resilience(
+            call, backend.endpoint(), len(prompt), stats, is_complete=lambda result: not _was_aborted(result[1])
+        )
+        generated = guard.pieces if guard is not None else estimate_tokens(text)
+        if not _was_aborted(guard):
+            # Vazão medida alimenta as projeções do planejador (perf_history.json); streams abortados distorceriam o ajuste
+            record_call(model, estimate_tokens(prompt), estimate_tokens(text), time.monotonic() - start)
+        if guard is not None and guard.aborted:
+            saved = guard.seconds_saved(expected_tokens, DEFAULT_THROUGHPUT.seconds_per_completion_token)
+            print(f"    Saída abortada ({guard.aborted}) após {guard.pieces} tokens; pedindo de novo...")
+            _bump_stat(stats, guard.aborted_stat)
+            _bump_stat(stats, STAT_SECONDS_SAVED, round(saved, 1))
+            if guard.aborted == RepetitionCheck.reason:
+                temperature += 0.1
+            continue
+        if num_predict and generated >= num_predict:
+            # Saída cortada pelo teto: tente de novo com um teto maior, nunca devolva o texto truncado
+            _bump_stat(stats, STAT_LENGTH_CAP)
+            raised = raised_output_cap(num_predict, estimate_tokens(prompt), num_ctx)
+            if last_attempt or not raised:
+                raise OutputTruncatedError(f"saída cortada no limite de {num_predict} tokens ({model})")
+            print(f"    Saída atingiu o limite de {num_predict} tokens; pedindo de novo com {raised}...")
+            num_predict = options["num_predict"] = raised
+            continue
+        time.sleep(REQUEST_DELAY_SECONDS)
+        return text
+    return text
 
 
 def _count_words(text: str) -> int:
@@ -267,6 +293,16 @@ def _count_words(text: str) -> int:
     return len(text.split())
 
 
+def _postprocess(
+    text: str, glossary: Dict[str, str], japanese_mode: Optional[bool], stats: Optional[Dict[str, Any]]
+) -> PostResult:
+    """Run the post-processing engine and add its per-transform time to the chapter stats."""
+    post = postprocess(text, glossary, japanese_mode)
+    for step, seconds in post.seconds.items():
+        _bump_stat(stats, f"Pós-processamento: {step} (ms)", round(seconds * 1000, 2))
+    return post
+
+
 def translate_text(
     text: str,
     source_lang: Optional[str],
@@ -276,6 +312,12 @@ def translate_text(
     novel_name: Optional[str] = None,
     enable_semantic_review: bool = True,
     is_mature_content: bool = True,
+    term_extractor: Optional[TermExtractor] = None,
+    context_index: Optional[ContextIndex] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    translation_memory: Optional[TranslationMemory] = None,
+    japanese_mode: Optional[bool] = None,
+    chunk_controller: Optional[ChunkSizeController] = None,
 ) -> str:
     """
     Translate text into PT-BR using intelligent chunking, fidelity protection, and semantic review.
@@ -289,116 +331,574 @@ def translate_text(
         novel_name: Nome da novel (para extrair termos)
         enable_semantic_review: Se True, revisa o capítulo completo após tradução
         is_mature_content: Se True, permite linguagem +18 durante revisão
+        term_extractor: Extrator da sessão (acumula frequências entre capítulos)
+        context_index: Índice de capítulos anteriores; cada chunk recebe só as passagens relevantes
+        stats: Dict opcional preenchido com contadores do capítulo (ex: chunks escalados na cascata)
+        translation_memory: Memória de tradução da novel; parágrafos já traduzidos não vão ao modelo
+        japanese_mode: Aspas 「」 (True) ou travessão (False) nos diálogos; None = JAPANESE_MODE
+        chunk_controller: Controlador AIMD (ADAPTIVE_CHUNKING); o tamanho de cada chunk segue a
+            latência e a fidelidade dos anteriores em vez do tamanho fixo do perfil
     
     - Chunks by paragraph boundaries (~3000 chars, 150-char overlap)
     - Validates fidelity: translation must be ≥85% of original word count
     - Reprocesses chunks that fail fidelity check with explicit warning
     - PÓS-PROCESSING: Corrige aspas japonesas e aplica glossário
     """
+    if translation_memory is not None:
+        return _translate_with_memory(
+            text, translation_memory, glossary, api_key, glossary_path, novel_name,
+            enable_semantic_review, is_mature_content, term_extractor, context_index, stats, japanese_mode,
+            chunk_controller,
+        )
+
+    if STRUCTURED_OUTPUT and get_backend().capabilities.structured_output:
+        return _translate_structured(
+            text, glossary, api_key, glossary_path, novel_name,
+            enable_semantic_review, term_extractor, context_index, stats, japanese_mode, chunk_controller,
+        )
+
     original_word_count = _count_words(text)
+    profile = chunk_profile()
+    if chunk_controller is not None:
+        profile = replace(profile, chunk_size=chunk_controller.size)
     
     # If text is small, translate directly without chunking (faster & better context)
-    if len(text) < 8000:
-        trans = _translate_single_chunk(text, glossary, api_key)
-        
-        # Limpeza de avisos éticos
-        trans = remove_translation_noise(trans)
-        trans = fix_japanese_quotes(trans)
+    if len(text) < profile.chunk_size:
+        context = context_index.build_context(text) if context_index is not None else None
+        start = time.monotonic()
+        trans = _translate_chunk(text, glossary, api_key, context=context, stats=stats)
+        seconds = time.monotonic() - start
         
-        trans_word_count = _count_words(trans)
+        # Limpeza de avisos éticos, aspas e glossário numa passada por parágrafo
+        post = _postprocess(trans, glossary, japanese_mode, stats)
+        trans, trans_word_count = post.text, post.words
+        passed = trans_word_count >= original_word_count * FIDELITY_THRESHOLD
+        _record_chunk(chunk_controller, text, trans, seconds, passed, stats)
         
         # Check fidelity
-        if trans_word_count < original_word_count * 0.90:
+        if not passed:
             print(f"  Fidelidade baixa ({trans_word_count}/{original_word_count} palavras). Reprocessando com temperatura maior...")
+            _bump_stat(stats, "Reprocessamentos de Fidelidade")
             trans = _translate_single_chunk(
                 text,
                 glossary,
                 api_key,
                 force_fidelity=True,
-                temperature=OLLAMA_TEMPERATURE + 0.2,
+                temperature=LARGE_TIER.temperature + 0.2,
+                context=context,
+                stats=stats,
             )
-            trans = remove_translation_noise(trans)
-            trans = fix_japanese_quotes(trans)
+            trans = _postprocess(trans, glossary, japanese_mode, stats).text
         
+        _extract_and_save_terms(trans, glossary, glossary_path, novel_name, term_extractor)
         return trans
     
-    # For larger texts, chunk by paragraphs (reduced from 3000 to 8000 chars)
-    chunks = chunk_text_by_paragraphs(text, chunk_size=8000, overlap=200)
-    translated_chunks = []
-    
-    for i, (chunk, start_idx, end_idx) in enumerate(chunks):
+    # For larger texts, chunk by paragraphs (size/overlap/concurrency from `chunk_profile`);
+    # with the adaptive controller each chunk is cut only when it is dispatched.
+    chunks = (
+        chunk_text_by_paragraphs(text, chunk_size=profile.chunk_size, overlap=profile.overlap)
+        if chunk_controller is None else []
+    )
+
+    def translate_window(i: int) -> str:
+        chunk, start_idx, end_idx = chunks[i]
         chunk_words = _count_words(chunk)
-        print(f"  [Chunk {i+1}/{len(chunks)}] ({start_idx}-{end_idx}, {chunk_words} palavras)...", flush=True)
+        total = f"/{len(chunks)}" if chunk_controller is None else ""
+        print(f"  [Chunk {i+1}{total}] ({start_idx}-{end_idx}, {chunk_words} palavras)...", flush=True)
         
         try:
-            trans = _translate_single_chunk(chunk, glossary, api_key)
+            context = context_index.build_context(chunk) if context_index is not None else None
+            start = time.monotonic()
+            trans = _translate_chunk(chunk, glossary, api_key, context=context, stats=stats)
             trans_words = _count_words(trans)
+            passed = trans_words >= chunk_words * FIDELITY_THRESHOLD
+            _record_chunk(chunk_controller, chunk, trans, time.monotonic() - start, passed, stats)
             
             # Check fidelity: ≥90% of original word count (profissional sênior)
-            if trans_words < chunk_words * 0.90:
+            if not passed:
                 print(f"    Resumo detectado ({trans_words}/{chunk_words} palavras). Reprocessando chunk {i+1} com temperatura maior...")
+                _bump_stat(stats, "Reprocessamentos de Fidelidade")
                 trans = _translate_single_chunk(
                     chunk,
                     glossary,
                     api_key,
                     force_fidelity=True,
-                    temperature=OLLAMA_TEMPERATURE + 0.2,
+                    temperature=LARGE_TIER.temperature + 0.2,
+                    context=context,
+                    stats=stats,
                 )
                 trans_words = _count_words(trans)
                 
                 # Final check after reprocessing
-                if trans_words < chunk_words * 0.90:
+                if trans_words < chunk_words * FIDELITY_THRESHOLD:
                     print(f"    AVISO: Fidelidade ainda baixa após reprocessamento ({trans_words}/{chunk_words} palavras)")
             
-            translated_chunks.append(trans)
+            return trans
         except Exception as e:
             print(f"    Erro chunk {i+1}: {e}")
             raise
+
+    # Chunks são independentes (o contexto vem do índice), então podem ir ao servidor em paralelo.
+    if chunk_controller is not None:
+        translated_chunks = _translate_adaptive_windows(text, chunks, profile, chunk_controller, translate_window)
+    elif profile.concurrency > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(profile.concurrency, len(chunks))) as pool:
+            translated_chunks = list(pool.map(translate_window, range(len(chunks))))
+    else:
+        translated_chunks = [translate_window(i) for i in range(len(chunks))]
     
+    # PORTÃO DE GLOSSÁRIO: revise só as janelas em que o verificador local achou problemas
+    if enable_semantic_review and REVIEW_GATE:
+        translated_chunks = _review_flagged_windows(
+            [chunk for chunk, _, _ in chunks], translated_chunks, glossary, api_key, is_mature_content, stats
+        )
+
     # Concatenate chunks (overlap is minimal, so just join)
     result = "".join(translated_chunks)
     
-    # PÓS-PROCESSAMENTO: Remover avisos éticos/poluição
-    print("  Pós-processamento: limpando avisos éticos...")
-    result = remove_translation_noise(result)
-    
-    # PÓS-PROCESSAMENTO: Corrigir aspas japonesas
-    print("  Pós-processamento: corrigindo aspas japonesas...")
-    result = fix_japanese_quotes(result)
+    # PÓS-PROCESSAMENTO: avisos éticos, aspas/travessões, glossário e espaços numa passada por parágrafo
+    print("  Pós-processamento: limpando avisos, diálogos e glossário...")
+    post = _postprocess(result, glossary, japanese_mode, stats)
         # REVISÃO SEMÂNTICA: Revisar capítulo completo para coerência
-    if enable_semantic_review:
+    if enable_semantic_review and not REVIEW_GATE:
         print("  Revisão semântica: validando coerência do capítulo...")
-        result = semantic_review_chapter(
-            result, 
+        reviewed = semantic_review_chapter(
+            post.text, 
             glossary, 
             api_key=api_key,
-            is_mature_content=is_mature_content
+            is_mature_content=is_mature_content,
+            stats=stats,
         )
+        post = _postprocess(reviewed, glossary, japanese_mode, stats)
+    result = post.text
     
     # EXTRAÇÃO DE GLOSSÁRIO: Identificar e salvar novos termos
-    if glossary_path and novel_name:
-        print("  Extração de glossário: identificando novos termos...")
-        new_terms = extract_new_terms(result, glossary)
-        if new_terms:
-            updated_glossary = save_new_glossary_terms(new_terms, glossary_path, novel_name)
-            glossary.update(updated_glossary)
+    _extract_and_save_terms(result, glossary, glossary_path, novel_name, term_extractor)
         # Final validation
-    final_words = _count_words(result)
+    final_words = post.words
     print(f"  Tradução completa: {final_words}/{original_word_count} palavras ({round((final_words/original_word_count)*100, 1)}%)")
     
     return result
 
 
+def _record_chunk(
+    controller: Optional[ChunkSizeController],
+    source: str,
+    translation: str,
+    seconds: float,
+    passed: bool,
+    stats: Optional[Dict[str, Any]],
+) -> None:
+    """Feed the adaptive controller with one first-pass chunk result."""
+    if controller is None:
+        return
+    if controller.record(len(source), seconds, estimate_tokens(translation), passed):
+        _bump_stat(stats, STAT_CHUNK_DECREASES)
+    if stats is not None:
+        with _STATS_LOCK:
+            stats[STAT_CHUNK_SIZE] = controller.size
+
+
+def _translate_adaptive_windows(
+    text: str,
+    chunks: List[Tuple[str, int, int]],
+    profile: TuningProfile,
+    controller: ChunkSizeController,
+    translate_window,
+) -> List[str]:
+    """
+    Cut and translate chunks one at a time at the controller's current size.
+
+    Up to `profile.concurrency` chunks are in flight; the next one is cut
+    (and appended to `chunks`) as soon as a slot frees up, so it already
+    reflects the results of the chunks that finished. Returns the
+    translations in text order.
+    """
+    results: Dict[int, str] = {}
+    pos = 0
+    with ThreadPoolExecutor(max_workers=max(1, profile.concurrency)) as pool:
+        pending = {}
+        while pos < len(text) or pending:
+            while pos < len(text) and len(pending) < max(1, profile.concurrency):
+                end = _chunk_end(text, pos, controller.size)
+                chunks.append((text[pos:end], pos, end))
+                pending[pool.submit(translate_window, len(chunks) - 1)] = len(chunks) - 1
+                pos = max(end - profile.overlap, pos + 1) if end < len(text) else end
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+    return [results[i] for i in range(len(chunks))]
+
+
+def _translate_with_memory(
+    text: str,
+    memory: TranslationMemory,
+    glossary: Dict[str, str],
+    api_key: Optional[str],
+    glossary_path: Optional[str],
+    novel_name: Optional[str],
+    enable_semantic_review: bool,
+    is_mature_content: bool,
+    term_extractor: Optional[TermExtractor],
+    context_index: Optional[ContextIndex],
+    stats: Optional[Dict[str, Any]],
+    japanese_mode: Optional[bool] = None,
+    chunk_controller: Optional[ChunkSizeController] = None,
+) -> str:
+    """
+    `translate_text` over the paragraphs the translation memory cannot supply.
+
+    Exact and numbers-only matches are reused as-is, unless they fail the
+    current glossary (a term whose translation changed, or a new term left in
+    the source language): those are translated again and the stored segment
+    is replaced. Fuzzy matches go to the prompt as reference translations.
+    The remaining paragraphs are translated in one pass and stitched back in
+    order; if the model merges or splits paragraphs, each run between reused
+    paragraphs is translated on its own. New paragraph pairs are stored back
+    in the memory.
+    """
+    paragraphs = split_paragraphs(text)
+    matches = memory.lookup(paragraphs)
+    if glossary:
+        matcher = get_glossary_matcher(glossary)
+        stale = 0
+        for m in matches:
+            if m.reusable and matcher.violations(m.source, m.target):
+                # Tradução gravada antes da mudança no glossário: não reutilize
+                m.kind, m.target = "none", None
+                stale += 1
+        _bump_stat(stats, "Segmentos Invalidados pelo Glossário (TM)", stale)
+    reused = sum(1 for m in matches if m.reusable)
+    pending = [m for m in matches if not m.reusable]
+    _bump_stat(stats, "Segmentos Reutilizados (TM)", reused)
+    _bump_stat(stats, "Segmentos Pré-preenchidos (TM)", sum(1 for m in matches if m.kind == "fuzzy"))
+    _bump_stat(stats, "Segmentos Enviados ao Modelo", len(pending))
+    if reused:
+        print(f"  Memória de tradução: {reused}/{len(matches)} parágrafos reutilizados")
+
+    def translate(source: str) -> str:
+        return translate_text(
+            source,
+            None,
+            glossary,
+            api_key=api_key,
+            glossary_path=glossary_path,
+            novel_name=novel_name,
+            enable_semantic_review=enable_semantic_review,
+            is_mature_content=is_mature_content,
+            term_extractor=term_extractor,
+            context_index=MemoryContext(matches, context_index),
+            stats=stats,
+            japanese_mode=japanese_mode,
+            chunk_controller=chunk_controller,
+        )
+
+    if not pending:
+        return "\n\n".join(m.target for m in matches)
+    if not reused:
+        result = translate(text)
+        targets = split_paragraphs(result)
+        if len(targets) == len(paragraphs):
+            memory.add(zip(paragraphs, targets))
+        return result
+
+    targets = split_paragraphs(translate("\n\n".join(m.source for m in pending)))
+    if len(targets) == len(pending):
+        for m, target in zip(pending, targets):
+            m.target = target
+        memory.add((m.source, m.target) for m in pending)
+        return "\n\n".join(m.target for m in matches)
+
+    # Contagem de parágrafos mudou: traduza cada trecho contíguo entre reutilizados.
+    print("  Memória de tradução: parágrafos desalinhados, traduzindo por trecho...")
+    blocks: List[str] = []
+    run: List[MemoryMatch] = []
+    for m in matches + [None]:
+        if m is not None and not m.reusable:
+            run.append(m)
+            continue
+        if run:
+            source = "\n\n".join(r.source for r in run)
+            block = translate(source)
+            blocks.append(block)
+            block_targets = split_paragraphs(block)
+            if len(block_targets) == len(run):
+                memory.add(zip((r.source for r in run), block_targets))
+            run = []
+        if m is not None:
+            blocks.append(m.target)
+    return "\n\n".join(blocks)
+
+
+def _translate_structured(
+    text: str,
+    glossary: Dict[str, str],
+    api_key: Optional[str],
+    glossary_path: Optional[str],
+    novel_name: Optional[str],
+    enable_semantic_review: bool,
+    term_extractor: Optional[TermExtractor],
+    context_index: Optional[ContextIndex],
+    stats: Optional[Dict[str, Any]],
+    japanese_mode: Optional[bool] = None,
+    chunk_controller: Optional[ChunkSizeController] = None,
+) -> str:
+    """
+    `translate_text` with paragraph-indexed JSON output (STRUCTURED_OUTPUT=1).
+
+    Source paragraphs are batched up to the chunk size (no overlap: nothing
+    needs to be stitched) and each batch is answered as `{id, text}` items.
+    With a `chunk_controller` its size sets the batches and each batch's
+    latency and fidelity are fed back (taking effect from the next text).
+    With the review gate, paragraphs whose translation breaks the glossary
+    are asked again with the violations listed, instead of reviewing the
+    window as free text. The result has exactly one paragraph per source
+    paragraph, in order.
+    """
+    paragraphs = split_paragraphs(text)
+    if not paragraphs:
+        return ""
+    original_word_count = _count_words(text)
+    profile = chunk_profile()
+    batches = batch_paragraphs(paragraphs, chunk_controller.size if chunk_controller is not None else profile.chunk_size)
+
+    def translate_batch(b: int) -> List[str]:
+        sources = [paragraphs[i] for i in batches[b]]
+        print(f"  [Lote {b+1}/{len(batches)}] ({len(sources)} parágrafos, JSON)...", flush=True)
+        _bump_stat(stats, "Chunks Traduzidos")
+        source = "\n\n".join(sources)
+        context = context_index.build_context(source) if context_index is not None else None
+        start = time.monotonic()
+        targets = _translate_paragraphs(sources, glossary, api_key, context=context, stats=stats)
+        target = "\n\n".join(targets)
+        passed = _count_words(target) >= _count_words(source) * FIDELITY_THRESHOLD
+        _record_chunk(chunk_controller, source, target, time.monotonic() - start, passed, stats)
+        return targets
+
+    if profile.concurrency > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=min(profile.concurrency, len(batches))) as pool:
+            translated = list(pool.map(translate_batch, range(len(batches))))
+    else:
+        translated = [translate_batch(b) for b in range(len(batches))]
+    targets = [target for batch in translated for target in batch]
+
+    if enable_semantic_review and REVIEW_GATE:
+        matcher = get_glossary_matcher(glossary)
+        flagged = {i: matcher.violations(s, t) for i, (s, t) in enumerate(zip(paragraphs, targets))}
+        flagged = {i: v for i, v in flagged.items() if v}
+        if flagged:
+            print(f"  Revisão de glossário: pedindo de novo {len(flagged)}/{len(paragraphs)} parágrafos...")
+            redone = _translate_paragraphs(
+                [paragraphs[i] for i in flagged], glossary, api_key, stats=stats,
+                violations=[str(v) for vs in flagged.values() for v in vs],
+            )
+            for i, target in zip(flagged, redone):
+                targets[i] = target
+        _bump_stat(stats, "Parágrafos Revisados (Glossário)", len(flagged))
+
+    # Pós-processamento parágrafo a parágrafo: a estrutura 1:1 não muda
+    processor = PostProcessor(glossary=glossary, japanese_mode=japanese_mode)
+    final: List[str] = []
+    for target in targets:
+        post = processor.run(target)
+        final.append(as_paragraph(post.text) or target)
+        for step, seconds in post.seconds.items():
+            _bump_stat(stats, f"Pós-processamento: {step} (ms)", round(seconds * 1000, 2))
+    result = "\n\n".join(final)
+
+    _extract_and_save_terms(result, glossary, glossary_path, novel_name, term_extractor)
+    final_words = _count_words(result)
+    print(f"  Tradução completa: {final_words}/{original_word_count} palavras ({round((final_words/original_word_count)*100, 1)}%)")
+    return result
+
+
+def _translate_paragraphs(
+    sources: List[str],
+    glossary: Dict[str, str],
+    api_key: Optional[str] = None,
+    context: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    violations: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Translations of `sources`, one per paragraph, via the JSON response schema.
+
+    A response that is not valid JSON is asked again once as a whole; ids
+    still missing or empty are then asked one paragraph per request (up to
+    STRUCTURED_RETRIES times), and as plain text as a last resort.
+    """
+    ids = list(range(1, len(sources) + 1))
+    parsed = _request_paragraphs(sources, glossary, context, stats, violations)
+    if not parsed and len(sources) > 1:
+        parsed = _request_paragraphs(sources, glossary, context, stats, violations)
+    missing = missing_ids(ids, parsed)
+    if missing:
+        print(f"    {len(missing)} parágrafo(s) ausente(s) na resposta JSON: {missing[:10]}; pedindo de novo...")
+        _bump_stat(stats, STAT_MISSING_IDS, len(missing))
+    for pid in missing:
+        source = sources[pid - 1]
+        for _ in range(STRUCTURED_RETRIES):
+            _bump_stat(stats, STAT_RETRIED_IDS)
+            again = _request_paragraphs([source], glossary, context, stats, violations, force_fidelity=True)
+            if again.get(1):
+                parsed[pid] = again[1]
+                break
+        else:
+            parsed[pid] = as_paragraph(
+                _translate_single_chunk(source, glossary, api_key, force_fidelity=True, context=context, stats=stats)
+            ) or source
+    return [parsed[pid] for pid in ids]
+
+
+def _request_paragraphs(
+    sources: List[str],
+    glossary: Dict[str, str],
+    context: Optional[str],
+    stats: Optional[Dict[str, Any]],
+    violations: Optional[List[str]] = None,
+    force_fidelity: bool = False,
+) -> Dict[int, str]:
+    """One structured request: `{id: translation}` for the ids the model answered."""
+    payload = encode_paragraphs(sources)
+    prompt = build_structured_prompt(payload, glossary, context, force_fidelity, violations)
+    try:
+        raw = _call_model_text(
+            LARGE_TIER.model, prompt, temperature=LARGE_TIER.temperature, num_ctx=LARGE_TIER.num_ctx, stats=stats,
+            num_predict=output_token_cap(payload),
+            expected_tokens=int(estimate_tokens(payload) * OUTPUT_EXPANSION_RATIO),
+            repeat_allowance=source_repeat_count(payload),
+            response_format=RESPONSE_SCHEMA,
+        )
+    except OutputTruncatedError:
+        # JSON cortado: os ids ficam ausentes e são pedidos um a um
+        raw = ""
+    parsed = parse_paragraphs(raw)
+    if not parsed:
+        print("    Resposta não é o JSON esperado.")
+        _bump_stat(stats, STAT_INVALID_JSON)
+    return parsed
+
+
+def _review_flagged_windows(
+    sources: List[str],
+    translations: List[str],
+    glossary: Dict[str, str],
+    api_key: Optional[str],
+    is_mature_content: bool,
+    stats: Optional[Dict[str, Any]],
+) -> List[str]:
+    """Semantic review only for the chunks whose translation fails the glossary check.
+
+    Clean windows keep their first-pass translation; the skip rate goes into `stats`.
+    """
+    matcher = get_glossary_matcher(glossary)
+    reviewed = list(translations)
+    flagged = 0
+    for i, (source, translation) in enumerate(zip(sources, translations)):
+        violations = matcher.violations(source, translation)
+        if not violations:
+            continue
+        flagged += 1
+        print(f"  Revisão semântica: janela {i+1}/{len(sources)} com {len(violations)} violação(ões) de glossário...")
+        text = semantic_review_chapter(
+            translation,
+            glossary,
+            api_key=api_key,
+            is_mature_content=is_mature_content,
+            stats=stats,
+            violations=[str(v) for v in violations],
+        )
+        # Preserve a quebra de parágrafo entre janelas
+        reviewed[i] = text.rstrip() + translation[len(translation.rstrip()):]
+    skipped = len(sources) - flagged
+    _bump_stat(stats, "Janelas Revisadas", flagged)
+    _bump_stat(stats, "Janelas sem Revisão (Glossário OK)", skipped)
+    print(f"  Portão de glossário: revisão pulada em {skipped}/{len(sources)} janelas ({skipped / max(1, len(sources)):.0%})")
+    return reviewed
+
+
+def _extract_and_save_terms(
+    translated: str,
+    glossary: Dict[str, str],
+    glossary_path: Optional[str],
+    novel_name: Optional[str],
+    term_extractor: Optional[TermExtractor],
+) -> None:
+    """Alimenta o extrator com o capítulo traduzido e persiste os termos que atingiram o limiar."""
+    if not (glossary_path and novel_name):
+        return
+    print("  Extração de glossário: identificando novos termos...")
+    new_terms = extract_new_terms(translated, glossary, term_extractor)
+    if new_terms:
+        updated_glossary = save_new_glossary_terms(new_terms, glossary_path, novel_name)
+        glossary.update(updated_glossary)
+        glossary_changed(glossary)
+
+
+def _bump_stat(stats: Optional[Dict[str, Any]], key: str, amount: float = 1) -> None:
+    """Increment a per-chapter counter when the caller asked for stats."""
+    if stats is not None:
+        with _STATS_LOCK:
+            stats[key] = stats.get(key, 0) + amount
+
+
+def _chunk_failures(source: str, translation: str, glossary: Dict[str, str]) -> List[str]:
+    """Checks used to decide cascade escalation: fidelity, noise and glossary consistency."""
+    failures = []
+    if _count_words(translation) < _count_words(source) * FIDELITY_THRESHOLD:
+        failures.append("fidelidade")
+    if _count_words(remove_translation_noise(translation)) < _count_words(translation):
+        failures.append("ruído")
+    if find_glossary_violations(source, translation, glossary):
+        failures.append("glossário")
+    return failures
+
+
+def _translate_chunk(
+    chunk: str,
+    glossary: Dict[str, str],
+    api_key: Optional[str] = None,
+    context: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    First translation attempt for a chunk.
+    
+    In cascade mode the small tier runs first and the chunk is escalated to the
+    large tier only if it fails `_chunk_failures`; otherwise the large tier is used directly.
+    """
+    _bump_stat(stats, "Chunks Traduzidos")
+    if not CASCADE_MODE:
+        return _translate_single_chunk(chunk, glossary, api_key, context=context, tier=LARGE_TIER, stats=stats)
+
+    try:
+        trans = _translate_single_chunk(chunk, glossary, api_key, context=context, tier=SMALL_TIER, stats=stats)
+        failures = _chunk_failures(chunk, trans, glossary)
+    except OutputTruncatedError:
+        failures = ["truncada"]
+    if not failures:
+        return trans
+    print(f"    Cascata: escalando para {LARGE_TIER.model} (falhas: {', '.join(failures)})")
+    _bump_stat(stats, "Chunks Escalados")
+    return _translate_single_chunk(chunk, glossary, api_key, context=context, tier=LARGE_TIER, stats=stats)
+
+
 def _translate_single_chunk(
     chunk: str,
     glossary: Dict[str, str],
     api_key: Optional[str] = None,
     force_fidelity: bool = False,
     temperature: Optional[float] = None,
+    context: Optional[str] = None,
+    tier: ModelTier = LARGE_TIER,
+    stats: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Translate a single chunk with consolidated prompt (translate+revise in one).
     
+    `context` holds passages retrieved from previous chapters (reference only).
+    `tier` selects the model, its default temperature and num_ctx.
+    
     Uses Ollama with temperature 0.3 for balance between precision and literary fluidity.
     
     NOTE ON CHARACTER COUNT:
@@ -406,8 +906,29 @@ def _translate_single_chunk(
     Por isso usamos % de PALAVRAS (90%) ao invés de caracteres para validar fidelidade.
     Caracteres podem oscilar: inglês compacto → PT-BR expansivo é NORMAL e esperado.
     """
+    prompt = build_chunk_prompt(chunk, glossary, context=context, force_fidelity=force_fidelity)
+
+    # Use the tier temperature for translation
+    final_temperature = temperature if temperature is not None else tier.temperature
+    translated = _call_model_text(
+        tier.model, prompt, temperature=final_temperature, num_ctx=tier.num_ctx, stats=stats,
+        num_predict=output_token_cap(chunk),
+        expected_tokens=int(estimate_tokens(chunk) * OUTPUT_EXPANSION_RATIO),
+        repeat_allowance=source_repeat_count(chunk),
+    )
+    final_post = apply_glossary_postprocessing(translated, glossary)
+    return final_post
+
+
+def build_chunk_prompt(
+    chunk: str,
+    glossary: Dict[str, str],
+    context: Optional[str] = None,
+    force_fidelity: bool = False,
+) -> str:
+    """Translation prompt for one chunk: system + glossary, optional warning and context, task, text."""
     glossary_block = build_glossary_instructions(glossary)
-    system = SYSTEM_PROMPT_TEMPLATE.format(glossary=glossary_block)
+    system = SYSTEM_PROMPT_TEMPLATE.format(glossary=glossary_block, output_format=PLAIN_OUTPUT_RULE)
     
     # Extra warning if reprocessing due to low fidelity
     extra_warning = (
@@ -420,7 +941,7 @@ def _translate_single_chunk(
     
     # Consolidated single-pass prompt
     prompt = (
-        system + extra_warning +
+        system + extra_warning + format_context_block(context) +
         "\n---\n"
         "TAREFA (UMA ÚNICA PASSAGEM):\n"
         "1. Traduza o texto abaixo para Português (PT-BR) PALAVRA POR PALAVRA. Não resuma!\n"
@@ -431,111 +952,70 @@ def _translate_single_chunk(
         "---\n\n"
         + chunk
     )
-    
-    # Use Ollama temperature for translation
-    final_temperature = temperature if temperature is not None else OLLAMA_TEMPERATURE
-    translated = _call_model_text("models/gemini-2.5-flash", prompt, temperature=final_temperature)
-    final_post = apply_glossary_postprocessing(translated, glossary)
-    return final_post
+    return prompt
 
 
-def extract_new_terms(text: str, existing_glossary: Dict[str, str]) -> Dict[str, Dict]:
+def build_structured_prompt(
+    payload: str,
+    glossary: Dict[str, str],
+    context: Optional[str] = None,
+    force_fidelity: bool = False,
+    violations: Optional[List[str]] = None,
+) -> str:
+    """Prompt for a batch of numbered paragraphs (`encode_paragraphs`) answered as JSON."""
+    glossary_block = build_glossary_instructions(glossary)
+    system = SYSTEM_PROMPT_TEMPLATE.format(glossary=glossary_block, output_format=JSON_OUTPUT_RULE)
+    extra_warning = (
+        "\n⚠️ AVISO CRÍTICO OBRIGATÓRIO: a última resposta deixou este parágrafo sem tradução. "
+        "Traduza o texto COMPLETO, sem resumir.\n"
+        if force_fidelity else ""
+    )
+    return (
+        system + extra_warning + format_context_block(context) +
+        "\n---\n"
+        "TAREFA (JSON):\n"
+        "1. A entrada abaixo é um objeto JSON com a lista \"paragraphs\"; cada item tem \"id\" e \"text\".\n"
+        "2. Traduza o \"text\" de CADA item para Português (PT-BR), PALAVRA POR PALAVRA. Não resuma!\n"
+        "3. Responda SOMENTE com JSON no mesmo formato: {\"paragraphs\": [{\"id\": 1, \"text\": \"...\"}, ...]}\n"
+        "4. Use os mesmos ids, um item por id: não junte, não divida e não omita parágrafos.\n"
+        + (
+            "PROBLEMAS DE GLOSSÁRIO DETECTADOS (corrija obrigatoriamente):\n"
+            + "".join(f"- {v}\n" for v in violations)
+            if violations else ""
+        )
+        + "---\n\n"
+        + payload
+    )
+
+
+def extract_new_terms(
+    text: str,
+    existing_glossary: Dict[str, str],
+    extractor: Optional[TermExtractor] = None,
+) -> Dict[str, Dict]:
     """
     Extrai termos novos do texto traduzido.
     
-    Estratégia: Procura por nomes próprios (palavras capitalizadas de 4+ letras que aparecem 2+ vezes).
-    Filtra palavras comuns, verbos, adjetivos, preposições e PALAVRAS EM INGLÊS.
+    Estratégia: Procura por nomes próprios (palavras capitalizadas de 4+ letras e nomes
+    compostos como "Rimuru Tempest") que aparecem 2+ vezes.
+    Filtra palavras comuns e PALAVRAS EM INGLÊS (listas em config/term_extraction.json).
     
-    CRÍTICO: Só extrai palavras que parecem ser português (traduzidas corretamente).
-    Palavras em inglês não-traduzidas devem ser ignoradas (ex: Dungeon → Masmorra).
+    Se `extractor` for fornecido (um por sessão), as frequências acumulam entre capítulos:
+    um nome citado uma vez em cada capítulo também é encontrado.
     """
-    new_terms = {}
-    known_names = set(existing_glossary.keys())
-    
-    # Lista EXPANDIDA de palavras a filtrar (artigos, preposições, conjunções, verbos comuns, adjetivos)
-    common_words = {
-        # Artigos e pronomes
-        'Uma', 'Um', 'O', 'A', 'Os', 'As', 'Que', 'E', 'De', 'Do', 'Da', 'Dos', 'Das',
-        # Adjetivos e demonstrativos
-        'Como', 'Então', 'Depois', 'Dentro', 'Seu', 'Sua', 'Todo', 'Toda', 'Todos', 'Todas',
-        'Este', 'Esse', 'Aquele', 'Dele', 'Dela', 'Deles', 'Delas',
-        # Preposições e conjunções
-        'Com', 'Por', 'Para', 'Desde', 'Até', 'Entre', 'Enquanto', 'Não', 'Mas',
-        'Se', 'Ou', 'Quando', 'Onde', 'Qual', 'Quais', 'Quanto', 'Quantos',
-        # Inglês comum
-        'I', 'A', 'The', 'To', 'Is', 'Was', 'Were', 'Be', 'Been',
-        'On', 'At', 'In', 'By', 'From', 'Up', 'About', 'Out', 'After', 'Before',
-        # Verbos conjugados comuns em PT-BR
-        'Obrigado', 'Você', 'Certo', 'Certamente', 'Lembro', 'Conservo', 'Havia', 'Notei', 'Fiquei',
-        'Olhei', 'Confuso', 'Finalmente', 'Primeiro', 'Seguindo', 'Agora', 'Resumindo', 'Quero',
-        'Devido', 'Aceitando', 'Consistência', 'Mantenha', 'Detalhes', 'Adicione', 'Melhoria',
-        'Continuarei', 'Voltei', 'Encontrei', 'Disse', 'Respondeu', 'Perguntou', 'Sussurrou',
-        'Gritou', 'Murmurou', 'Vou', 'Posso', 'Devo', 'Preciso', 'Consigo', 'Deveria',
-        'Realmente', 'Simplesmente', 'Apenas', 'Talvez', 'Ainda', 'Nunca', 'Sempre', 'Também',
-    }
-    
-    # Palavras em inglês típicas que indicam tradução incompleta
-    english_indicators = {
-        'Dungeon', 'Room', 'Hall', 'Gate', 'Door', 'Wall', 'Floor', 'Ceiling', 'Master',
-        'Battle', 'Fight', 'Quest', 'Level', 'Experience', 'Skill', 'Spell', 'Magic',
-        'Slime', 'Monster', 'Beast', 'Dragon', 'Goblin', 'Orc', 'Elf', 'Human', 'King',
-        'School', 'Academy', 'Guild', 'Party', 'Team', 'Group', 'Leader', 'Member',
-        'System', 'Status', 'Window', 'Menu', 'Quest', 'Chapter', 'Book', 'Volume',
-    }
-    
-    # Extrair todas as palavras
-    all_words = re.findall(r'\b\w+\b', text)
-    word_freq = {}
-    for word in all_words:
-        word_freq[word] = word_freq.get(word, 0) + 1
-    
-    # Filtrar e extrair termos candidatos
-    for term, freq in word_freq.items():
-        # Critérios de seleção rigorosos
-        if (freq >= 2 and                          # Apareceu 2+ vezes
-            term not in known_names and            # Não está no glossário
-            term not in common_words and           # Não é palavra comum/verbo/adjetivo
-            term not in english_indicators and     # NÃO É PALAVRA EM INGLÊS NÃO-TRADUZIDA
-            len(term) >= 4 and                     # Mínimo 4 caracteres
-            term[0].isupper() and                  # Começa com maiúscula
-            not term[0].isdigit() and              # Não começa com número
-            term not in new_terms):                # Não foi adicionado já
-            
-            # Encontrar contexto
-            idx = text.find(term)
-            if idx != -1:
-                start = max(0, idx - 60)
-                end = min(len(text), idx + len(term) + 60)
-                context = text[start:end]
-            else:
-                context = ""
-            
-            # Classificar tipo baseado em contexto
-            term_type = "character"  # Default
-            context_lower = context.lower()
-            
-            if any(loc in context_lower for loc in ["masmorra", "sala", "castelo", "cidade", "quarto", "caverna", "lugar", "terra", "reino", "floresta"]):
-                term_type = "location"
-            elif any(creature in context_lower for creature in ["slime", "monstro", "criatura", "besta", "demônio", "espírito", "goblin", "orc"]):
-                term_type = "creature"
-            elif any(ability in context_lower for ability in ["habilidade", "poder", "magia", "skill", "técnica", "ataque", "feitiço"]):
-                term_type = "ability"
-            
-            new_terms[term] = {
-                "type": term_type,
-                "pt_br": term,
-                "frequency": freq,
-                "context": context
-            }
-    
-    return new_terms
+    if extractor is None:
+        extractor = TermExtractor()
+    extractor.feed(text)
+    return extractor.candidates(existing_glossary.keys())
 
 
 def semantic_review_chapter(
     full_translation: str,
     glossary: Dict[str, str],
     api_key: Optional[str] = None,
-    is_mature_content: bool = True
+    is_mature_content: bool = True,
+    stats: Optional[Dict[str, Any]] = None,
+    violations: Optional[List[str]] = None,
 ) -> str:
     """
     Revisa o capítulo traduzido para garantir coerência semântica e naturalidade.
@@ -549,10 +1029,37 @@ def semantic_review_chapter(
         full_translation: Capítulo completo traduzido
         glossary: Glossário de termos conhecidos
         is_mature_content: Se True, permite linguagem explícita/chula
+        violations: Problemas de glossário já detectados localmente, listados no prompt
     
     Returns:
         Capítulo revisado
     """
+    review_prompt = build_review_prompt(full_translation, glossary, is_mature_content, violations)
+    
+    print("  Revisão semântica do capítulo completo...")
+    try:
+        reviewed = _call_model_text(
+            LARGE_TIER.model, review_prompt, temperature=0.2, num_ctx=LARGE_TIER.num_ctx, stats=stats,
+            num_predict=output_token_cap(full_translation, expansion=1.0),
+            expected_tokens=estimate_tokens(full_translation),
+            repeat_allowance=source_repeat_count(full_translation),
+        )
+    except OutputTruncatedError as e:
+        # Uma revisão truncada perderia texto: fique com a tradução sem revisão
+        print(f"  Revisão descartada: {e}")
+        return full_translation
+    reviewed = remove_translation_noise(reviewed)
+    
+    return reviewed
+
+
+def build_review_prompt(
+    full_translation: str,
+    glossary: Dict[str, str],
+    is_mature_content: bool = True,
+    violations: Optional[List[str]] = None,
+) -> str:
+    """Semantic review prompt for a translated chapter (or window), with known glossary problems if any."""
     glossary_block = build_glossary_instructions(glossary)
     
     # Prompt de revisão adaptado ao tipo de conteúdo
@@ -578,16 +1085,16 @@ def semantic_review_chapter(
         "- APENAS REVISE E MELHORE. Não resuma nem altere significado.\n"
         "- Se a tradução já está boa, devolva como está.\n\n"
         f"Grafo de Conhecimento (Glossário):\n{glossary_block}\n\n"
-        "---\n"
+        + (
+            "PROBLEMAS DE GLOSSÁRIO DETECTADOS (corrija obrigatoriamente):\n"
+            + "".join(f"- {v}\n" for v in violations) + "\n"
+            if violations else ""
+        )
+        + "---\n"
         "CAPÍTULO A REVISAR:\n"
         f"{full_translation}"
     )
-    
-    print("  Revisão semântica do capítulo completo...")
-    reviewed = _call_model_text("models/gemini-2.5-flash", review_prompt, temperature=0.2)
-    reviewed = remove_translation_noise(reviewed)
-    
-    return reviewed
+    return review_prompt
 
 
 def save_new_glossary_terms(
@@ -598,36 +1105,28 @@ def save_new_glossary_terms(
     """
     Salva novos termos extraídos no glossário da novel.
     
-    Atualiza terms.json com novos termos identificados.
+    Faz upsert incremental no terms.db (SQLite) da sessão, sem reescrever o arquivo inteiro.
+    Cada termo novo também vai para suggestions.jsonl, para revisão manual (tradução e gênero padrão).
     Retorna apenas os novos termos em formato Dict[str, str] para atualizar glossário.
     """
-    terms_file = f"{glossary_path}/terms.json"
-    
-    try:
-        with open(terms_file, 'r', encoding='utf-8') as f:
-            current_glossary = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        current_glossary = {}
-    
-    # Dicionário para retornar (apenas termo -> termo, sem metadados)
-    new_glossary_entries = {}
-    
-    # Adicionar novos termos com metadados
-    for term, info in new_terms.items():
-        if term not in current_glossary:
-            current_glossary[term] = {
-                "type": info.get("type", "misc"),
-                "pt_br": info.get("pt_br", term),
-                "en": info.get("en", ""),
-                "context": info.get("context", ""),
-                "added_date": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "gender": "M",  # Default, pode ser atualizado manualmente
-            }
-            new_glossary_entries[term] = term  # Adicionar ao retorno (Dict[str, str])
-            print(f"    [NOVO TERMO] {term} ({info.get('type', 'misc')})")
-    
-    # Salvar glossário atualizado
-    with open(terms_file, 'w', encoding='utf-8') as f:
-        json.dump(current_glossary, f, ensure_ascii=False, indent=2)
+    store = open_glossary_store(novel_name, glossary_path)
+    entries = {
+        term: {
+            "type": info.get("type", "misc"),
+            "pt_br": info.get("pt_br", term),
+            "en": info.get("en", ""),
+            "context": info.get("context", ""),
+            "frequency": info.get("frequency", 0),
+            "gender": "M",  # Default, pode ser atualizado manualmente
+        }
+        for term, info in new_terms.items()
+    }
+    new_glossary_entries = store.upsert_terms(entries)
+    for term in new_glossary_entries:
+        term_type = new_terms[term].get("type", "misc")
+        print(f"    [NOVO TERMO] {term} ({term_type})")
+        append_suggestion(
+            novel_name, f"{term} -> {entries[term]['pt_br']} ({term_type}, gênero padrão M: revisar)", glossary_path
+        )
     
     return new_glossary_entries
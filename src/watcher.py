@@ -0,0 +1,269 @@
+"""Watch mode: translate chapters as they land in input/<novel>/.
+
+A long-running daemon that keeps one warm `NovelSession` per novel (glossary,
+retrieval index, term extractor) and the model loaded, instead of re-reading
+everything and cold-starting on every run. New or changed `.txt` files are
+queued and translated in chapter order; each chapter's DOCX is written as
+soon as it is done, and the novel's end-of-run exports run whenever its queue
+drains.
+
+File events come from inotify (Linux, via ctypes) and fall back to polling
+(mtime/size) elsewhere or when inotify is unavailable.
+"""
+import ctypes
+import ctypes.util
+import heapq
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Intervalo de varredura do modo polling (segundos)
+WATCH_POLL_SECONDS = float(os.environ.get("WATCH_POLL_SECONDS", "2"))
+
+# Máscaras do inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _novel_of(path: Path, input_root: Path) -> str:
+    return path.parent.name if path.parent != input_root else "default"
+
+
+class PollingWatcher:
+    """Portable watcher: reports `.txt` files whose (mtime, size) changed and then held still.
+
+    A file is reported only after it is unchanged for one full interval, so a
+    scraper that is still writing it is not picked up half-way.
+    """
+
+    def __init__(self, input_root: Path, interval: float = WATCH_POLL_SECONDS):
+        self.input_root = Path(input_root)
+        self.interval = interval
+        self._known: Dict[Path, Tuple[int, int]] = {}
+        self._settling: Dict[Path, Tuple[int, int]] = {}
+        self._scan(report=False)
+
+    def _scan(self, report: bool = True) -> Set[Path]:
+        ready: Set[Path] = set()
+        current: Dict[Path, Tuple[int, int]] = {}
+        for path in list(self.input_root.glob("*.txt")) + list(self.input_root.glob("*/*.txt")):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            current[path] = (st.st_mtime_ns, st.st_size)
+        for path, sig in current.items():
+            if self._known.get(path) == sig:
+                continue
+            if not report or self._settling.get(path) == sig:
+                self._known[path] = sig
+                self._settling.pop(path, None)
+                if report:
+                    ready.add(path)
+            else:
+                self._settling[path] = sig
+        for path in set(self._known) - set(current):
+            del self._known[path]
+        return ready
+
+    def poll(self, timeout: float) -> Set[Path]:
+        time.sleep(min(timeout, self.interval))
+        return self._scan()
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Linux watcher on inotify: reports files on close-after-write or move into a novel dir."""
+
+    FILE_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, input_root: Path):
+        self.input_root = Path(input_root)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self._dirs: Dict[int, Path] = {}
+        self._add_watch(self.input_root)
+        for sub in self.input_root.iterdir():
+            if sub.is_dir():
+                self._add_watch(sub)
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), self.FILE_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou em {directory}")
+        self._dirs[wd] = directory
+
+    def poll(self, timeout: float) -> Set[Path]:
+        ready: Set[Path] = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return ready
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return ready
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Eventos perdidos: varra tudo de novo.
+                ready.update(self.input_root.glob("*.txt"))
+                ready.update(self.input_root.glob("*/*.txt"))
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & IN_ISDIR:
+                if directory == self.input_root and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_watch(path)
+                    # Arquivos copiados junto com a pasta chegaram antes do watch.
+                    ready.update(path.glob("*.txt"))
+                continue
+            # IN_CREATE sozinho significa arquivo ainda sendo escrito; espere o IN_CLOSE_WRITE.
+            if path.suffix == ".txt" and mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                ready.add(path)
+        return ready
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(input_root: Path, polling: bool = False, interval: float = WATCH_POLL_SECONDS):
+    """inotify on Linux unless `polling` is requested or inotify cannot be set up."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(input_root)
+        except (OSError, AttributeError) as e:
+            print(f"[watch] inotify indisponível ({e}); usando polling a cada {interval}s")
+    return PollingWatcher(input_root, interval)
+
+
+class WatchDaemon:
+    """Chapter queue plus warm per-novel sessions.
+
+    `session_factory(novel_name, input_dir, output_dir)` builds the session
+    (defaults to `pipeline.NovelSession`); it must provide `translate_chapter(path)`
+    and `finish()`.
+    """
+
+    def __init__(
+        self,
+        input_root: Path,
+        output_root: Path,
+        watcher=None,
+        session_factory: Optional[Callable] = None,
+    ):
+        self.input_root = Path(input_root)
+        self.output_root = Path(output_root)
+        self.watcher = watcher
+        if session_factory is None:
+            from .pipeline import NovelSession
+            session_factory = NovelSession
+        self.session_factory = session_factory
+        self.sessions: Dict[str, object] = {}
+        self._queue: List[Tuple[str, Tuple, Path]] = []
+        self._queued: Set[Path] = set()
+        self._dirty: Set[str] = set()
+
+    def session(self, novel: str, input_dir: Path):
+        if novel not in self.sessions:
+            print(f"[watch] Carregando sessão de '{novel}'...")
+            self.sessions[novel] = self.session_factory(novel, input_dir, self.output_root)
+        return self.sessions[novel]
+
+    def enqueue(self, path: Path) -> None:
+        from .pipeline import chapter_sort_key
+        path = Path(path)
+        if path in self._queued or path.suffix != ".txt" or not path.exists():
+            return
+        self._queued.add(path)
+        heapq.heappush(self._queue, (_novel_of(path, self.input_root), chapter_sort_key(path), path))
+
+    def scan_pending(self) -> int:
+        """Queue chapters with no translation yet or whose source is newer than it."""
+        from .exporter import has_chapter_translation, translation_cache_path
+        before = len(self._queued)
+        files = list(self.input_root.glob("*.txt")) + list(self.input_root.glob("*/*.txt"))
+        for path in files:
+            out_dir = str(self.output_root / _novel_of(path, self.input_root))
+            cache = translation_cache_path(out_dir, path.name)
+            if not has_chapter_translation(out_dir, path.name):
+                self.enqueue(path)
+            elif cache.exists() and cache.stat().st_mtime < path.stat().st_mtime:
+                self.enqueue(path)
+        return len(self._queued) - before
+
+    def _drain_events(self, timeout: float) -> None:
+        if self.watcher is None:
+            return
+        for path in self.watcher.poll(timeout):
+            self.enqueue(path)
+
+    def process_next(self) -> bool:
+        """Translate the first queued chapter. Returns False when the queue is empty."""
+        if not self._queue:
+            return False
+        novel, _, path = heapq.heappop(self._queue)
+        self._queued.discard(path)
+        if not path.exists():
+            return True
+        session = self.session(novel, path.parent)
+        session.translate_chapter(path)
+        self._dirty.add(novel)
+        return True
+
+    def flush(self) -> None:
+        """End-of-batch exports for every novel touched since the last flush."""
+        for novel in sorted(self._dirty):
+            self.sessions[novel].finish()
+        self._dirty.clear()
+
+    def run_pending(self) -> int:
+        """Process the queue until empty (picking up events between chapters)."""
+        done = 0
+        while self.process_next():
+            done += 1
+            # Capítulos que chegaram durante a tradução entram na ordem certa.
+            self._drain_events(0)
+        self.flush()
+        return done
+
+    def run_forever(self, interval: float = WATCH_POLL_SECONDS) -> None:
+        queued = self.scan_pending()
+        print(f"[watch] Observando {self.input_root}/ ({queued} capítulos pendentes). Ctrl+C para sair.")
+        try:
+            while True:
+                self.run_pending()
+                self._drain_events(interval)
+        except KeyboardInterrupt:
+            print("\n[watch] Encerrando...")
+            self.flush()
+        finally:
+            if self.watcher is not None:
+                self.watcher.close()
+
+
+def warm_up_model() -> None:
+    """Load the main model once so the first chapter does not pay the cold start."""
+    from .backends import get_backend
+    from .translator_core import LARGE_TIER
+    try:
+        get_backend().generate("OK", LARGE_TIER.model, temperature=0, num_ctx=LARGE_TIER.num_ctx, num_predict=1, timeout=120)
+    except Exception as e:
+        print(f"[watch] Aviso: não foi possível pré-carregar o modelo: {e}")
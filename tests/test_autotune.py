@@ -0,0 +1,34 @@
+"""Testes do afinador (varredura e perfil lido por translate_text)."""
+import time
+
+from src import autotune, translator_core as core
+
+
+def test_sweep_prefers_concurrency_when_calls_overlap(tmp_path, monkeypatch):
+    def slow_model(model, prompt, temperature=0.3, num_ctx=0, **kwargs):
+        time.sleep(0.02)
+        return prompt[prompt.rfind("\n---\n\n") + 6:]
+
+    monkeypatch.setattr(core, "_call_model_text", slow_model)
+    text = "\n\n".join(f"Paragraph {i} about the quiet city at dawn." for i in range(600))
+
+    def translate(sample, stats):
+        return core.translate_text(sample, None, {}, enable_semantic_review=False, stats=stats)
+
+    report = autotune.sweep([text], translate, prompt_overhead_tokens=500, log=lambda line: None)
+    assert report.best.acceptable
+    assert report.best.profile.concurrency > 1
+
+    path = str(tmp_path / "tuning.json")
+    autotune.save_tuning("m", report.best.profile, report.best.metrics(), host="h", path=path)
+    assert autotune.tuning_for("m", host="h", path=path) == report.best.profile
+    assert autotune.tuning_for("outro", host="h", path=path) == autotune.DEFAULT_PROFILE
+
+
+def test_translate_text_uses_tuned_chunk_size(monkeypatch):
+    calls = []
+    monkeypatch.setattr(core, "_call_model_text", lambda model, prompt, **kw: calls.append(prompt) or prompt)
+    text = "\n\n".join("word " * 100 for _ in range(20))
+    with autotune.override_tuning(autotune.TuningProfile(chunk_size=3000, overlap=0)):
+        core.translate_text(text, None, {}, enable_semantic_review=False)
+    assert len(calls) == len(core.chunk_text_by_paragraphs(text, 3000, 0)) > 1
@@ -0,0 +1,43 @@
+"""Testes do controlador adaptativo de tamanho de chunk (ADAPTIVE_CHUNKING)."""
+from src import translator_core as core
+from src.chunk_controller import ChunkSizeController, open_chunk_controller, save_chunk_controller
+
+
+def test_aimd_grows_on_success_and_halves_on_failure_within_limits():
+    controller = ChunkSizeController(4000, min_size=2000, max_size=6000, step=1000, backoff=0.5, target_seconds=10)
+    # 1000 chars/s x 10 s de latência alvo: pode crescer até 10000, limitado a 6000
+    assert not controller.record(4000, 4.0, 1000, passed=True)
+    assert controller.size == 5000
+    controller.record(5000, 5.0, 1000, passed=True)
+    controller.record(6000, 6.0, 1000, passed=True)
+    assert controller.size == 6000
+    assert controller.record(6000, 6.0, 200, passed=False)
+    assert controller.size == 3000
+    assert controller.record(3000, 30.0, 1000, passed=True)  # lento demais
+    assert controller.size == 2000
+    assert controller.failures == 1 and controller.chunks == 5
+
+
+def test_state_is_kept_per_novel_and_model(tmp_path):
+    controller = open_chunk_controller("nov", "modelo-a", 8000, str(tmp_path))
+    controller.record(8000, 1.0, 100, passed=False)
+    save_chunk_controller(controller, "nov", "modelo-a", str(tmp_path))
+
+    assert open_chunk_controller("nov", "modelo-a", 8000, str(tmp_path)).size == 4000
+    assert open_chunk_controller("nov", "modelo-b", 8000, str(tmp_path)).size == 8000
+    assert open_chunk_controller("outra", "modelo-a", 8000, str(tmp_path)).size == 8000
+
+
+def test_translate_text_cuts_each_chunk_at_the_current_target(monkeypatch):
+    from src.backends import LocalStubBackend
+
+    monkeypatch.setattr(core, "get_backend", lambda name=None: LocalStubBackend())
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    text = "\n\n".join(f"Paragraph {i} talks about the Demon Lord." for i in range(400))
+    controller = ChunkSizeController(2000, min_size=2000, max_size=8000, step=2000, target_seconds=0)
+    stats = {}
+    out = core.translate_text(text, None, {}, enable_semantic_review=False, stats=stats, chunk_controller=controller)
+    assert out.startswith("Paragraph 0 ") and out.endswith("Paragraph 399 talks about the Demon Lord.")
+    # Chunks de ~2000, 4000, 6000 e 8000 caracteres (9 chunks com 2000 fixos)
+    assert stats["Chunks Traduzidos"] == 4
+    assert stats["Tamanho de Chunk Alvo (Adaptativo)"] == 8000
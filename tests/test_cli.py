@@ -0,0 +1,55 @@
+"""Testes da CLI (subcomandos, seleção de capítulos e imports preguiçosos)."""
+import subprocess
+import sys
+from pathlib import Path
+
+from src import cli
+from src.pipeline import select_chapters
+from src.stats_ledger import append_stats_row, ledger_path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_select_chapters_by_name_stem_and_glob(tmp_path):
+    files = [tmp_path / n for n in ("001.txt", "002.txt", "010.txt", "extra.txt")]
+    assert select_chapters(files) == sorted(files)
+    picked = select_chapters(files, ["001", "002.txt", "01*.txt"])
+    assert [f.name for f in picked] == ["001.txt", "002.txt", "010.txt"]
+
+
+def test_novel_input_dirs_falls_back_to_default(tmp_path):
+    (tmp_path / "01.txt").write_text("x", encoding="utf-8")
+    assert cli.novel_input_dirs(tmp_path) == [("default", tmp_path)]
+    (tmp_path / "nov").mkdir()
+    assert cli.novel_input_dirs(tmp_path) == [("nov", tmp_path / "nov")]
+    assert cli.novel_input_dirs(tmp_path, "missing") == []
+
+
+def test_old_invocation_without_subcommand_means_translate():
+    assert cli.with_default_command([]) == ["translate"]
+    assert cli.with_default_command(["nov"]) == ["translate", "nov"]
+    assert cli.with_default_command(["--input", "in", "nov", "01.txt"]) == ["--input", "in", "translate", "nov", "01.txt"]
+    assert cli.with_default_command(["--output=out", "--resume"]) == ["--output=out", "translate", "--resume"]
+    assert cli.with_default_command(["--input", "in", "plan", "nov"]) == ["--input", "in", "plan", "nov"]
+    assert cli.with_default_command(["--help"]) == ["--help"]
+    args = cli.build_parser().parse_args(cli.with_default_command(["nov", "01"]))
+    assert (args.command, args.novel, args.chapters) == ("translate", "nov", ["01"])
+
+
+def test_stats_prints_ledger_totals(tmp_path, capsys):
+    ledger = str(ledger_path(str(tmp_path / "nov")))
+    append_stats_row(ledger, {"Nome do Ficheiro": "01.txt", "Palavras Originais": 100, "Palavras Traduzidas": 90})
+    assert cli.main(["--output", str(tmp_path), "stats", "nov"]) == 0
+    out = capsys.readouterr().out
+    assert "01.txt" in out and "90%" in out
+
+
+def test_check_does_not_import_heavy_dependencies(tmp_path):
+    code = (
+        "import sys; from src.cli import main; main(['--input', sys.argv[1], '--output', sys.argv[1], 'check']); "
+        "print(sorted(m for m in ('pandas', 'ollama', 'docx', 'chardet', 'src.translator_core') if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code, str(tmp_path)], cwd=ROOT, capture_output=True, text=True, check=False
+    ).stdout
+    assert out.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,57 @@
+"""Testes do índice BM25 de capítulos anteriores."""
+from src.context_index import ContextIndex, align_paragraphs
+from src.perf_history import estimate_tokens
+
+
+def test_align_paragraphs_proportionally():
+    assert align_paragraphs("a\n\nb", "x\n\ny") == [("a", "x"), ("b", "y")]
+    assert align_paragraphs("a\n\nb", "x y") == [("a", ""), ("b", "x y")]
+
+
+def test_search_prefers_passages_with_same_entities(tmp_path):
+    path = tmp_path / "context_index.jsonl"
+    index = ContextIndex(str(path))
+    index.add_chapter(
+        "00",
+        "Shion cooked a terrible stew.\n\nThe weather in the forest was calm.",
+        "Shion cozinhou um ensopado terrível.\n\nO clima na floresta estava calmo.",
+    )
+    index.add_chapter("01", "Benimaru trained with the ogres.", "Benimaru treinou com os ogros.")
+
+    best = index.search("Shion brought the stew again.", top_k=1)
+    assert index.passages[best[0][1]]["source"].startswith("Shion cooked")
+
+    # Reabrir reconstrói o índice a partir do disco.
+    reopened = ContextIndex(str(path))
+    assert len(reopened) == 3
+    context = reopened.build_context("Benimaru and the ogres", token_budget=50)
+    assert "Benimaru treinou" in context
+    assert estimate_tokens(context) <= 50
+
+
+def test_reindexing_a_chapter_replaces_its_passages(tmp_path):
+    path = tmp_path / "context_index.jsonl"
+    index = ContextIndex(str(path))
+    index.add_chapter("00", "Shion cooked.\n\nShion ate.", "Shion cozinhou.\n\nShion comeu.")
+    index.add_chapter("01", "Benimaru trained.", "Benimaru treinou.")
+    assert index.add_chapter("00", "Shion cooked.\n\nShion ate.", "Shion preparou.\n\nShion comeu.") == 2
+
+    for current in (index, ContextIndex(str(path))):
+        assert len(current) == 3
+        assert len(current.postings["shion"]) == 2
+        assert [p["target"] for p in current.passages if p["chapter"] == "00"] == ["Shion preparou.", "Shion comeu."]
+
+    # Arquivos antigos (só anexados) mantêm apenas o bloco mais recente de cada capítulo
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write('{"chapter": "01", "source": "Benimaru ran.", "target": "Benimaru correu."}\n')
+    reopened = ContextIndex(str(path))
+    assert [p["target"] for p in reopened.passages if p["chapter"] == "01"] == ["Benimaru correu."]
+    assert len(reopened) == 3
+
+
+def test_context_budget_counts_cjk_text_as_one_token_per_character(tmp_path):
+    index = ContextIndex(str(tmp_path / "context_index.jsonl"))
+    index.add_chapter("00", "利姆露走进了洞窟。" * 20, "Rimuru entrou na caverna. " * 20)
+    # ~180 ideogramas: cabem num orçamento por caracteres/4, não num CJK-aware
+    assert index.build_context("利姆露走进了洞窟", token_budget=150) == ""
+    assert index.build_context("利姆露走进了洞窟", token_budget=400) != ""
@@ -0,0 +1,34 @@
+"""Testes da continuidade pelo original (modo de capítulos em paralelo)."""
+from src.continuity import EntityTable, build_continuity, extractive_summary, longest_first
+
+
+def test_summary_keeps_central_sentences_in_order():
+    text = (
+        "Rimuru entered the dungeon with Shion. "
+        "It was raining. "
+        "Shion drew her sword inside the dungeon. "
+        "A bird sang somewhere far away. "
+        "Rimuru and Shion defeated the dungeon boss."
+    )
+    summary = extractive_summary(text, max_sentences=2)
+    assert summary == "Rimuru entered the dungeon with Shion. Rimuru and Shion defeated the dungeon boss."
+
+
+def test_context_has_mentioned_entities_and_previous_summaries():
+    entities = EntityTable.from_rows([
+        {"source_term": "Shion", "target_term": "Shion", "type": "character", "gender": "F"},
+        {"source_term": "Veldora", "target_term": "Veldora", "type": "character", "gender": "M"},
+        {"source_term": "Dungeon", "target_term": "Masmorra", "type": "location", "gender": ""},
+    ])
+    chapters = [("1.txt", "Veldora slept."), ("2.txt", "Shion cooked."), ("3.txt", "Shion and Rimuru ate.")]
+    continuity = build_continuity(chapters, entities, previous=1)
+
+    assert continuity["1.txt"].build_context("Shion ate.") == "[personagens]\nShion -> Shion (character, F)"
+    context = continuity["3.txt"].build_context("Shion and Rimuru ate.")
+    assert "[resumo de 2.txt (original)]\nShion cooked." in context
+    assert "Veldora" not in context
+
+
+def test_longest_chapters_are_scheduled_first():
+    texts = {"1.txt": "a" * 10, "2.txt": "a" * 30, "3.txt": "a" * 20}
+    assert longest_first(texts, ["1.txt", "3.txt"]) == ["3.txt", "1.txt"]
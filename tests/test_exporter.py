@@ -0,0 +1,117 @@
+"""Testes dos exportadores (DOCX em streaming)."""
+import zipfile
+from xml.dom import minidom
+
+import docx
+
+from src.exporter import create_docx, iter_paragraphs, write_docx_stream
+
+
+def test_iter_paragraphs_matches_split():
+    text = " a \n\nb\nc\n\n\n\nd"
+    assert list(iter_paragraphs(text)) == [p.strip() for p in text.split("\n\n")]
+
+
+def test_stream_docx_is_readable(tmp_path):
+    path = create_docx("01.txt", "「Olá」 & <mundo>\n\nlinha 1\nlinha 2\x07", str(tmp_path))
+    with zipfile.ZipFile(path) as zf:
+        minidom.parseString(zf.read("word/document.xml"))
+    paragraphs = [p.text for p in docx.Document(path).paragraphs]
+    assert paragraphs == ["「Olá」 & <mundo>", "linha 1\nlinha 2"]
+
+
+def test_headings_use_template_style(tmp_path):
+    path = write_docx_stream([("Heading1", "Capítulo 1"), "Texto"], str(tmp_path / "vol.docx"))
+    doc = docx.Document(path)
+    assert doc.paragraphs[0].style.name == "Heading 1"
+    assert doc.paragraphs[1].text == "Texto"
+
+
+def test_export_volume_streams_cached_chapters_in_order(tmp_path):
+    from src.exporter import export_volume, save_chapter_translation
+
+    input_dir = tmp_path / "input" / "slime"
+    input_dir.mkdir(parents=True)
+    (input_dir / "01.txt").write_text("Chapter 1 - The Cave\n\nText.", encoding="utf-8")
+    (input_dir / "02.txt").write_text("Chapter 2 - Goblins\n\nText.", encoding="utf-8")
+    (input_dir / "03.txt").write_text("Not translated yet.", encoding="utf-8")
+    out_novel = tmp_path / "output" / "slime"
+    save_chapter_translation(str(out_novel), "01.txt", "Caverna escura.\n\nRimuru acorda.")
+    # Capítulo sem cache: lido do DOCX já exportado.
+    create_docx("02.txt", "Os goblins chegam.", str(out_novel))
+
+    epub, merged, txt = export_volume("slime", str(input_dir), str(tmp_path / "output"), formats=("epub", "docx", "txt"))
+
+    with zipfile.ZipFile(epub) as zf:
+        assert zf.namelist()[0] == "mimetype"
+        assert zf.getinfo("mimetype").compress_type == zipfile.ZIP_STORED
+        nav = zf.read("OEBPS/nav.xhtml").decode("utf-8")
+        assert nav.index("The Cave") < nav.index("Goblins")
+        for name in zf.namelist():
+            if name.endswith((".xhtml", ".opf", ".ncx", ".xml")):
+                minidom.parseString(zf.read(name))
+        assert "Os goblins chegam." in zf.read("OEBPS/chap0002.xhtml").decode("utf-8")
+
+    texts = [p.text for p in docx.Document(merged).paragraphs]
+    assert texts == ["slime", "The Cave", "Caverna escura.", "Rimuru acorda.", "Goblins", "Os goblins chegam."]
+    assert open(txt, encoding="utf-8").read().startswith("The Cave\n\nCaverna escura.")
+
+
+def test_export_volume_orders_unpadded_chapters_naturally(tmp_path):
+    from src.exporter import export_volume, save_chapter_translation
+
+    input_dir = tmp_path / "input" / "slime"
+    input_dir.mkdir(parents=True)
+    (input_dir / "10.txt").write_text("Chapter 10 - The p0rn Shop\n\nText.", encoding="utf-8")
+    (input_dir / "2.txt").write_text("Chapter 2 - Goblins\n\nText.", encoding="utf-8")
+    out_novel = tmp_path / "output" / "slime"
+    save_chapter_translation(str(out_novel), "10.txt", "Capítulo dez.")
+    save_chapter_translation(str(out_novel), "2.txt", "Capítulo dois.")
+
+    (txt,) = export_volume("slime", str(input_dir), str(tmp_path / "output"), formats=("txt",))
+    content = open(txt, encoding="utf-8").read()
+    assert content.index("Capítulo dois.") < content.index("Capítulo dez.")
+    # Mesmo título do capítulo avulso (abreviações estilísticas normalizadas)
+    assert "The porn Shop" in content and "p0rn" not in content
+
+
+def test_stats_ledger_roundtrip_and_excel(tmp_path):
+    import openpyxl
+
+    from src.exporter import export_stats_excel
+    from src.stats_ledger import append_stats_row, read_stats_rows
+
+    ledger = str(tmp_path / "stats_execucao.csv")
+    base = {"Palavras Originais": 100, "Caracteres Originais": 500, "Novos Termos no Glossário": 0}
+    append_stats_row(ledger, {"Nome do Ficheiro": "01.txt", "Palavras Traduzidas": 50,
+                              "Caracteres Traduzidos": 450, **base})
+    append_stats_row(ledger, {"Nome do Ficheiro": "02.txt", "Palavras Traduzidas": 0, "Caracteres Traduzidos": 0,
+                              "Palavras Originais": 0, "Caracteres Originais": 0})
+    # Reexecução do capítulo 01: só a linha mais recente fica no relatório.
+    append_stats_row(ledger, {"Nome do Ficheiro": "01.txt", "Palavras Traduzidas": 110,
+                              "Caracteres Traduzidos": 560, "Chunks Escalados": 2, **base})
+
+    rows = read_stats_rows(ledger)
+    assert [r["Nome do Ficheiro"] for r in rows] == ["01.txt", "02.txt"]
+    assert rows[0]["Chunks Escalados"] == 2
+
+    sheet = openpyxl.load_workbook(export_stats_excel(ledger, str(tmp_path / "stats.xlsx"))).active
+    header = [c.value for c in sheet[1]]
+    first = dict(zip(header, [c.value for c in sheet[2]]))
+    second = dict(zip(header, [c.value for c in sheet[3]]))
+    assert first["Fidelidade de Volume"] == "110.0%"
+    assert first["% de Retenção"] == "112.0%"
+    assert first["Chunks Escalados"] == 2
+    assert second["Fidelidade de Volume"] == "0%"
+
+
+def test_low_fidelity_is_flagged(tmp_path):
+    import openpyxl
+
+    from src.exporter import write_stats_excel
+
+    path = write_stats_excel([{"Nome do Ficheiro": "a", "Palavras Originais": 100, "Palavras Traduzidas": 50,
+                               "Caracteres Originais": 10, "Caracteres Traduzidos": 8}], str(tmp_path / "s.xlsx"))
+    row = [c.value for c in openpyxl.load_workbook(path).active[2]]
+    assert "50.0% ⚠️ POSSÍVEL RESUMO" in row
+    assert "80.0% ❌ ERRO: ABAIXO DO PADRÃO" in row
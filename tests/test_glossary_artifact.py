@@ -0,0 +1,63 @@
+"""Testes do glossário em camadas e do artefato compilado (glossary-<hash>.glx)."""
+import json
+
+from src.glossary_artifact import load_artifact, load_layered_glossary, open_compiled_glossary
+from src.glossary_engine import open_glossary_store
+from src.glossary_matcher import get_glossary_matcher
+
+
+def _project(tmp_path):
+    glossary_dir = tmp_path / "glossary"
+    (glossary_dir / "series").mkdir(parents=True)
+    (glossary_dir / "glossary.json").write_text(json.dumps({
+        "Demon Lord": "Lorde Demônio",
+        "Rimuru": {"translation": "Rimuru", "gender": "M", "context": "Protagonista"},
+        "Dungeon": "Calabouço",
+    }), encoding="utf-8")
+    (glossary_dir / "series" / "tensura.json").write_text(json.dumps({"Dungeon": "Masmorra"}), encoding="utf-8")
+    (glossary_dir / "slime").mkdir()
+    (glossary_dir / "slime" / "config.json").write_text(json.dumps({"SERIES": "tensura"}), encoding="utf-8")
+    session = tmp_path / "session"
+    open_glossary_store("slime", str(session)).upsert_terms({"Demon Lord": "Rei Demônio"})
+    return str(glossary_dir), str(session)
+
+
+def test_layers_merge_with_later_layers_winning(tmp_path):
+    glossary_dir, session = _project(tmp_path)
+    glossary = load_layered_glossary("slime", session, glossary_dir)
+    assert glossary == {"Demon Lord": "Rei Demônio", "Rimuru": "Rimuru", "Dungeon": "Masmorra"}
+    # O matcher vem do artefato, não é reconstruído
+    assert get_glossary_matcher(glossary).violations("The Demon Lord", "O Lorde Demônio")[0].expected == "Rei Demônio"
+
+
+def test_artifact_is_reused_until_a_layer_changes(tmp_path):
+    glossary_dir, session = _project(tmp_path)
+    first = open_compiled_glossary("slime", session, glossary_dir)
+    assert not first.from_cache and first.path.exists()
+
+    again = open_compiled_glossary("slime", session, glossary_dir)
+    assert again.from_cache and again.digest == first.digest
+    assert again.mapping == first.mapping
+    assert [(s, e, again.matcher.sources[p]) for s, e, p in again.matcher.source_automaton.finditer("o Dungeon")] == [
+        (2, 9, "Dungeon")
+    ]
+
+    open_glossary_store("slime", session).upsert_terms({"Shion": "Shion"})
+    changed = open_compiled_glossary("slime", session, glossary_dir)
+    assert not changed.from_cache and changed.mapping["Shion"] == "Shion"
+    assert not first.path.exists()  # artefato antigo removido
+    assert load_artifact(changed.path, changed.digest).mapping == changed.mapping
+
+
+def test_matcher_cache_follows_in_place_glossary_changes():
+    from src.glossary_matcher import glossary_changed
+
+    glossary = {"Demon Lord": "Rei Demônio"}
+    matcher = get_glossary_matcher(glossary)
+    assert get_glossary_matcher(glossary) is matcher
+    assert get_glossary_matcher(dict(glossary)) is not matcher
+
+    # Mesmo tamanho: só a geração distingue o conteúdo novo
+    glossary["Demon Lord"] = "Lorde Demônio"
+    glossary_changed(glossary)
+    assert get_glossary_matcher(glossary).targets == ["Lorde Demônio"]
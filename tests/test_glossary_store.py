@@ -0,0 +1,71 @@
+"""Testes do armazenamento SQLite do glossário (terms.db)."""
+import json
+
+from src.glossary_engine import export_terms_json, load_terms_for_novel, open_glossary_store
+from src.glossary_store import GlossaryStore
+
+
+def test_upsert_returns_only_new_terms_and_keeps_curated_target(tmp_path):
+    store = GlossaryStore(str(tmp_path / "terms.db"))
+    created = store.upsert_terms({"Rimuru": {"type": "character", "pt_br": "Rimuru", "frequency": 2}})
+    assert created == {"Rimuru": "Rimuru"}
+
+    store.upsert_terms({"Rimuru": {"type": "misc", "pt_br": "Outro", "frequency": 3}})
+    row = store.get("Rimuru")
+    assert row["target_term"] == "Rimuru"
+    assert row["type"] == "character"
+    assert row["frequency"] == 5
+
+
+def test_mapping_is_flat_strings(tmp_path):
+    store = GlossaryStore(str(tmp_path / "terms.db"))
+    store.upsert_terms({"Dungeon": "Masmorra", "Veldora": {"type": "character", "pt_br": "Veldora"}})
+    assert store.as_mapping() == {"Dungeon": "Masmorra", "Veldora": "Veldora"}
+    assert [r["source_term"] for r in store.iter_terms("character")] == ["Veldora"]
+
+
+def test_legacy_terms_json_is_imported_and_exported(tmp_path):
+    novel_dir = tmp_path / "glossary" / "slime"
+    novel_dir.mkdir(parents=True)
+    legacy = {"Tempest": {"type": "location", "pt_br": "Tempestade", "gender": "F"}}
+    (novel_dir / "terms.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    assert load_terms_for_novel("slime", str(tmp_path)) == {"Tempest": "Tempestade"}
+
+    open_glossary_store("slime", str(tmp_path)).upsert_terms({"Shion": "Shion"})
+    exported_path = export_terms_json("slime", str(tmp_path))
+    exported = json.loads(open(exported_path, encoding="utf-8").read())
+    assert exported["Tempest"]["gender"] == "F"
+    assert exported["Shion"]["pt_br"] == "Shion"
+
+
+def test_legacy_import_happens_once_across_concurrent_openers(tmp_path):
+    import threading
+
+    legacy = tmp_path / "terms.json"
+    legacy.write_text(json.dumps({"Rimuru": {"pt_br": "Rimuru", "frequency": 4}}), encoding="utf-8")
+    db = str(tmp_path / "terms.db")
+    # Um store por "processo": cada um tem as próprias conexões com o mesmo arquivo
+    stores = [GlossaryStore(db) for _ in range(4)]
+    barrier = threading.Barrier(len(stores))
+
+    def open_and_import(store):
+        barrier.wait()
+        store.import_legacy_json(str(legacy))
+
+    threads = [threading.Thread(target=open_and_import, args=(s,)) for s in stores]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stores[0].get("Rimuru")["frequency"] == 4
+    assert GlossaryStore(db).import_legacy_json(str(legacy)) == 0
+
+
+def test_export_import_roundtrip_keeps_frequency(tmp_path):
+    store = GlossaryStore(str(tmp_path / "a.db"))
+    store.upsert_terms({"Shion": {"type": "character", "pt_br": "Shion", "frequency": 7}})
+    path = store.export_json(str(tmp_path / "terms.json"))
+    copy = GlossaryStore(str(tmp_path / "b.db"))
+    copy.import_json(path)
+    assert copy.get("Shion")["frequency"] == 7
@@ -0,0 +1,56 @@
+"""Testes do perfil de memória por etapa (MEMORY_PROFILE)."""
+from src.memory_profile import MemoryProfiler
+
+
+def test_stage_records_peak_and_dumps_top_allocations(tmp_path):
+    profiler = MemoryProfiler(str(tmp_path / "memory"), dump_threshold_mb=0, top=5)
+    try:
+        stats = {}
+        profiler.begin_chapter("001.txt")
+        with profiler.stage("tradução", stats):
+            kept = [bytearray(1024) for _ in range(2048)]  # ~2 MB retidos
+            del_me = bytearray(8 * 1024 * 1024)
+            del del_me
+        totals = profiler.end_chapter(stats)
+    finally:
+        profiler.close()
+
+    assert stats["Memória Pico - tradução (MB)"] >= 8
+    assert totals["Memória Pico (MB)"] == stats["Memória Pico (MB)"] >= 8
+    assert 1.5 <= totals["Memória Retida (MB)"] < 8
+    dump = (tmp_path / "memory" / "001-tradução.txt").read_text(encoding="utf-8")
+    assert "test_memory_profile.py" in dump
+    assert len(kept) == 2048
+
+
+def test_parallel_chapters_each_get_totals_and_close_stops_the_sampler(tmp_path):
+    import threading
+    import tracemalloc
+
+    profiler = MemoryProfiler(str(tmp_path / "memory"), dump_threshold_mb=10_000)
+    rows = {}
+    started = threading.Barrier(2)
+
+    def chapter(name):
+        stats = {}
+        profiler.begin_chapter(name)
+        started.wait()  # os dois capítulos abertos ao mesmo tempo
+        with profiler.stage("tradução", stats):
+            data = bytearray(1024 * 1024)
+        del data
+        started.wait()
+        profiler.end_chapter(stats)
+        rows[name] = stats
+
+    threads = [threading.Thread(target=chapter, args=(f"{i}.txt",)) for i in (1, 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    profiler.close()
+    profiler.close()
+
+    assert set(rows) == {"1.txt", "2.txt"}
+    assert all("Memória Pico (MB)" in stats and "RSS Pico (MB)" in stats for stats in rows.values())
+    assert not profiler.sampler._thread.is_alive()
+    assert not tracemalloc.is_tracing()
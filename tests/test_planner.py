@@ -0,0 +1,52 @@
+"""Testes do planejador (dry-run) e do histórico de vazão."""
+from src import perf_history
+from src.planner import DEFAULT_RATES, plan_novel
+
+
+def test_fit_recovers_prompt_and_completion_costs():
+    sums = dict.fromkeys(perf_history.SUM_KEYS, 0.0)
+    for p, c in ((1000, 200), (3000, 900), (500, 700), (2000, 100)):
+        s = 0.002 * p + 0.04 * c
+        for key, value in (("n", 1), ("p", p), ("c", c), ("s", s), ("pp", p * p), ("cc", c * c),
+                           ("pc", p * c), ("ps", p * s), ("cs", c * s)):
+            sums[key] += value
+    model = perf_history.fit_throughput(sums)
+    assert abs(model.seconds_per_prompt_token - 0.002) < 1e-9
+    assert abs(model.seconds_per_completion_token - 0.04) < 1e-9
+    assert perf_history.fit_throughput({}) == perf_history.DEFAULT_THROUGHPUT
+
+
+def test_plan_counts_chunks_reviews_and_context_growth(tmp_path):
+    novel = tmp_path / "input" / "nov"
+    novel.mkdir(parents=True)
+    (novel / "01.txt").write_text("Curto.\n\nDois parágrafos.", encoding="utf-8")
+    (novel / "02.txt").write_text("\n\n".join(["Parágrafo longo " * 30] * 40), encoding="utf-8")
+    rates = dict(DEFAULT_RATES, fidelity_retry=0.0, network_retry=0.0, review_window=1.0)
+    plan = plan_novel("nov", novel, tmp_path / "output", rates=rates)
+    assert plan.chapters == 2
+    assert plan.chunks == 1 + 3
+    assert plan.groups["primeira passagem"].calls == 4
+    assert plan.groups["revisão semântica"].calls == 3  # uma por janela (todas com violações)
+    assert (plan.passages_before, plan.passages_after) == (0, 42)
+    assert not (tmp_path / "output").exists()
+
+
+def test_expansion_rate_is_measured_in_tokens(tmp_path):
+    from src.perf_history import estimate_tokens
+    from src.planner import history_rates
+    from src.stats_ledger import STAT_SOURCE_TOKENS, STAT_TARGET_TOKENS, append_stats_row, ledger_path
+
+    source = "利姆露走进了洞窟。" * 100
+    target = "Rimuru entrou na caverna. " * 100
+    append_stats_row(str(ledger_path(str(tmp_path / "nov"))), {
+        "Nome do Ficheiro": "01.txt",
+        "Caracteres Originais": len(source),
+        "Caracteres Traduzidos": len(target),
+        "Chunks Traduzidos": 1,
+        STAT_SOURCE_TOKENS: estimate_tokens(source),
+        STAT_TARGET_TOKENS: estimate_tokens(target),
+    })
+    # ~2.9x em caracteres, mas menos tokens na saída do que na entrada
+    assert len(target) / len(source) > 2.5
+    assert abs(history_rates(tmp_path)["expansion"] - estimate_tokens(target) / estimate_tokens(source)) < 1e-9
+    assert history_rates(tmp_path)["expansion"] < 1
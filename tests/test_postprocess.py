@@ -0,0 +1,35 @@
+"""Testes do pós-processamento por parágrafo (src/postprocess.py)."""
+from src.formatter import format_text
+from src.postprocess import postprocess
+
+
+RAW = (
+    "Entendo que este conteúdo é sensível.\n"
+    "Por favor, leia com cuidado.\n\n"
+    '"Vamos, Tempest!" gritou Rimuru Tempest.   \n\n\n'
+    "- Espere - disse Shion."
+)
+
+
+def test_single_pass_cleans_dialogue_glossary_and_counts_words():
+    glossary = {"Tempest": "Rimuru Tempest", "Shion": "Shion"}
+    result = postprocess(RAW, glossary, japanese_mode=False)
+    assert result.text == "— Vamos, Rimuru Tempest! — gritou Rimuru Tempest.\n\n— Espere - disse Shion."
+    assert result.words == len(result.text.split())
+    assert set(result.seconds) == {"ruído", "aspas", "glossário", "espaços"}
+    # Aplicar de novo não muda nada (o alvo já contém o termo original)
+    assert postprocess(result.text, glossary, japanese_mode=False).text == result.text
+
+
+def test_japanese_mode_selects_corner_quotes():
+    result = postprocess('"Olá," disse ele.\n\n— Vamos', japanese_mode=True)
+    assert result.text == "「Olá,」 disse ele.\n\n「Vamos」"
+    assert format_text('"Olá"\n\n\n\nFim  ', japanese_mode=True) == "「Olá」\n\nFim\n"
+
+
+def test_every_quoted_span_on_a_line_becomes_a_dash():
+    result = postprocess('"Olá," disse ela. "Venha aqui."', japanese_mode=False)
+    assert result.text == "— Olá, — disse ela. — Venha aqui."
+    result = postprocess('"Um," disse ele. "Dois," continuou. "Três."', japanese_mode=False)
+    assert result.text == "— Um, — disse ele. — Dois, — continuou. — Três."
+    assert '"' not in result.text
@@ -0,0 +1,120 @@
+"""Testes de retentativas, hedging e circuit breaker das chamadas ao modelo."""
+import threading
+
+import pytest
+
+from src import resilience
+from src.backends import BackendTimeoutError
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+
+
+def test_retries_until_success_and_counts(monkeypatch):
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise BackendTimeoutError("lento")
+        return "ok"
+
+    stats = {}
+    assert resilience.call_with_resilience(flaky, "retry-endpoint", 2000, stats) == "ok"
+    assert stats[resilience.STAT_RETRIES] == 2
+    assert stats[resilience.STAT_TIMEOUTS] == 2
+    assert attempts[0] == resilience.scaled_timeout(2000)
+
+
+def test_circuit_opens_and_rejects_without_calling():
+    calls = []
+
+    def failing(timeout):
+        calls.append(1)
+        raise RuntimeError("fora do ar")
+
+    breaker = resilience.get_breaker("dead-endpoint")
+    breaker.failure_threshold = 2
+    with pytest.raises(RuntimeError):
+        resilience.call_with_resilience(failing, "dead-endpoint", 10, max_retries=1)
+    stats = {}
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.call_with_resilience(failing, "dead-endpoint", 10, stats)
+    assert len(calls) == 2
+    assert stats[resilience.STAT_CIRCUIT_REJECTIONS] == 1
+
+
+def test_unexpected_error_in_half_open_probe_does_not_wedge_the_circuit():
+    breaker = resilience.get_breaker("probe-endpoint")
+    breaker.failure_threshold = 1
+    breaker.reset_seconds = 0
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+
+    def broken_parse(timeout):
+        raise ValueError("resposta ilegível")
+
+    with pytest.raises(ValueError):
+        resilience.call_with_resilience(broken_parse, "probe-endpoint", 10)
+    assert resilience.call_with_resilience(lambda timeout: "ok", "probe-endpoint", 10) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_hedge_returns_first_finisher():
+    tracker = resilience.get_latency_tracker("hedge-endpoint")
+    for _ in range(resilience.LLM_HEDGE_MIN_SAMPLES):
+        tracker.record(0.01, 100)
+    calls = []
+    release = threading.Event()
+
+    def slow_then_fast(timeout):
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(1.0)
+            return "lenta"
+        return "rápida"
+
+    stats = {}
+    result = resilience.call_with_resilience(slow_then_fast, "hedge-endpoint", 100, stats, hedge=True)
+    release.set()
+    assert result == "rápida"
+    assert stats[resilience.STAT_HEDGES] == 1
+    assert stats[resilience.STAT_HEDGE_WINS] == 1
+
+
+def test_openai_mid_stream_stall_is_a_backend_timeout(monkeypatch):
+    import socket
+
+    from src.backends import OpenAICompatibleBackend
+
+    class _StallingResponse:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def __iter__(self):
+            yield b'data: {"choices": [{"delta": {"content": "Ela abriu"}}]}\n'
+            raise socket.timeout("timed out")
+
+    backend = OpenAICompatibleBackend(base_url="http://stall.invalid/v1")
+    monkeypatch.setattr(backend, "_open", lambda body, timeout: _StallingResponse())
+    pieces = []
+    with pytest.raises(BackendTimeoutError):
+        for piece in backend.stream("prompt", "m"):
+            pieces.append(piece)
+    assert pieces == ["Ela abriu"]
+
+
+def test_ollama_backend_reuses_its_client():
+    from src.backends import OllamaBackend
+
+    backend = OllamaBackend(base_url="http://ollama.invalid:11434", timeout=300)
+    client = backend._client(None)
+    assert backend._client(300) is client
+    # Timeouts escalonados caem em poucos degraus, cada um com um cliente reaproveitado
+    assert backend._client(41.5) is backend._client(55) is not client
+    assert len(backend._clients) == 2
@@ -0,0 +1,70 @@
+"""Testes do serviço HTTP (fila persistente e workers por novel)."""
+import json
+import threading
+import time
+import urllib.request
+
+from src.service import JobStore, make_server
+
+
+def test_claim_respects_order_and_busy_novels(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    a1 = store.submit("a", "chunk", "1")
+    b1 = store.submit("b", "chunk", "2")
+    a2 = store.submit("a", "chunk", "3")
+    assert store.claim_next()["id"] == a1
+    assert store.claim_next(exclude=["a"])["id"] == b1
+    assert store.claim_next(novel="a")["id"] == a2
+    assert store.claim_next() is None
+    store.finish(a1, result="ok")
+    assert store.counts() == {"done": 1, "running": 2}
+    assert store.requeue_running() == 2
+
+
+class FakeSession:
+    active = {}
+    lock = threading.Lock()
+    log = []
+
+    def __init__(self, novel, input_dir, output_dir):
+        self.novel = novel
+
+    def translate_snippet(self, text, review=False):
+        with self.lock:
+            assert not self.active.get(self.novel), "duas threads na mesma novel"
+            self.active[self.novel] = True
+        time.sleep(0.01)
+        with self.lock:
+            self.active[self.novel] = False
+            self.log.append((self.novel, text))
+        return text.upper()
+
+    def finish(self):
+        pass
+
+
+def _request(url, payload=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def test_service_runs_jobs_serially_per_novel(tmp_path):
+    server = make_server(tmp_path, tmp_path, host="127.0.0.1", port=0, workers=3, session_factory=FakeSession)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        ids = [
+            _request(f"{base}/jobs", {"novel": novel, "kind": "chunk", "text": f"{novel}{i}"})["id"]
+            for i in range(4) for novel in ("x", "y")
+        ]
+        deadline = time.time() + 5
+        while time.time() < deadline and _request(f"{base}/health")["jobs"].get("done", 0) < len(ids):
+            time.sleep(0.02)
+        assert _request(f"{base}/jobs/{ids[0]}/result")["result"] == "X0"
+        assert [t for n, t in FakeSession.log if n == "x"] == ["x0", "x1", "x2", "x3"]
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.pool.stop()
@@ -0,0 +1,61 @@
+"""Testes do log de sugestões append-only (suggestions.jsonl)."""
+import json
+
+from src.glossary_engine import SuggestionLog, append_suggestion, iter_suggestions, suggestions_path
+
+
+def test_append_dedupes_in_memory(tmp_path):
+    append_suggestion("slime", "Rimuru -> Rimuru", str(tmp_path))
+    append_suggestion("slime", "Rimuru -> Rimuru", str(tmp_path))
+    append_suggestion("slime", "Shion -> Shion", str(tmp_path))
+    assert list(iter_suggestions("slime", str(tmp_path))) == ["Rimuru -> Rimuru", "Shion -> Shion"]
+    assert len(suggestions_path("slime", str(tmp_path)).read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_legacy_json_is_migrated_and_compacted(tmp_path):
+    legacy = tmp_path / "suggestions.json"
+    legacy.write_text(json.dumps(["a", "b", "a", "a"]), encoding="utf-8")
+    log = SuggestionLog(str(tmp_path / "suggestions.jsonl"), compact_min_redundant=1)
+    assert list(log) == ["a", "b"]
+    assert "a" in log and len(log) == 2
+    assert not log.append("b")
+
+
+def test_compaction_does_not_lose_concurrent_appends(tmp_path):
+    import threading
+
+    import time
+
+    class SlowReadLog(SuggestionLog):
+        def __iter__(self):
+            yield from super().__iter__()
+            time.sleep(0.005)  # alarga a janela entre terminar a leitura e substituir o arquivo
+
+    path = str(tmp_path / "suggestions.jsonl")
+    writer = SuggestionLog(path)
+    # Outra instância (como outro processo) compactando o mesmo arquivo sem parar
+    compactor = SlowReadLog(path)
+    stop = threading.Event()
+
+    def compact_loop():
+        while not stop.is_set():
+            compactor.compact()
+
+    thread = threading.Thread(target=compact_loop)
+    thread.start()
+    try:
+        for i in range(300):
+            writer.append(f"termo {i}")
+    finally:
+        stop.set()
+        thread.join()
+    assert sorted(SuggestionLog(path)) == sorted(f"termo {i}" for i in range(300))
+
+
+def test_new_glossary_terms_are_logged_for_review(tmp_path):
+    from src.translator_core import save_new_glossary_terms
+
+    save_new_glossary_terms({"Benimaru": {"type": "character", "frequency": 3}}, str(tmp_path), "slime")
+    assert list(iter_suggestions("slime", str(tmp_path))) == [
+        "Benimaru -> Benimaru (character, gênero padrão M: revisar)"
+    ]
@@ -0,0 +1,41 @@
+"""Testes do extrator de termos em passagem única."""
+from src.term_extractor import TermExtractor
+from src.translator_core import extract_new_terms
+
+
+def test_multiword_names_and_first_context():
+    text = "Rimuru Tempest olhou para a caverna. Depois, Rimuru Tempest sorriu para Shion."
+    terms = extract_new_terms(text, {})
+    assert terms["Rimuru Tempest"]["frequency"] == 2
+    assert terms["Rimuru Tempest"]["context"].startswith("Rimuru Tempest olhou")
+    # "caverna" está na frase, mas não ao lado do nome
+    assert terms["Rimuru Tempest"]["type"] == "character"
+    assert "Depois" not in terms
+    assert "Shion" not in terms
+    # As palavras de um nome composto não viram candidatos sozinhas
+    assert "Rimuru" not in terms and "Tempest" not in terms
+
+
+def test_type_comes_from_the_term_or_an_adjacent_cue_word():
+    text = (
+        "Eles chegaram à cidade de Ingrassia. A Floresta Jura cercava Ingrassia. "
+        "Benimaru entrou na Floresta Jura. O ataque de Benimaru foi rápido."
+    )
+    terms = extract_new_terms(text, {})
+    assert terms["Ingrassia"]["type"] == "location"
+    assert terms["Floresta Jura"]["type"] == "location"
+    assert terms["Benimaru"]["type"] == "character"
+
+
+def test_frequencies_accumulate_across_chapters():
+    extractor = TermExtractor()
+    assert extract_new_terms("Capítulo com Benimaru uma vez.", {}, extractor) == {}
+    found = extract_new_terms("Outro capítulo com Benimaru.", {}, extractor)
+    assert found["Benimaru"]["frequency"] == 2
+    # Emitido apenas uma vez por sessão.
+    assert extract_new_terms("Benimaru de novo.", {}, extractor) == {}
+
+
+def test_known_and_english_terms_are_skipped():
+    text = "Veldora e Veldora. Dungeon Dungeon. Goblin Goblin."
+    assert extract_new_terms(text, {"Veldora": "Veldora"}) == {}
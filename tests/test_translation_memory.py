@@ -0,0 +1,79 @@
+"""Testes da memória de tradução (reuso exato, por números e pré-preenchimento)."""
+from src import translator_core as core
+from src.translation_memory import MemoryContext, TranslationMemory, renumber
+
+STATUS = "[System] Skill Acquired: Flame Lance. Level 5, mana cost 120."
+STATUS_PT = "[Sistema] Habilidade adquirida: Lança de Chamas. Nível 5, custo de mana 120."
+
+
+def test_exact_and_number_only_matches_are_reused(tmp_path):
+    tm = TranslationMemory(str(tmp_path / "tm.db"))
+    tm.add([(STATUS, STATUS_PT)])
+    exact, numbers = tm.lookup([STATUS + "  ", STATUS.replace("5", "6").replace("120", "135")])
+    assert exact.kind == "exact" and exact.target == STATUS_PT
+    assert numbers.kind == "numbers"
+    assert numbers.target == STATUS_PT.replace("5", "6").replace("120", "135")
+    # Reabrir reconstrói o índice LSH a partir das assinaturas gravadas
+    assert len(TranslationMemory(str(tmp_path / "tm.db"))) == 1
+
+
+def test_similar_segment_is_prefilled_not_reused(tmp_path):
+    tm = TranslationMemory(str(tmp_path / "tm.db"), fuzzy_threshold=0.6)
+    tm.add([(STATUS, STATUS_PT)])
+    edited = STATUS.replace("Flame Lance", "Flame Lances")
+    match, unrelated = tm.lookup([edited, "She walked quietly into the ruined chapel at dawn."])
+    assert match.kind == "fuzzy" and match.target is None
+    assert match.reference_target == STATUS_PT
+    assert unrelated.kind == "none"
+    assert STATUS_PT in MemoryContext([match]).build_context(edited)
+
+
+def test_renumber_requires_numbers_in_target():
+    assert renumber("Level 5", "Level 7", "Nível 5") == "Nível 7"
+    assert renumber("Level 5", "Level 7", "Nível cinco") is None
+    assert renumber("Level 5", "Rank 7", "Nível 5") is None
+
+
+def test_translate_text_sends_only_unknown_paragraphs(tmp_path, monkeypatch):
+    prompts = []
+
+    def call(model, prompt, temperature=0.3, num_ctx=0, **kwargs):
+        prompts.append(prompt)
+        return "Ela entrou na capela em ruínas ao amanhecer, em silêncio."
+
+    monkeypatch.setattr(core, "_call_model_text", call)
+    tm = TranslationMemory(str(tmp_path / "tm.db"))
+    tm.add([(STATUS, STATUS_PT)])
+    text = STATUS + "\n\nShe walked quietly into the ruined chapel at dawn.\n\n" + STATUS.replace("5", "9")
+    stats = {}
+    out = core.translate_text(text, None, {}, stats=stats, translation_memory=tm)
+    assert len(prompts) == 1 and STATUS not in prompts[0]
+    assert out.split("\n\n") == [
+        STATUS_PT,
+        "Ela entrou na capela em ruínas ao amanhecer, em silêncio.",
+        STATUS_PT.replace("5", "9"),
+    ]
+    assert stats["Segmentos Reutilizados (TM)"] == 2
+    assert stats["Segmentos Enviados ao Modelo"] == 1
+    assert len(tm) == 2
+
+
+def test_reused_segments_follow_glossary_changes(tmp_path, monkeypatch):
+    prompts = []
+
+    def call(model, prompt, temperature=0.3, num_ctx=0, **kwargs):
+        prompts.append(prompt)
+        return "O Rei Demônio sorriu para os goblins reunidos."
+
+    monkeypatch.setattr(core, "_call_model_text", call)
+    source = "The Demon Lord smiled at the gathered goblins."
+    tm = TranslationMemory(str(tmp_path / "tm.db"))
+    tm.add([(source, "O Lorde Demônio sorriu para os goblins reunidos.")])
+    stats = {}
+    out = core.translate_text(
+        source, None, {"Demon Lord": "Rei Demônio"}, stats=stats, translation_memory=tm, enable_semantic_review=False
+    )
+    assert out == "O Rei Demônio sorriu para os goblins reunidos."
+    assert len(prompts) == 1
+    assert stats["Segmentos Invalidados pelo Glossário (TM)"] == 1
+    assert tm.lookup([source])[0].target == out
@@ -0,0 +1,301 @@
+"""Testes do núcleo de tradução com o modelo substituído por funções locais."""
+from src import translator_core as core
+
+
+def _fake_model(outputs):
+    calls = []
+
+    def call(model, prompt, temperature=0.3, num_ctx=0, **kwargs):
+        calls.append(model)
+        return outputs[model]
+
+    return call, calls
+
+
+def test_cascade_keeps_small_model_output_when_checks_pass(monkeypatch):
+    call, calls = _fake_model({core.SMALL_TIER.model: "um dois três quatro"})
+    monkeypatch.setattr(core, "CASCADE_MODE", True)
+    monkeypatch.setattr(core, "_call_model_text", call)
+    stats = {}
+    out = core._translate_chunk("one two three four", {}, stats=stats)
+    assert out == "um dois três quatro"
+    assert calls == [core.SMALL_TIER.model]
+    assert stats == {"Chunks Traduzidos": 1}
+
+
+def test_cascade_escalates_on_glossary_violation(monkeypatch):
+    call, calls = _fake_model({
+        core.SMALL_TIER.model: "Lorde Demônio falou algo aqui",
+        core.LARGE_TIER.model: "Rei Demônio falou algo aqui",
+    })
+    monkeypatch.setattr(core, "CASCADE_MODE", True)
+    monkeypatch.setattr(core, "_call_model_text", call)
+    stats = {}
+    out = core._translate_chunk("Demon Lord said something here", {"Demon Lord": "Rei Demônio"}, stats=stats)
+    assert out == "Rei Demônio falou algo aqui"
+    assert calls == [core.SMALL_TIER.model, core.LARGE_TIER.model]
+    assert stats["Chunks Escalados"] == 1
+
+
+def test_translate_text_runs_end_to_end_on_stub_backend(monkeypatch):
+    from src.backends import LocalStubBackend
+
+    monkeypatch.setattr(core, "get_backend", lambda name=None: LocalStubBackend())
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    text = "\n\n".join(f"Paragraph {i} talks about the Demon Lord." for i in range(400))
+    stats = {}
+    out = core.translate_text(text, None, {"Demon Lord": "Rei Demônio"}, stats=stats)
+    assert "Rei Demônio" in out and "Demon Lord" not in out
+    assert stats["Chunks Traduzidos"] > 1
+
+
+class _ScriptedBackend:
+    """Streams one scripted response per call and records how much of each was read."""
+
+    def __init__(self, responses):
+        from src.backends import BackendCapabilities
+        self.capabilities = BackendCapabilities(batching=False, streaming=True, prefix_caching=False, max_context=0)
+        self.responses = list(responses)
+        self.read = []
+
+    def endpoint(self):
+        return "scripted"
+
+    def stream(self, prompt, model, **kwargs):
+        words = self.responses.pop(0).split(" ")
+        self.read.append(0)
+        for i, word in enumerate(words):
+            self.read[-1] += 1
+            yield word if i == len(words) - 1 else word + " "
+
+    def generate(self, prompt, model, **kwargs):
+        return "".join(self.stream(prompt, model))
+
+
+def test_disclaimer_opening_aborts_stream_and_retries(monkeypatch):
+    disclaimer = "Entendo que este conteúdo é sensível, mas " + "blá " * 500
+    backend = _ScriptedBackend([disclaimer, "Ela abriu a porta devagar."])
+    monkeypatch.setattr(core, "get_backend", lambda name=None: backend)
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    stats = {}
+    out = core._call_model_text("m", "prompt", stats=stats, expected_tokens=500)
+    assert out == "Ela abriu a porta devagar."
+    assert backend.read[0] < 10
+    assert stats["Gerações Abortadas (Preâmbulo)"] == 1
+    assert stats["Tempo Poupado por Abortos (s)"] >= 0
+
+
+def test_aborted_streams_are_not_throughput_or_latency_samples(monkeypatch):
+    from src import resilience
+
+    class _Backend(_ScriptedBackend):
+        def endpoint(self):
+            return "scripted-abortos"
+
+    recorded = []
+    disclaimer = "Entendo que este conteúdo é sensível, mas " + "blá " * 500
+    backend = _Backend([disclaimer, "Ela abriu a porta devagar."])
+    monkeypatch.setattr(core, "get_backend", lambda name=None: backend)
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    monkeypatch.setattr(core, "record_call", lambda *args: recorded.append(args))
+    core._call_model_text("m", "prompt")
+    assert len(recorded) == 1 and recorded[0][2] == core.estimate_tokens("Ela abriu a porta devagar.")
+    assert len(resilience.get_latency_tracker("scripted-abortos").samples) == 1
+
+
+def test_preamble_check_ignores_ordinary_openings():
+    from src.stream_guard import PreambleCheck
+
+    def trips(text):
+        check = PreambleCheck()
+        return any(check.feed(word + " ") for word in text.split(" "))
+
+    assert not trips("No entanto, a porta continuava trancada e ninguém respondia.")
+    assert not trips("Além disso, o goblin carregava uma lança quebrada.")
+    assert not trips("— Por favor, venha comigo — disse ela.")
+    assert trips("Entendo que este conteúdo pode ser sensível.")
+    assert trips("Aqui está a tradução do capítulo:")
+    assert trips("Por favor, note que o texto a seguir contém violência.")
+
+
+def test_retry_after_mid_stream_timeout_gets_a_fresh_guard(monkeypatch):
+    from src import resilience
+    from src.backends import BackendTimeoutError
+
+    class _TimingOutBackend(_ScriptedBackend):
+        def stream(self, prompt, model, **kwargs):
+            if len(self.read) == 0:
+                self.read.append(0)
+                for word in ("Ela ", "abriu ", "a ", "porta "):
+                    self.read[-1] += 1
+                    yield word
+                raise BackendTimeoutError("timeout no meio do stream")
+            yield from super().stream(prompt, model, **kwargs)
+
+    disclaimer = "Entendo que este conteúdo é sensível, mas " + "blá " * 500
+    backend = _TimingOutBackend([disclaimer, "Ela abriu a porta devagar."])
+    monkeypatch.setattr(core, "get_backend", lambda name=None: backend)
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+    stats = {}
+    out = core._call_model_text("m", "prompt", stats=stats, num_predict=6)
+    assert out == "Ela abriu a porta devagar."
+    # O stream refeito após o timeout ainda tem o preâmbulo verificado
+    assert backend.read[1] < 10
+    assert stats["Timeouts LLM"] == 1 and stats["Gerações Abortadas (Preâmbulo)"] == 1
+    # Os pedaços do stream morto não contam para o teto de tokens
+    assert "Saídas no Limite de Tokens" not in stats
+
+
+def test_repetition_loop_is_cancelled_and_retried(monkeypatch):
+    from src.stream_guard import RepetitionCheck
+
+    check = RepetitionCheck(n=4, max_count=3, window=50)
+    assert not any(check.feed(w + " ") for w in "ha ha ha ha ha ha ha ha ha ha ha ha".split())
+    loop = "Ele olhou para o céu e suspirou. " * 200
+    backend = _ScriptedBackend([loop, "Ele olhou para o céu."])
+    monkeypatch.setattr(core, "get_backend", lambda name=None: backend)
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    stats = {}
+    out = core._call_model_text("m", "prompt", stats=stats, num_predict=5000)
+    assert out == "Ele olhou para o céu."
+    assert backend.read[0] < 50
+    assert stats["Gerações em Loop Canceladas"] == 1
+
+
+class _CappedBackend:
+    """Non-streaming backend whose answer (`tokens` tokens) is cut at the request's num_predict."""
+
+    def __init__(self, tokens):
+        from src.backends import BackendCapabilities
+        self.capabilities = BackendCapabilities(batching=False, streaming=False, prefix_caching=False, max_context=0)
+        self.tokens = tokens
+        self.caps = []
+
+    def endpoint(self):
+        return "capped"
+
+    def generate(self, prompt, model, num_predict=0, **kwargs):
+        self.caps.append(num_predict)
+        return "abcd" * min(self.tokens, num_predict)
+
+
+def test_output_at_the_cap_is_retried_with_a_larger_cap(monkeypatch):
+    backend = _CappedBackend(tokens=50)
+    monkeypatch.setattr(core, "get_backend", lambda name=None: backend)
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    stats = {}
+    out = core._call_model_text("m", "prompt", stats=stats, num_predict=30)
+    assert out == "abcd" * 50
+    assert backend.caps == [30, 60]
+    assert stats["Saídas no Limite de Tokens"] == 1
+
+
+def test_output_still_cut_on_the_last_attempt_is_not_returned(monkeypatch):
+    import pytest
+    from src.stream_guard import OutputTruncatedError
+
+    backend = _CappedBackend(tokens=10_000)
+    monkeypatch.setattr(core, "get_backend", lambda name=None: backend)
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    with pytest.raises(OutputTruncatedError):
+        core._call_model_text("m", "prompt", num_predict=30)
+    # Dobra a cada tentativa, limitado pela janela de contexto
+    assert backend.caps == [30, 60, 120]
+    backend.caps.clear()
+    with pytest.raises(OutputTruncatedError):
+        core._call_model_text("m", "prompt", num_ctx=100, num_predict=30)
+    assert backend.caps == [30, 60, 99]
+
+
+def test_cascade_escalates_when_the_small_model_output_is_truncated(monkeypatch):
+    from src.stream_guard import OutputTruncatedError
+
+    calls = []
+
+    def call(model, prompt, **kwargs):
+        calls.append(model)
+        if model == core.SMALL_TIER.model:
+            raise OutputTruncatedError("cortada")
+        return "um dois três quatro"
+
+    monkeypatch.setattr(core, "CASCADE_MODE", True)
+    monkeypatch.setattr(core, "_call_model_text", call)
+    stats = {}
+    assert core._translate_chunk("one two three four", {}, stats=stats) == "um dois três quatro"
+    assert calls == [core.SMALL_TIER.model, core.LARGE_TIER.model]
+    assert stats["Chunks Escalados"] == 1
+
+
+def test_output_cap_scales_with_source():
+    from src.stream_guard import NUM_PREDICT_MIN, output_token_cap
+
+    assert output_token_cap("curto") == NUM_PREDICT_MIN
+    assert output_token_cap("palavra " * 2000) > output_token_cap("palavra " * 1000) > NUM_PREDICT_MIN
+
+
+def test_glossary_matcher_flags_missing_and_untranslated_terms():
+    from src.glossary_matcher import GlossaryMatcher
+
+    matcher = GlossaryMatcher({"Demon Lord": "Rei Demônio", "Tempest": "Rimuru Tempest", "Rim": "Borda"})
+    found = matcher.violations(
+        "The Demon Lord of Tempest met Rimuru.",
+        "O Demon Lord de Rimuru Tempest encontrou Rimuru.",
+    )
+    assert [(v.term, v.kind) for v in found] == [("Demon Lord", "ausente")]
+    assert matcher.violations("Rimuru Tempest", "Rimuru Tempest") == []
+
+
+def test_review_runs_only_on_windows_with_violations(monkeypatch):
+    reviewed = []
+    monkeypatch.setattr(core, "REVIEW_GATE", True)
+    monkeypatch.setattr(
+        core, "semantic_review_chapter", lambda text, glossary, **kw: reviewed.append(kw["violations"]) or "revisado"
+    )
+    stats = {}
+    out = core._review_flagged_windows(
+        ["The Demon Lord came.\n\n", "Nothing here.\n\n", "Demon Lord again."],
+        ["O Rei Demônio veio.\n\n", "Nada aqui.\n\n", "Lorde Demônio de novo."],
+        {"Demon Lord": "Rei Demônio"},
+        None,
+        True,
+        stats,
+    )
+    assert out == ["O Rei Demônio veio.\n\n", "Nada aqui.\n\n", "revisado"]
+    assert len(reviewed) == 1 and "Demon Lord" in reviewed[0][0]
+    assert stats == {"Janelas Revisadas": 1, "Janelas sem Revisão (Glossário OK)": 2}
+
+
+def test_structured_mode_keeps_one_paragraph_per_source_paragraph(monkeypatch):
+    from src.backends import LocalStubBackend
+
+    monkeypatch.setattr(core, "STRUCTURED_OUTPUT", True)
+    monkeypatch.setattr(core, "get_backend", lambda name=None: LocalStubBackend())
+    monkeypatch.setattr(core, "REQUEST_DELAY_SECONDS", 0)
+    text = "\n\n".join(f'Paragraph {i} says "the Demon Lord".' for i in range(300))
+    stats = {}
+    out = core.translate_text(text, None, {"Demon Lord": "Rei Demônio"}, stats=stats)
+    paragraphs = out.split("\n\n")
+    assert len(paragraphs) == 300
+    assert paragraphs[7] == "Paragraph 7 says 「the Rei Demônio」."
+    assert stats["Chunks Traduzidos"] > 1 and "Respostas JSON Inválidas" not in stats
+
+
+def test_structured_mode_asks_again_only_for_missing_ids(monkeypatch):
+    import json
+
+    prompts = []
+
+    def call(model, prompt, **kwargs):
+        prompts.append(prompt)
+        batch = json.loads(prompt[prompt.rfind("\n---\n\n") + 6:])["paragraphs"]
+        if len(prompts) == 1:
+            return json.dumps({"paragraphs": [{"id": 1, "text": "um"}, {"id": 3, "text": " "}]})
+        return json.dumps({"paragraphs": [{"id": 1, "text": batch[0]["text"].replace("three", "três")}]})
+
+    monkeypatch.setattr(core, "_call_model_text", call)
+    stats = {}
+    out = core._translate_paragraphs(["one", "two", "three"], {}, stats=stats)
+    assert out == ["um", "two", "três"]
+    assert len(prompts) == 3 and '"text": "three"' in prompts[2]
+    assert stats == {"Parágrafos Ausentes (JSON)": 2, "Parágrafos Re-pedidos (JSON)": 2}
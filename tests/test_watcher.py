@@ -0,0 +1,60 @@
+"""Testes do modo watch (detecção de arquivos e fila de capítulos)."""
+import sys
+
+import pytest
+
+from src.watcher import InotifyWatcher, PollingWatcher, WatchDaemon
+
+
+class FakeSession:
+    def __init__(self, novel, input_dir, output_dir, log):
+        self.novel = novel
+        self.log = log
+
+    def translate_chapter(self, path):
+        self.log.append((self.novel, path.name))
+
+    def finish(self):
+        self.log.append((self.novel, "finish"))
+
+
+def _daemon(tmp_path, log):
+    return WatchDaemon(
+        tmp_path / "input",
+        tmp_path / "output",
+        session_factory=lambda novel, input_dir, output_dir: FakeSession(novel, input_dir, output_dir, log),
+    )
+
+
+def test_polling_waits_for_file_to_settle(tmp_path):
+    watcher = PollingWatcher(tmp_path, interval=0)
+    (tmp_path / "01.txt").write_text("a", encoding="utf-8")
+    assert watcher.poll(0) == set()
+    assert watcher.poll(0) == {tmp_path / "01.txt"}
+    assert watcher.poll(0) == set()
+
+
+def test_daemon_translates_pending_chapters_in_natural_order(tmp_path):
+    novel = tmp_path / "input" / "nov"
+    novel.mkdir(parents=True)
+    for name in ("10.txt", "2.txt", "1.txt"):
+        (novel / name).write_text("x", encoding="utf-8")
+    log = []
+    daemon = _daemon(tmp_path, log)
+    assert daemon.scan_pending() == 3
+    daemon.enqueue(novel / "2.txt")  # duplicado não entra de novo
+    assert daemon.run_pending() == 3
+    assert log == [("nov", "1.txt"), ("nov", "2.txt"), ("nov", "10.txt"), ("nov", "finish")]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify só existe no Linux")
+def test_inotify_reports_closed_files_and_new_novels(tmp_path):
+    watcher = InotifyWatcher(tmp_path)
+    try:
+        (tmp_path / "01.txt").write_text("a", encoding="utf-8")
+        (tmp_path / "nov").mkdir()
+        assert tmp_path / "01.txt" in watcher.poll(1)
+        (tmp_path / "nov" / "02.txt").write_text("b", encoding="utf-8")
+        assert watcher.poll(1) == {tmp_path / "nov" / "02.txt"}
+    finally:
+        watcher.close()